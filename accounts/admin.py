@@ -1,4 +1,5 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from .bookings import SlotUnavailable, set_booking_status
 from .models import StudyTour, TourDate, TourInclusion, StudyTourBooking
 
 @admin.register(StudyTour)
@@ -21,17 +22,25 @@ class StudyTourBookingAdmin(admin.ModelAdmin):
     actions = ['approve_selected', 'cancel_selected']
     
     def approve_selected(self, request, queryset):
-        queryset.update(status='confirmed')
-        self.message_user(request, f"{queryset.count()} bookings approved successfully.")
+        self.set_status(request, queryset, 'confirmed', 'approved')
     approve_selected.short_description = "Approve selected bookings"
     
     def cancel_selected(self, request, queryset):
-        for booking in queryset:
-            booking.tour_date.available_slots += 1
-            booking.tour_date.save()
-        queryset.update(status='cancelled')
-        self.message_user(request, f"{queryset.count()} bookings cancelled successfully.")
+        self.set_status(request, queryset, 'cancelled', 'cancelled')
     cancel_selected.short_description = "Cancel selected bookings"
+    
+    def set_status(self, request, queryset, status, verb):
+        """Move each booking through set_booking_status so slots and the waitlist stay right"""
+        changed, full = 0, 0
+        for booking_id in queryset.order_by('booking_date').values_list('id', flat=True):
+            try:
+                set_booking_status(booking_id, status)
+                changed += 1
+            except SlotUnavailable:
+                full += 1
+        self.message_user(request, f"{changed} bookings {verb} successfully.")
+        if full:
+            self.message_user(request, f"{full} bookings were not {verb}: their tour dates are full.", messages.WARNING)
 
 @admin.register(TourInclusion)
 class TourInclusionAdmin(admin.ModelAdmin):
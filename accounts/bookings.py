@@ -0,0 +1,160 @@
+"""Study tour slots and the per-date waitlist.
+
+A TourDate's available_slots only moves through the conditional UPDATEs
+here; admin status changes go through set_booking_status, which takes or
+frees the slot as the booking enters or leaves a slot-holding status. When
+a booking gives its slot back and students are waiting, the slot goes
+straight to the first waiting student in the same transaction instead of
+being returned to the pool. Every slot or waitlist change invalidates the
+tour's cached page data and availability (accounts.tours).
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from tourist_spots.notifications import notify, study_tour_booking_notice
+
+from .models import StudyTourBooking, TourDate, TourWaitlistEntry
+from .tours import bump_tour_version
+
+
+# A booking holds one slot on its date in every status but cancelled
+SLOT_HOLDING_STATUSES = ('pending', 'confirmed', 'completed')
+
+
+class SlotUnavailable(Exception):
+    """The tour date has no slot left for the booking"""
+
+    def __init__(self, tour_date_id):
+        self.tour_date_id = tour_date_id
+
+
+def take_slot(tour_date_id):
+    """Claim one slot on a tour date; False if none are left"""
+    taken = TourDate.objects.filter(pk=tour_date_id, available_slots__gt=0).update(available_slots=F('available_slots') - 1)
+    if taken:
+        bump_tour_version(TourDate.objects.values_list('study_tour_id', flat=True).get(pk=tour_date_id))
+    return bool(taken)
+
+
+@transaction.atomic
+def free_slot(tour_date_id):
+    """Give up one slot: promote the next waiting student, or return it to the pool.
+
+    Call inside the transaction that cancels the booking. Returns the
+    promoted student's booking, or None if nobody was waiting.
+    """
+    # Lock the date so two cancellations cannot promote the same student
+    tour_date = TourDate.objects.select_for_update().select_related('study_tour').get(pk=tour_date_id)
+    entry = (
+        TourWaitlistEntry.objects.select_for_update()
+        .filter(tour_date=tour_date, status='waiting')
+        .order_by('position')
+        .first()
+    )
+    if entry is None:
+        TourDate.objects.filter(pk=tour_date_id).update(available_slots=F('available_slots') + 1)
+        bump_tour_version(tour_date.study_tour_id)
+        return None
+
+    # unique_together (user, tour_date): a student who cancelled earlier gets their old booking back
+    booking, created = StudyTourBooking.objects.get_or_create(
+        user_id=entry.user_id,
+        tour_date=tour_date,
+        defaults={
+            'study_tour': tour_date.study_tour,
+            'total_price': tour_date.study_tour.discounted_price,
+            'special_requirements': entry.special_requirements,
+            'status': 'pending',
+        },
+    )
+    if not created:
+        booking.status = 'pending'
+        booking.save(update_fields=['status', 'updated_at'])
+
+    entry.status = 'promoted'
+    entry.booking = booking
+    entry.promoted_at = timezone.now()
+    entry.save(update_fields=['status', 'booking', 'promoted_at'])
+    bump_tour_version(tour_date.study_tour_id)
+    notify(study_tour_booking_notice(booking, promoted=True))
+    return booking
+
+
+@transaction.atomic
+def set_booking_status(booking_id, status):
+    """Change one booking's status, taking or giving back its slot.
+
+    Returns (booking, promoted), where promoted is the waitlisted student's
+    booking that received a freed slot, if any. Raises SlotUnavailable (and
+    leaves the booking unchanged) if a cancelled booking is restored on a
+    full date.
+    """
+    booking = StudyTourBooking.objects.select_for_update().select_related('user', 'study_tour', 'tour_date').get(pk=booking_id)
+    old_status = booking.status
+    if old_status == status:
+        return booking, None
+
+    promoted = None
+    holds_slot, will_hold_slot = old_status in SLOT_HOLDING_STATUSES, status in SLOT_HOLDING_STATUSES
+    if will_hold_slot and not holds_slot:
+        if not take_slot(booking.tour_date_id):
+            raise SlotUnavailable(booking.tour_date_id)
+    elif holds_slot and not will_hold_slot:
+        promoted = free_slot(booking.tour_date_id)
+
+    booking.status = status
+    booking.save(update_fields=['status', 'updated_at'])
+    notify(study_tour_booking_notice(booking))
+    return booking, promoted
+
+
+@transaction.atomic
+def join_waitlist(user, tour_date, special_requirements=''):
+    """Put the student at the back of the date's waitlist (or return their existing entry)"""
+    TourDate.objects.select_for_update().filter(pk=tour_date.pk).first()
+    existing = TourWaitlistEntry.objects.filter(tour_date=tour_date, user=user, status='waiting').first()
+    if existing:
+        return existing
+    last = TourWaitlistEntry.objects.filter(tour_date=tour_date).aggregate(last=Coalesce(Max('position'), 0))['last']
+    try:
+        with transaction.atomic():
+            entry = TourWaitlistEntry.objects.create(
+                tour_date=tour_date, user=user, position=last + 1, special_requirements=special_requirements,
+            )
+    except IntegrityError:
+        # A concurrent request from the same student got there first
+        return TourWaitlistEntry.objects.get(tour_date=tour_date, user=user, status='waiting')
+    bump_tour_version(tour_date.study_tour_id)
+    return entry
+
+
+def leave_waitlist(user, tour_date_id):
+    left = TourWaitlistEntry.objects.filter(tour_date_id=tour_date_id, user=user, status='waiting').update(status='left')
+    if left:
+        bump_tour_version(TourDate.objects.values_list('study_tour_id', flat=True).get(pk=tour_date_id))
+    return left
+
+
+def waitlist_entries(user):
+    """The student's waitlist entries, each annotated with its place in line (1 = next)"""
+    ahead = (
+        TourWaitlistEntry.objects.filter(
+            tour_date=OuterRef('tour_date'), status='waiting', position__lt=OuterRef('position')
+        )
+        .values('tour_date')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    return (
+        TourWaitlistEntry.objects.filter(user=user)
+        .exclude(status='left')
+        .annotate(place=Coalesce(Subquery(ahead), 0) + 1)
+        .select_related('tour_date__study_tour', 'booking')
+    )
+
+
+def waitlist_position(user, tour_date_id):
+    """The student's current entry for a date, with place, in one query; None if they have none"""
+    return waitlist_entries(user).filter(tour_date_id=tour_date_id).order_by('-position').first()
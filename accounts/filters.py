@@ -0,0 +1,22 @@
+from django.db.models import Q
+
+from .models import StudyTourBooking
+
+
+def filter_study_tour_bookings(params):
+    """StudyTourBooking queryset for the admin booking management filters (?search=&status=)"""
+    search_query = params.get('search', '')
+    status_filter = params.get('status', '')
+
+    bookings = StudyTourBooking.objects.all()
+    if search_query:
+        bookings = bookings.filter(
+            Q(user__username__icontains=search_query) |
+            Q(user__first_name__icontains=search_query) |
+            Q(user__last_name__icontains=search_query) |
+            Q(user__email__icontains=search_query) |
+            Q(study_tour__name__icontains=search_query)
+        )
+    if status_filter:
+        bookings = bookings.filter(status=status_filter)
+    return bookings
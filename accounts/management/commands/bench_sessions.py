@@ -0,0 +1,74 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+# A typical student visit: log in (flash message), then browse around
+STUDENT_NAVIGATION = [
+    ('post', '/login/'),
+    ('get', '/'),
+    ('get', '/packages/'),
+    ('get', '/tourist-spots/packages/'),
+    ('get', '/tourist-spots/my-bookings/'),
+    ('get', '/my-bookings/'),
+    ('get', '/travel-history/'),
+    ('get', '/contact/'),
+    ('get', '/'),
+]
+
+ENGINES = [
+    ('database', 'django.contrib.sessions.backends.db'),
+    ('cached_db', 'accounts.sessions'),
+    ('signed_cookies', 'django.contrib.sessions.backends.signed_cookies'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Count session and auth_user round trips for a typical student navigation under each session engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=3, help='Times to repeat the navigation per engine')
+
+    def handle(self, *args, **options):
+        rounds = options['rounds']
+        results = {}
+
+        # Everything runs inside a transaction that is rolled back at the end,
+        # so the benchmark user and its sessions never reach the real database.
+        with transaction.atomic():
+            user = User.objects.create_user(username='__bench_student__', password='bench-pass-123')
+            for label, engine in ENGINES:
+                cache.clear()
+                with override_settings(SESSION_ENGINE=engine, ALLOWED_HOSTS=['*'], SECURE_SSL_REDIRECT=False):
+                    results[label] = self.run_navigation(user, rounds)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'{"engine":<16}{"requests":>10}{"session queries":>18}{"per request":>14}{"auth queries":>15}')
+        for label, (requests, queries, auth_queries) in results.items():
+            self.stdout.write(
+                f'{label:<16}{requests:>10}{queries:>18}{queries / requests:>14.2f}{auth_queries:>15}'
+            )
+
+        baseline = results['database'][1]
+        for label, (_, queries, _) in results.items():
+            if label != 'database':
+                self.stdout.write(self.style.SUCCESS(
+                    f'{label}: {baseline - queries} of {baseline} session round trips saved'
+                ))
+
+    def run_navigation(self, user, rounds):
+        requests = 0
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(rounds):
+                client = Client()
+                for method, path in STUDENT_NAVIGATION:
+                    if method == 'post':
+                        client.post(path, {'username': user.username, 'password': 'bench-pass-123'})
+                    else:
+                        client.get(path)
+                    requests += 1
+        session_queries = sum(1 for q in ctx.captured_queries if 'django_session' in q['sql'])
+        auth_queries = sum(1 for q in ctx.captured_queries if 'auth_user' in q['sql'])
+        return requests, session_queries, auth_queries
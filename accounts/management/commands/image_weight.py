@@ -0,0 +1,131 @@
+import html
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+# The report models one AVIF-capable browser with a 1280px wide viewport
+VIEWPORT_WIDTH = 1280
+
+PICTURE_RE = re.compile(r'<picture>(.*?)</picture>', re.S)
+SOURCE_RE = re.compile(r'<source type="([^"]+)" srcset="([^"]+)" sizes="([^"]+)">')
+IMG_RE = re.compile(r'<img\b[^>]*?\bsrc="(/static/[^"]+)"[^>]*>')
+ICON_RE = re.compile(r'<link rel="icon"[^>]*href="(/static/[^"]+)"')
+STYLE_RE = re.compile(r'\sstyle="([^"]*/static/[^"]*)"')
+DATA_BG_RE = re.compile(r'\sdata-bg="([^"]*)"')
+DATA_BG_FALLBACK_RE = re.compile(r'\sdata-bg-fallback="([^"]*)"')
+URL_RE = re.compile(r'url\(["\']?(/static/[^"\')]+)["\']?\)')
+HASH_RE = re.compile(r'\.[0-9a-f]{12}(?=\.)')
+
+
+class Command(BaseCommand):
+    help = 'Compare homepage image transfer size: original files vs collectstatic variants with lazy loading'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/', help='Page to analyse')
+
+    def handle(self, *args, **options):
+        if not getattr(staticfiles_storage, 'hashed_files', None):
+            raise CommandError('No static manifest found. Run "python manage.py collectstatic" first.')
+
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['*'], SECURE_SSL_REDIRECT=False):
+            response = Client().get(options['path'], secure=True)
+        if response.status_code != 200:
+            raise CommandError(f'{options["path"]} returned HTTP {response.status_code}')
+        page = response.content.decode()
+
+        originals, eager, deferred = self.collect(page)
+        before = sum(self.source_size(url) for url in originals)
+        eager_bytes = sum(self.built_size(url) for url in eager)
+        deferred_bytes = sum(self.built_size(url) for url in deferred - eager)
+
+        self.stdout.write(f'{"image":<48}{"original":>12}')
+        for url in sorted(originals):
+            self.stdout.write(f'{self.static_name(url):<48}{self.source_size(url):>12}')
+        self.stdout.write('')
+        self.stdout.write(f'Before (every original loaded up front): {before:>12} bytes')
+        self.stdout.write(f'After, initial load:                     {eager_bytes:>12} bytes')
+        self.stdout.write(f'After, deferred until needed:            {deferred_bytes:>12} bytes')
+        if before:
+            self.stdout.write(self.style.SUCCESS(
+                f'Initial image transfer is {100 - eager_bytes * 100 / before:.0f}% smaller'
+            ))
+
+    def collect(self, page):
+        """Split the page's static image URLs into originals, eager downloads and deferred downloads"""
+        originals, eager, deferred = set(), set(), set()
+
+        for block in PICTURE_RE.findall(page):
+            img_url = IMG_RE.search(block).group(1)
+            originals.add(img_url)
+            chosen = self.pick_source(SOURCE_RE.findall(block)) or img_url
+            (deferred if 'loading="lazy"' in block else eager).add(chosen)
+        page = PICTURE_RE.sub('', page)
+
+        for match in IMG_RE.finditer(page):
+            originals.add(match.group(1))
+            (deferred if 'loading="lazy"' in match.group(0) else eager).add(match.group(1))
+        for url in ICON_RE.findall(page):
+            originals.add(url)
+            eager.add(url)
+
+        for style in STYLE_RE.findall(page):
+            urls = URL_RE.findall(html.unescape(style))
+            originals.update(u for u in urls if not self.is_variant(u))
+            eager.add(self.first_image_set_url(html.unescape(style)) or urls[0])
+        for value in DATA_BG_FALLBACK_RE.findall(page):
+            originals.update(URL_RE.findall(html.unescape(value)))
+        for value in DATA_BG_RE.findall(page):
+            value = html.unescape(value)
+            deferred.add(self.first_image_set_url(value) or URL_RE.findall(value)[0])
+        return originals, eager, deferred
+
+    def pick_source(self, sources):
+        """The candidate a browser picks: first source type, smallest width covering the slot"""
+        if not sources:
+            return None
+        _, srcset, sizes = sources[0]
+        slot = self.slot_width(sizes)
+        candidates = []
+        for candidate in srcset.split(','):
+            url, width = candidate.split()
+            candidates.append((int(width[:-1]), url))
+        candidates.sort()
+        return next((url for width, url in candidates if width >= slot), candidates[-1][1])
+
+    def slot_width(self, sizes):
+        for entry in sizes.split(','):
+            entry = entry.strip()
+            media = re.match(r'\(max-width: (\d+)px\)\s+(.*)', entry)
+            if media:
+                if VIEWPORT_WIDTH > int(media.group(1)):
+                    continue
+                entry = media.group(2)
+            if entry.endswith('vw'):
+                return VIEWPORT_WIDTH * float(entry[:-2]) / 100
+            return float(entry[:-2])
+        return VIEWPORT_WIDTH
+
+    def first_image_set_url(self, value):
+        if 'image-set(' not in value:
+            return None
+        return URL_RE.search(value, value.index('image-set(')).group(1)
+
+    def is_variant(self, url):
+        return re.search(r'-\d+w\.(avif|webp)$', self.static_name(url)) is not None
+
+    def static_name(self, url):
+        return HASH_RE.sub('', url[len(settings.STATIC_URL):])
+
+    def source_size(self, url):
+        path = finders.find(self.static_name(url))
+        return os.path.getsize(path) if path else 0
+
+    def built_size(self, url):
+        name = url[len(settings.STATIC_URL):]
+        return staticfiles_storage.size(name) if staticfiles_storage.exists(name) else 0
@@ -0,0 +1,245 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import DatabaseError, transaction
+
+from accounts.backends import invalidate_cached_user
+
+FIELDS = ('username', 'password', 'email', 'first_name', 'last_name')
+# Same role marker RegistrationForm stores for self-registered students
+DEFAULT_LAST_NAME = 'Role: student'
+
+username_validator = UnicodeUsernameValidator()
+
+
+def init_worker():
+    # Spawned (non-forked) workers start without Django configured
+    django.setup()
+
+
+def hash_password(raw_password, iterations=None):
+    """Same as make_password(), optionally with a lower PBKDF2 work factor"""
+    hasher = get_hasher('default')
+    if iterations and hasattr(hasher, 'iterations'):
+        return hasher.encode(raw_password, hasher.salt(), iterations=iterations)
+    return hasher.encode(raw_password, hasher.salt())
+
+
+def hash_passwords(args):
+    passwords, iterations = args
+    return [hash_password(password, iterations) for password in passwords]
+
+
+class Command(BaseCommand):
+    help = 'Create student accounts in bulk from a CSV or JSONL file (and update existing ones with --update)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with header row) or JSONL file of students')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format (default: from the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Users hashed and written per batch')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Password hashing processes')
+        parser.add_argument(
+            '--iterations', type=int,
+            help='PBKDF2 iterations for the imported passwords. Lower values import faster; '
+                 'Django rehashes at full strength on each student\'s first login.',
+        )
+        parser.add_argument(
+            '--update', action='store_true',
+            help='Also overwrite the password, email and names of existing students. Without it existing '
+                 'usernames are skipped; staff and superuser accounts are always skipped.',
+        )
+        parser.add_argument(
+            '--failures', help='Where to write the failed and skipped rows (default: <path>.failures.csv)',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        chunk_size = max(1, options['chunk_size'])
+        workers = max(1, options['workers'] or 1)
+        self.iterations = options['iterations']
+        self.update = options['update']
+        self.failures = []
+        self.skipped = []
+        self.created = self.updated = 0
+
+        started = time.monotonic()
+        seen = set()
+        chunk = []
+        processed = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            self.pool, self.workers = pool, workers
+            for line_no, row in self.read_rows(path, fmt):
+                student = self.clean_row(line_no, row, seen)
+                if student:
+                    chunk.append(student)
+                processed += 1
+                if len(chunk) >= chunk_size:
+                    self.import_chunk(chunk)
+                    chunk = []
+                    self.report_progress(processed, started)
+            if chunk:
+                self.import_chunk(chunk)
+                self.report_progress(processed, started)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Done in {elapsed:.1f}s: {self.created} created, {self.updated} updated, '
+            f'{len(self.skipped)} skipped, {len(self.failures)} failed ({processed} rows read)'
+        ))
+        if self.failures or self.skipped:
+            failures_path = options['failures'] or f'{path}.failures.csv'
+            self.write_failures(failures_path)
+            self.stdout.write(self.style.WARNING(f'Failed and skipped rows written to {failures_path}'))
+
+    def read_rows(self, path, fmt):
+        """Yield (line number, dict) pairs"""
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            if fmt == 'csv':
+                reader = csv.DictReader(f)
+                missing = {'username', 'password'} - set(reader.fieldnames or [])
+                if missing:
+                    raise CommandError(f'CSV header is missing: {", ".join(sorted(missing))}')
+                for row in reader:
+                    yield reader.line_num, row
+            else:
+                for line_no, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        row = json.loads(line)
+                    except ValueError as exc:
+                        self.failures.append((line_no, '', f'Invalid JSON: {exc}'))
+                        continue
+                    if not isinstance(row, dict):
+                        self.failures.append((line_no, '', 'Expected a JSON object'))
+                        continue
+                    yield line_no, row
+
+    def clean_row(self, line_no, row, seen):
+        """Return a dict of cleaned fields, or record a failure and return None"""
+        student = {field: str(row.get(field) or '').strip() for field in FIELDS}
+        username = student['username']
+        try:
+            if not username:
+                raise ValidationError('Username is required.')
+            username_validator(username)
+            if len(username) > 150:
+                raise ValidationError('Username is longer than 150 characters.')
+            if not student['password']:
+                raise ValidationError('Password is required.')
+            if student['email']:
+                validate_email(student['email'])
+            if username in seen:
+                raise ValidationError('Username appears more than once in the file.')
+        except ValidationError as exc:
+            self.failures.append((line_no, username, ' '.join(exc.messages)))
+            return None
+        seen.add(username)
+        student['first_name'] = student['first_name'][:150]
+        student['last_name'] = student['last_name'][:150] or DEFAULT_LAST_NAME
+        student['line_no'] = line_no
+        return student
+
+    def import_chunk(self, chunk):
+        chunk = self.skip_existing(chunk)
+        if not chunk:
+            return
+        # Split the chunk into one slice per worker so every core hashes
+        size = -(-len(chunk) // self.workers)
+        slices = [chunk[i:i + size] for i in range(0, len(chunk), size)]
+        hashed = self.pool.map(
+            hash_passwords,
+            [([s['password'] for s in part], self.iterations) for part in slices],
+        )
+        for part, hashes in zip(slices, hashed):
+            for student, password in zip(part, hashes):
+                student['password'] = password
+
+        try:
+            with transaction.atomic():
+                self.write_users(chunk)
+        except DatabaseError:
+            # Find the offending rows one by one
+            for student in chunk:
+                try:
+                    with transaction.atomic():
+                        self.write_users([student])
+                except DatabaseError as exc:
+                    self.failures.append((student['line_no'], student['username'], str(exc)))
+
+    def skip_existing(self, chunk):
+        """Drop rows for accounts the import must not touch, recording why, before any hashing"""
+        existing = {
+            username: (is_staff or is_superuser)
+            for username, is_staff, is_superuser in User.objects.filter(
+                username__in=[s['username'] for s in chunk]
+            ).values_list('username', 'is_staff', 'is_superuser')
+        }
+        kept = []
+        for student in chunk:
+            if student['username'] not in existing:
+                kept.append(student)
+            elif existing[student['username']]:
+                self.skipped.append((student['line_no'], student['username'], 'Skipped: staff or superuser account'))
+            elif not self.update:
+                self.skipped.append((student['line_no'], student['username'], 'Skipped: user exists (use --update)'))
+            else:
+                kept.append(student)
+        return kept
+
+    def write_users(self, students):
+        usernames = [s['username'] for s in students]
+        existing = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+        conflicts = {}
+        if self.update:
+            # Only reached by students; skip_existing filtered out staff and superusers
+            conflicts = dict(
+                update_conflicts=True,
+                unique_fields=['username'],
+                update_fields=['password', 'email', 'first_name', 'last_name'],
+            )
+        User.objects.bulk_create(
+            [
+                User(
+                    username=s['username'],
+                    password=s['password'],
+                    email=s['email'],
+                    first_name=s['first_name'],
+                    last_name=s['last_name'],
+                    is_active=True,
+                )
+                for s in students
+            ],
+            **conflicts,
+        )
+        # bulk_create sends no post_save, so drop cached copies of updated users here
+        transaction.on_commit(lambda: [invalidate_cached_user(user_id) for user_id in existing.values()])
+        self.created += len(students) - len(existing)
+        self.updated += len(existing)
+
+    def report_progress(self, processed, started):
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed else 0
+        self.stdout.write(
+            f'{processed} rows read, {self.created} created, {self.updated} updated, '
+            f'{len(self.skipped)} skipped, {len(self.failures)} failed ({rate:.0f} rows/s)'
+        )
+
+    def write_failures(self, failures_path):
+        with open(failures_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['line', 'username', 'error'])
+            writer.writerows(sorted(self.failures + self.skipped))
@@ -0,0 +1,14 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_contactmessage'),
+        ('accounts', '0004_remove_travelpackage_badge_and_more'),
+    ]
+
+    operations = [
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0005_merge_20261019_1410'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TourWaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('promoted', 'Promoted'), ('left', 'Left')], default='waiting', max_length=20)),
+                ('special_requirements', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('promoted_at', models.DateTimeField(blank=True, null=True)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.studytourbooking')),
+                ('tour_date', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='accounts.tourdate')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tour_waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['tour_date', 'position'],
+            },
+        ),
+        migrations.RemoveField(
+            model_name='travelpackage',
+            name='created_by',
+        ),
+        migrations.DeleteModel(
+            name='PackageBooking',
+        ),
+        migrations.DeleteModel(
+            name='TravelPackage',
+        ),
+        migrations.AddIndex(
+            model_name='tourwaitlistentry',
+            index=models.Index(fields=['tour_date', 'status', 'position'], name='waitlist_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tourwaitlistentry',
+            index=models.Index(fields=['user', 'tour_date'], name='waitlist_user_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tourwaitlistentry',
+            constraint=models.UniqueConstraint(fields=('tour_date', 'position'), name='waitlist_unique_position'),
+        ),
+        migrations.AddConstraint(
+            model_name='tourwaitlistentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'waiting')), fields=('tour_date', 'user'), name='waitlist_one_waiting_entry'),
+        ),
+    ]
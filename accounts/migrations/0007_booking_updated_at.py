@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:49
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    """Existing bookings count as last changed when they were made"""
+    StudyTourBooking = apps.get_model('accounts', 'StudyTourBooking')
+    StudyTourBooking.objects.update(updated_at=F('booking_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_tour_waitlist'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studytourbooking',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='studytourbooking',
+            index=models.Index(fields=['updated_at'], name='studytourbooking_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_booking_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='studytourbooking',
+            name='studytourbooking_updated_idx',
+        ),
+        migrations.AddIndex(
+            model_name='studytourbooking',
+            index=models.Index(fields=['updated_at', 'id'], name='studytourbooking_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_booking_changes_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studytourbooking',
+            index=models.Index(fields=['user', 'booking_date', 'id'], name='studytourbooking_user_idx'),
+        ),
+    ]
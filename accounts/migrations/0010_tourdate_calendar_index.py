@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_travel_history_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tourdate',
+            index=models.Index(fields=['study_tour', 'start_date'], name='tourdate_calendar_idx'),
+        ),
+    ]
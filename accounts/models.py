@@ -22,6 +22,12 @@ class TourDate(models.Model):
     available_slots = models.IntegerField()
     is_available = models.BooleanField(default=True)
     
+    class Meta:
+        indexes = [
+            # Availability calendar: one tour's dates within a month
+            models.Index(fields=['study_tour', 'start_date'], name='tourdate_calendar_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.study_tour.name} - {self.start_date} to {self.end_date}"
 
@@ -57,10 +63,15 @@ class StudyTourBooking(models.Model):
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     special_requirements = models.TextField(blank=True, null=True)
     admin_notes = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-booking_date']
         unique_together = ['user', 'tour_date']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='studytourbooking_updated_idx'),
+            models.Index(fields=['user', 'booking_date', 'id'], name='studytourbooking_user_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.study_tour.name}"
@@ -84,6 +95,40 @@ class StudyTourBooking(models.Model):
         return payment_colors.get(self.payment_status, 'secondary')
 
 
+class TourWaitlistEntry(models.Model):
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('promoted', 'Promoted'),
+        ('left', 'Left'),
+    ]
+    
+    tour_date = models.ForeignKey(TourDate, on_delete=models.CASCADE, related_name='waitlist')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tour_waitlist_entries')
+    # Increasing per tour date; the waiting entry with the lowest position is promoted next
+    position = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    special_requirements = models.TextField(blank=True)
+    booking = models.ForeignKey(StudyTourBooking, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    promoted_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['tour_date', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['tour_date', 'position'], name='waitlist_unique_position'),
+            models.UniqueConstraint(
+                fields=['tour_date', 'user'], condition=models.Q(status='waiting'), name='waitlist_one_waiting_entry',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['tour_date', 'status', 'position'], name='waitlist_queue_idx'),
+            models.Index(fields=['user', 'tour_date'], name='waitlist_user_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.tour_date} (#{self.position}, {self.status})"
+
+
 class ContactMessage(models.Model):
     SUBJECT_CHOICES = [
         ('booking', 'Trip Booking'),
@@ -0,0 +1,63 @@
+"""Session engine: database sessions that skip unchanged saves.
+
+Used as ``SESSION_ENGINE = 'accounts.sessions'``. With a shared cache
+(settings.SHARED_CACHE) reads come from the cache with write-through to the
+database; a per-process cache would keep a session that was logged out or
+flushed in one worker alive in the others, so without one every read goes to
+the database.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.utils import timezone
+
+
+class SkipUnchangedSaveMixin:
+    """Skips the save when the session data did not change"""
+
+    def load(self):
+        data = super().load()
+        self._loaded_digest = self._digest(data)
+        return data
+
+    def save(self, must_create=False):
+        # Views often mark the session modified by re-assigning the same
+        # values; there is nothing to write back in that case.
+        if not must_create and self.session_key is not None:
+            loaded_digest = getattr(self, '_loaded_digest', None)
+            if loaded_digest is not None and loaded_digest == self._digest(self._get_session()):
+                return
+        super().save(must_create=must_create)
+        self._loaded_digest = self._digest(self._get_session())
+
+    def _digest(self, data):
+        return hashlib.sha1(self.serializer().dumps(data)).hexdigest()
+
+    @classmethod
+    def clear_expired(cls, batch_size=1000):
+        """Delete expired sessions in small batches to avoid long table locks"""
+        model = cls.get_model_class()
+        now = timezone.now()
+        deleted = 0
+        while True:
+            pks = list(
+                model.objects.filter(expire_date__lt=now)
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                return deleted
+            model.objects.filter(pk__in=pks).delete()
+            deleted += len(pks)
+
+
+class CachedDBSessionStore(SkipUnchangedSaveMixin, CachedDBStore):
+    pass
+
+
+class DBSessionStore(SkipUnchangedSaveMixin, DBStore):
+    pass
+
+
+SessionStore = CachedDBSessionStore if settings.SHARED_CACHE else DBSessionStore
@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import invalidate_cached_user
+from .models import StudyTour, TourDate, TourInclusion
+from .tours import bump_tour_version, forget_default_tour
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    """Any save (profile edit, password change, last_login) invalidates the cached user"""
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=StudyTour)
+@receiver(post_delete, sender=StudyTour)
+def drop_cached_tour(sender, instance, **kwargs):
+    """Activating, deactivating or editing a tour can change which tour /packages/ shows"""
+    bump_tour_version(instance.pk)
+    forget_default_tour()
+
+
+@receiver(post_save, sender=TourDate)
+@receiver(post_delete, sender=TourDate)
+@receiver(post_save, sender=TourInclusion)
+@receiver(post_delete, sender=TourInclusion)
+def drop_cached_tour_parts(sender, instance, **kwargs):
+    bump_tour_version(instance.study_tour_id)
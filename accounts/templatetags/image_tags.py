@@ -0,0 +1,68 @@
+import mimetypes
+import os
+import re
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+# Preferred first; the original file is always the last fallback
+VARIANT_TYPES = [('avif', 'image/avif'), ('webp', 'image/webp')]
+
+
+@lru_cache(maxsize=None)
+def image_variants(name):
+    """Resized variants collectstatic built for a static image, from the manifest.
+
+    Returns {'avif': [(640, 'images/x-640w.avif'), ...], 'webp': [...]}, or {}
+    in development where files are served straight from static/.
+    """
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+    if settings.DEBUG or not hashed_files:
+        return {}
+    root = os.path.splitext(name)[0]
+    pattern = re.compile(re.escape(root) + r'-(\d+)w\.(avif|webp)$')
+    variants = {}
+    for key in hashed_files:
+        match = pattern.match(key)
+        if match:
+            variants.setdefault(match.group(2), []).append((int(match.group(1)), key))
+    for candidates in variants.values():
+        candidates.sort()
+    return variants
+
+
+@register.simple_tag
+def picture(name, alt='', sizes='100vw', loading='lazy'):
+    """<picture> with AVIF/WebP srcsets and the original image as <img> fallback"""
+    variants = image_variants(name)
+    sources = []
+    for fmt, mime in VARIANT_TYPES:
+        if fmt in variants:
+            srcset = ', '.join(f'{static(variant)} {width}w' for width, variant in variants[fmt])
+            sources.append(format_html('<source type="{}" srcset="{}" sizes="{}">', mime, srcset, sizes))
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}" loading="{}" decoding="async"></picture>',
+        mark_safe(''.join(sources)), static(name), alt, loading,
+    )
+
+
+@register.simple_tag
+def image_set(name, width=1280):
+    """CSS image-set() for a background image: the AVIF/WebP variant closest to width, then the original"""
+    variants = image_variants(name)
+    options = []
+    for fmt, mime in VARIANT_TYPES:
+        if fmt in variants:
+            chosen = next((v for w, v in variants[fmt] if w >= width), variants[fmt][-1][1])
+            options.append(f'url("{static(chosen)}") type("{mime}")')
+    mime = mimetypes.guess_type(name)[0]
+    # type() is optional; an unknown one would make the browser skip the image
+    options.append(f'url("{static(name)}") type("{mime}")' if mime else f'url("{static(name)}")')
+    return f'image-set({", ".join(options)})'
@@ -0,0 +1,145 @@
+"""A student's travel history across study tours and tour packages.
+
+StudyTourBooking and PackageBooking rows for one user are read newest first
+off their (user, date, id) indexes, each with its tour/package joined in, and
+merged into a single timeline ordered by (date, source, id). A page stops
+after TIMELINE_PAGE_SIZE entries and hands back a cursor for the position of
+the last one, so "load more" continues exactly where the page ended even when
+new bookings arrive in between.
+"""
+import base64
+import heapq
+
+from django.db.models import Count, Q, Sum
+from django.utils.dateparse import parse_datetime
+
+from tourist_spots.models import PackageBooking
+
+from .models import StudyTourBooking
+
+TIMELINE_PAGE_SIZE = 20
+STUDY_TOUR = 'study_tour'
+PACKAGE = 'package'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(position):
+    booked_at, source, row_id = position
+    raw = f'{booked_at.isoformat()}|{source}|{row_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(booked_at, source, row id) from a cursor, or None for the newest entry"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        booked_at, source, row_id = raw.split('|')
+        booked_at = parse_datetime(booked_at)
+        if booked_at is None or source not in (STUDY_TOUR, PACKAGE):
+            raise ValueError
+        return booked_at, source, int(row_id)
+    except ValueError:
+        raise InvalidCursor('Invalid cursor.')
+
+
+def before_position(position, source, time_field):
+    """Q for rows of one source that come after the cursor in newest-first order"""
+    if position is None:
+        return Q()
+    booked_at, cursor_source, row_id = position
+    earlier = Q(**{f'{time_field}__lt': booked_at})
+    if source < cursor_source:
+        return earlier | Q(**{time_field: booked_at})
+    if source == cursor_source:
+        return earlier | Q(**{time_field: booked_at, 'id__lt': row_id})
+    return earlier
+
+
+def study_tour_entries(user, position, limit):
+    bookings = (
+        StudyTourBooking.objects.filter(before_position(position, STUDY_TOUR, 'booking_date'), user=user)
+        .select_related('study_tour', 'tour_date')
+        .order_by('-booking_date', '-id')[:limit]
+    )
+    for booking in bookings:
+        yield booking.booking_date, STUDY_TOUR, booking.id, {
+            'kind': STUDY_TOUR,
+            'booking': booking,
+            'booked_at': booking.booking_date,
+            'title': booking.study_tour.name,
+            'starts': booking.tour_date.start_date,
+            'ends': booking.tour_date.end_date,
+            'amount': booking.total_price,
+            'status': booking.status,
+            'status_display': booking.get_status_display(),
+        }
+
+
+def package_entries(user, position, limit):
+    bookings = (
+        PackageBooking.objects.filter(before_position(position, PACKAGE, 'created_at'), user=user)
+        .select_related('package')
+        .order_by('-created_at', '-id')[:limit]
+    )
+    for booking in bookings:
+        yield booking.created_at, PACKAGE, booking.id, {
+            'kind': PACKAGE,
+            'booking': booking,
+            'booked_at': booking.created_at,
+            'title': booking.package.name,
+            'destination': booking.package.destination,
+            'duration': booking.package.duration,
+            'amount': booking.paid_total + booking.balance,
+            'status': booking.status,
+            'status_display': booking.get_status_display(),
+        }
+
+
+def timeline_page(user, cursor=None, limit=TIMELINE_PAGE_SIZE):
+    """(entries, next_cursor) for one page of the user's history, newest first.
+
+    next_cursor is '' on the last page. Raises InvalidCursor for a malformed
+    cursor. Each source is read with one query of at most limit + 1 rows.
+    """
+    position = decode_cursor(cursor)
+    merged = heapq.merge(
+        study_tour_entries(user, position, limit + 1),
+        package_entries(user, position, limit + 1),
+        key=lambda row: row[:3],
+        reverse=True,
+    )
+    entries = []
+    for booked_at, source, row_id, entry in merged:
+        if len(entries) == limit:
+            return entries, encode_cursor(position)
+        entries.append(entry)
+        position = (booked_at, source, row_id)
+    return entries, ''
+
+
+def timeline_totals(user):
+    """Trips taken and money spent, one aggregate query per source.
+
+    Cancelled and rejected bookings are not trips. Spending counts what was
+    actually paid: a study tour's price once it is marked paid, and the
+    payment ledger total for packages.
+    """
+    tours = StudyTourBooking.objects.filter(user=user).aggregate(
+        trips=Count('id', filter=~Q(status='cancelled')),
+        spent=Sum('total_price', filter=Q(payment_status='paid')),
+    )
+    packages = PackageBooking.objects.filter(user=user).aggregate(
+        trips=Count('id', filter=~Q(status__in=['cancelled', 'rejected'])),
+        spent=Sum('paid_total'),
+    )
+    return {
+        'study_tour_trips': tours['trips'],
+        'package_trips': packages['trips'],
+        'total_trips': tours['trips'] + packages['trips'],
+        'total_spent': (tours['spent'] or 0) + (packages['spent'] or 0),
+    }
@@ -0,0 +1,155 @@
+"""Cached study tour page data and month availability.
+
+The tour and its inclusions are the same for every visitor, so with a shared
+cache (settings.SHARED_CACHE) study_tour_detail builds them once and keeps
+them under the tour's current version, and the availability calendar API
+caches each month the same way and uses the version as its ETag. A tour's
+bookable dates and their slots are read fresh on every request, since another
+request may have just taken a slot. Saving a tour, date or inclusion, moving
+a date's available_slots or changing its waitlist bumps the version (after
+the transaction commits), so the next request rebuilds. A version is a
+timestamp rather than a counter: if the version key is evicted, the fresh one
+cannot collide with data cached under an old version.
+
+A per-process cache would only see a bump in the worker that made it, so
+without a shared cache nothing here is cached: the page reads the tour from
+the database and the calendar tags each month with a hash of its data.
+"""
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import StudyTour, StudyTourBooking, TourDate
+
+TOUR_CACHE_TIMEOUT = getattr(settings, 'TOUR_CACHE_TIMEOUT', 600)
+DEFAULT_TOUR_KEY = 'study_tour:default'
+RECENT_BOOKINGS = 3
+
+
+def tour_version_key(tour_id):
+    return f'study_tour:{tour_id}:version'
+
+
+def tour_version(tour_id):
+    version = cache.get(tour_version_key(tour_id))
+    if version is None:
+        version = time.time_ns()
+        cache.set(tour_version_key(tour_id), version, None)
+    return version
+
+
+def bump_tour_version(tour_id):
+    """Invalidate the tour's cached page data once the current transaction commits"""
+    transaction.on_commit(lambda: cache.set(tour_version_key(tour_id), time.time_ns(), None))
+
+
+def forget_default_tour():
+    transaction.on_commit(lambda: cache.delete(DEFAULT_TOUR_KEY))
+
+
+def default_tour_id():
+    """Id of the tour shown at /packages/ without a tour id, or None if none is active"""
+    if not settings.SHARED_CACHE:
+        return StudyTour.objects.filter(is_active=True).values_list('id', flat=True).first()
+    tour_id = cache.get(DEFAULT_TOUR_KEY)
+    if tour_id is None:
+        tour_id = StudyTour.objects.filter(is_active=True).values_list('id', flat=True).first() or 0
+        cache.set(DEFAULT_TOUR_KEY, tour_id, TOUR_CACHE_TIMEOUT)
+    return tour_id or None
+
+
+def tour_page_context(tour_id):
+    """{'study_tour', 'tour_dates', 'inclusions'} for an active tour, shared by all users.
+
+    Raises StudyTour.DoesNotExist for a missing or inactive tour. The tour and
+    its inclusions (two queries) are cached when the cache is shared; the
+    available dates are one query on every call, so their slots are never stale.
+    """
+    if settings.SHARED_CACHE:
+        key = f'study_tour:{tour_id}:context:{tour_version(tour_id)}'
+        context = cache.get(key)
+        if context is None:
+            context = tour_context(tour_id)
+            cache.set(key, context, TOUR_CACHE_TIMEOUT)
+    else:
+        context = tour_context(tour_id)
+    return dict(context, tour_dates=list(TourDate.objects.filter(study_tour_id=tour_id, is_available=True)))
+
+
+def tour_context(tour_id):
+    study_tour = StudyTour.objects.prefetch_related('inclusions').get(id=tour_id, is_active=True)
+    return {
+        'study_tour': study_tour,
+        'inclusions': list(study_tour.inclusions.all()),
+    }
+
+
+def recent_bookings_context(user):
+    """The user's booking count and latest bookings with their dates, for the packages page"""
+    if not user.is_authenticated:
+        return {'booking_count': 0, 'recent_bookings': []}
+    bookings = StudyTourBooking.objects.filter(user=user)
+    return {
+        'booking_count': bookings.count(),
+        'recent_bookings': list(bookings.select_related('tour_date')[:RECENT_BOOKINGS]),
+    }
+
+
+def month_etag(tour_id, month, dates=None):
+    """ETag for a month: the tour's version with a shared cache, otherwise a hash of the month's dates.
+
+    A per-process cache's version only moves in the worker that changed the
+    tour, so without a shared cache the caller passes the dates it read.
+    """
+    if settings.SHARED_CACHE:
+        return f'"{tour_id}-{month:%Y-%m}-{tour_version(tour_id)}"'
+    return '"%s"' % hashlib.md5(json.dumps(dates, sort_keys=True).encode()).hexdigest()
+
+
+def month_availability(tour_id, month):
+    """Every date of an active tour starting in the month (a date on its 1st), with slots and waitlist length.
+
+    One query on the (study_tour, start_date) index, cached under the tour's
+    version when the cache is shared.
+    """
+    if not settings.SHARED_CACHE:
+        return month_dates(tour_id, month)
+    key = f'study_tour:{tour_id}:availability:{month:%Y-%m}:{tour_version(tour_id)}'
+    dates = cache.get(key)
+    if dates is None:
+        dates = month_dates(tour_id, month)
+        cache.set(key, dates, TOUR_CACHE_TIMEOUT)
+    return dates
+
+
+def month_dates(tour_id, month):
+    next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    rows = (
+        TourDate.objects.filter(
+            study_tour_id=tour_id, study_tour__is_active=True, start_date__gte=month, start_date__lt=next_month,
+        )
+        .annotate(waitlist_length=Count('waitlist', filter=Q(waitlist__status='waiting')))
+        .values('id', 'start_date', 'end_date', 'available_slots', 'is_available', 'waitlist_length')
+        .order_by('start_date', 'id')
+    )
+    return [
+        {
+            'id': row['id'],
+            'start_date': row['start_date'].isoformat(),
+            'end_date': row['end_date'].isoformat(),
+            'available_slots': max(row['available_slots'], 0),
+            'status': (
+                'closed' if not row['is_available']
+                else 'full' if row['available_slots'] <= 0
+                else 'available'
+            ),
+            'waitlist_length': row['waitlist_length'],
+        }
+        for row in rows
+    ]
@@ -20,6 +20,7 @@ urlpatterns = [
     path('booking-confirmation/<int:booking_id>/', views.booking_confirmation, name='booking_confirmation'),
     path('my-bookings/', views.my_bookings, name='my_bookings'),
     path('cancel-booking/<int:booking_id>/', views.cancel_booking, name='cancel_booking'),
+    path('waitlist/<int:date_id>/leave/', views.leave_tour_waitlist, name='leave_tour_waitlist'),
     
     # Admin URLs
     path('admin/bookings/', views.admin_booking_management, name='admin_booking_management'),
@@ -39,6 +40,8 @@ urlpatterns = [
     
     # API URLs
     path('api/available-slots/<int:date_id>/', views.get_available_slots, name='get_available_slots'),
+    path('api/waitlist-position/<int:date_id>/', views.get_waitlist_position, name='get_waitlist_position'),
+    path('api/availability/', views.availability_calendar, name='availability_calendar'),
     
     # Tourist spots
     path('tourist-spots/', views.tourist_spots, name='tourist_spots'),
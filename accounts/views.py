@@ -1,3 +1,4 @@
+from datetime import datetime
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout
 from django.contrib import messages
@@ -6,9 +7,20 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.views import LoginView
 from django.http import JsonResponse
 from django.core.paginator import Paginator
-from django.db.models import Q, Sum
+from django.db.models import Sum
 from .forms import CustomUserCreationForm, ContactMessageForm
 from .models import StudyTour, TourDate, TourInclusion, StudyTourBooking, ContactMessage
+from .filters import filter_study_tour_bookings
+from .tours import default_tour_id, month_availability, month_etag, recent_bookings_context, tour_page_context
+from .timeline import InvalidCursor, timeline_page, timeline_totals
+from .bookings import (
+    SlotUnavailable, take_slot, free_slot, join_waitlist, leave_waitlist, set_booking_status, waitlist_entries,
+    waitlist_position,
+)
+from django.conf import settings
+from django.db import transaction
+from tourist_spots.notifications import notify, study_tour_booking_notice
+from django.views.decorators.http import condition, require_GET, require_POST
 
 # Custom Login View
 class CustomLoginView(LoginView):
@@ -127,17 +139,17 @@ def tourist_spots(request):
 
 @login_required
 def travel_history(request):
-    """Travel history page view with user's bookings"""
-    bookings = StudyTourBooking.objects.filter(user=request.user).order_by('-booking_date')
-    
-    # Calculate some statistics for the template
-    total_trips = bookings.count()
-    total_spent = bookings.aggregate(total=Sum('total_price'))['total'] or 0
+    """Travel history page: study tour and package bookings on one timeline"""
+    try:
+        entries, next_cursor = timeline_page(request.user, request.GET.get('cursor'))
+    except InvalidCursor:
+        return redirect('travel_history')
     
     context = {
-        'bookings': bookings,
-        'total_trips': total_trips,
-        'total_spent': total_spent,
+        'entries': entries,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor'),
+        **timeline_totals(request.user),
     }
     
     return render(request, 'travel_history.html', context)
@@ -146,28 +158,12 @@ def travel_history(request):
 def study_tour_detail(request, tour_id=None):
     """Study tour package details page"""
     try:
-        if tour_id:
-            study_tour = get_object_or_404(StudyTour, id=tour_id, is_active=True)
-        else:
-            study_tour = StudyTour.objects.filter(is_active=True).first()
-        
-        if not study_tour:
-            return render(request, 'packages.html', {
-                'study_tour': None,
-                'tour_dates': [],
-                'inclusions': [],
-                'database_error': True
-            })
+        # Tour and inclusions come from the cache when it is shared; dates are read fresh
+        tour_id = tour_id or default_tour_id()
+        if not tour_id:
+            raise StudyTour.DoesNotExist('No active study tour.')
         
-        tour_dates = study_tour.dates.filter(is_available=True)
-        inclusions = study_tour.inclusions.all()
-        
-        context = {
-            'study_tour': study_tour,
-            'tour_dates': tour_dates,
-            'inclusions': inclusions,
-            'database_error': False
-        }
+        context = dict(tour_page_context(tour_id), database_error=False)
         
     except Exception as e:
         print(f"Error: {e}")
@@ -178,6 +174,7 @@ def study_tour_detail(request, tour_id=None):
             'database_error': True
         }
     
+    context.update(recent_bookings_context(request.user))
     return render(request, 'packages.html', context)
 
 @login_required
@@ -196,25 +193,26 @@ def book_study_tour(request):
             study_tour = StudyTour.objects.get(id=study_tour_id)
             tour_date = TourDate.objects.get(id=tour_date_id)
             
-            if tour_date.available_slots <= 0:
-                messages.error(request, 'Sorry, no slots available for this date.')
-                return redirect('packages')
-            
             if StudyTourBooking.objects.filter(user=request.user, tour_date=tour_date).exists():
                 messages.warning(request, 'You have already booked this tour date.')
                 return redirect('packages')
             
-            booking = StudyTourBooking.objects.create(
-                user=request.user,
-                study_tour=study_tour,
-                tour_date=tour_date,
-                total_price=study_tour.discounted_price,
-                special_requirements=special_requirements,
-                status='pending'
-            )
-            
-            tour_date.available_slots -= 1
-            tour_date.save()
+            with transaction.atomic():
+                if not take_slot(tour_date.id):
+                    # Full: queue the student instead of making them retry
+                    join_waitlist(request.user, tour_date, special_requirements)
+                    position = waitlist_position(request.user, tour_date.id)
+                    messages.info(request, f'This date is full. You are #{position.place} on the waitlist and will be booked automatically if a slot opens up.')
+                    return redirect('my_bookings')
+                
+                booking = StudyTourBooking.objects.create(
+                    user=request.user,
+                    study_tour=study_tour,
+                    tour_date=tour_date,
+                    total_price=study_tour.discounted_price,
+                    special_requirements=special_requirements,
+                    status='pending'
+                )
             
             messages.success(request, '🎉 Study tour booked successfully! Our coordinator will contact you soon.')
             return redirect('booking_confirmation', booking_id=booking.id)
@@ -235,7 +233,8 @@ def booking_confirmation(request, booking_id):
 def my_bookings(request):
     """View to show all bookings for the current user"""
     bookings = StudyTourBooking.objects.filter(user=request.user).order_by('-booking_date')
-    return render(request, 'my_bookings.html', {'bookings': bookings})
+    waitlist = waitlist_entries(request.user).filter(status='waiting')
+    return render(request, 'my_bookings.html', {'bookings': bookings, 'waitlist': waitlist})
 
 @login_required
 def cancel_booking(request, booking_id):
@@ -243,25 +242,85 @@ def cancel_booking(request, booking_id):
     booking = get_object_or_404(StudyTourBooking, id=booking_id, user=request.user)
     
     if request.method == 'POST':
-        # Restore the slot
-        booking.tour_date.available_slots += 1
-        booking.tour_date.save()
-        
-        # Update booking status
-        booking.status = 'cancelled'
-        booking.save()
+        if booking.status != 'cancelled':
+            with transaction.atomic():
+                booking.status = 'cancelled'
+                booking.save()
+                # The slot goes to the next waitlisted student, if any
+                free_slot(booking.tour_date_id)
         
         messages.success(request, 'Booking cancelled successfully.')
         return redirect('my_bookings')
     
     return render(request, 'cancel_booking.html', {'booking': booking})
 
+@login_required
+@require_POST
+def leave_tour_waitlist(request, date_id):
+    """Remove the student from a tour date's waitlist"""
+    if leave_waitlist(request.user, date_id):
+        messages.success(request, 'You have left the waitlist.')
+    return redirect('my_bookings')
+
 # API Views
 def get_available_slots(request, date_id):
     """API endpoint to get available slots for a tour date"""
     tour_date = get_object_or_404(TourDate, id=date_id)
     return JsonResponse({'available_slots': tour_date.available_slots})
 
+def availability_params(request):
+    """(tour id, first day of month) from ?tour=<id>&month=YYYY-MM, or None if either is invalid"""
+    try:
+        tour_id = int(request.GET.get('tour', ''))
+        month = datetime.strptime(request.GET.get('month', ''), '%Y-%m').date()
+    except ValueError:
+        return None
+    # Ids past a 64-bit integer overflow the database driver, and the month
+    # after December 9999 is not a date
+    if not 0 < tour_id < 2 ** 63 or not 2000 <= month.year <= 2999:
+        return None
+    return tour_id, month
+
+def availability_etag(request):
+    params = availability_params(request)
+    if params is None:
+        return None
+    if settings.SHARED_CACHE:
+        return month_etag(*params)
+    # Without a shared cache the tag is a hash of the dates, read once here for the view too
+    request.availability = month_availability(*params)
+    return month_etag(*params, request.availability)
+
+@require_GET
+@condition(etag_func=availability_etag)
+def availability_calendar(request):
+    """API endpoint: a month of a tour's dates with slots, status and waitlist length"""
+    params = availability_params(request)
+    if params is None:
+        return JsonResponse({'error': 'Use ?tour=<id>&month=YYYY-MM.'}, status=400)
+    tour_id, month = params
+    
+    dates = getattr(request, 'availability', None)
+    if dates is None:
+        dates = month_availability(tour_id, month)
+    response = JsonResponse({'tour': tour_id, 'month': f'{month:%Y-%m}', 'dates': dates})
+    # Browsers revalidate with If-None-Match every time and get a 304 until a slot changes
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+@login_required
+def get_waitlist_position(request, date_id):
+    """API endpoint for the student's place on a tour date's waitlist"""
+    entry = waitlist_position(request.user, date_id)
+    if entry is None:
+        return JsonResponse({'on_waitlist': False})
+    data = {'on_waitlist': entry.status == 'waiting', 'status': entry.status}
+    if entry.status == 'waiting':
+        data['position'] = entry.place
+    else:
+        data['booking_id'] = entry.booking_id
+    return JsonResponse(data)
+
 # Admin Views
 def is_admin(user):
     """Check if user is admin"""
@@ -275,21 +334,7 @@ def admin_booking_management(request):
     search_query = request.GET.get('search', '')
     status_filter = request.GET.get('status', '')
     
-    # Start with all bookings
-    bookings = StudyTourBooking.objects.all().select_related('user', 'study_tour', 'tour_date').order_by('-booking_date')
-    
-    # Apply filters
-    if search_query:
-        bookings = bookings.filter(
-            Q(user__username__icontains=search_query) |
-            Q(user__first_name__icontains=search_query) |
-            Q(user__last_name__icontains=search_query) |
-            Q(user__email__icontains=search_query) |
-            Q(study_tour__name__icontains=search_query)
-        )
-    
-    if status_filter:
-        bookings = bookings.filter(status=status_filter)
+    bookings = filter_study_tour_bookings(request.GET).select_related('user', 'study_tour', 'tour_date').order_by('-booking_date')
     
     # Get counts for statistics
     total_bookings = bookings.count()
@@ -326,10 +371,10 @@ def approve_booking(request, booking_id):
     """Approve a specific booking"""
     if request.method == 'POST':
         try:
-            booking = StudyTourBooking.objects.get(id=booking_id)
-            booking.status = 'confirmed'
-            booking.save()
+            set_booking_status(booking_id, 'confirmed')
             messages.success(request, f'Booking #{booking_id} has been approved.')
+        except SlotUnavailable:
+            messages.error(request, f'Booking #{booking_id} cannot be approved: its tour date is full.')
         except StudyTourBooking.DoesNotExist:
             messages.error(request, f'Booking #{booking_id} not found.')
     
@@ -341,15 +386,11 @@ def pending_booking(request, booking_id):
     """Set booking back to pending status"""
     if request.method == 'POST':
         try:
-            booking = StudyTourBooking.objects.get(id=booking_id)
-            booking.status = 'pending'
-            booking.save()
-            
-            # Restore the slot
-            booking.tour_date.available_slots += 1
-            booking.tour_date.save()
-            
+            # A pending booking still holds its slot; one comes back from cancelled only if the date has room
+            set_booking_status(booking_id, 'pending')
             messages.success(request, f'Booking #{booking_id} has been set to pending.')
+        except SlotUnavailable:
+            messages.error(request, f'Booking #{booking_id} cannot be set to pending: its tour date is full.')
         except StudyTourBooking.DoesNotExist:
             messages.error(request, f'Booking #{booking_id} not found.')
     
@@ -361,13 +402,10 @@ def cancel_booking_admin(request, booking_id):
     """Cancel a booking (admin only)"""
     if request.method == 'POST':
         try:
-            booking = StudyTourBooking.objects.get(id=booking_id)
-            booking.status = 'cancelled'
-            booking.save()
-            
-            # Restore the slot
-            booking.tour_date.available_slots += 1
-            booking.tour_date.save()
+            # The slot goes to the next waitlisted student, if any
+            _, promoted = set_booking_status(booking_id, 'cancelled')
+            if promoted:
+                messages.info(request, f'{promoted.user.username} was moved off the waitlist into booking #{promoted.id}.')
             
             messages.success(request, f'Booking #{booking_id} has been cancelled.')
         except StudyTourBooking.DoesNotExist:
@@ -381,16 +419,10 @@ def restore_booking(request, booking_id):
     """Restore a cancelled booking"""
     if request.method == 'POST':
         try:
-            booking = StudyTourBooking.objects.get(id=booking_id)
-            booking.status = 'pending'
-            booking.save()
-            
-            # Use a slot
-            if booking.tour_date.available_slots > 0:
-                booking.tour_date.available_slots -= 1
-                booking.tour_date.save()
-            
+            set_booking_status(booking_id, 'pending')
             messages.success(request, f'Booking #{booking_id} has been restored to pending status.')
+        except SlotUnavailable:
+            messages.error(request, f'Booking #{booking_id} cannot be restored: its tour date is full.')
         except StudyTourBooking.DoesNotExist:
             messages.error(request, f'Booking #{booking_id} not found.')
     
@@ -415,12 +447,16 @@ def delete_booking(request, booking_id):
 def approve_all_pending(request):
     """Approve all pending bookings"""
     if request.method == 'POST':
-        pending_bookings = StudyTourBooking.objects.filter(status='pending')
+        pending_bookings = StudyTourBooking.objects.filter(status='pending').select_related('user', 'study_tour', 'tour_date')
         count = pending_bookings.count()
         
-        for booking in pending_bookings:
-            booking.status = 'confirmed'
-            booking.save()
+        with transaction.atomic():
+            notices = []
+            for booking in pending_bookings:
+                booking.status = 'confirmed'
+                booking.save()
+                notices.append(study_tour_booking_notice(booking))
+            notify(*notices)
         
         messages.success(request, f'All {count} pending bookings have been approved.')
     
@@ -431,19 +467,20 @@ def approve_all_pending(request):
 def restore_all_cancelled(request):
     """Restore all cancelled bookings"""
     if request.method == 'POST':
-        cancelled_bookings = StudyTourBooking.objects.filter(status='cancelled')
-        count = cancelled_bookings.count()
+        cancelled_ids = list(StudyTourBooking.objects.filter(status='cancelled').order_by('booking_date').values_list('id', flat=True))
+        restored, full = 0, 0
         
-        for booking in cancelled_bookings:
-            booking.status = 'pending'
-            booking.save()
-            
-            # Use a slot
-            if booking.tour_date.available_slots > 0:
-                booking.tour_date.available_slots -= 1
-                booking.tour_date.save()
+        # Oldest first; each restore takes a slot, and bookings on full dates stay cancelled
+        for booking_id in cancelled_ids:
+            try:
+                set_booking_status(booking_id, 'pending')
+                restored += 1
+            except SlotUnavailable:
+                full += 1
         
-        messages.success(request, f'All {count} cancelled bookings have been restored to pending status.')
+        messages.success(request, f'{restored} cancelled bookings have been restored to pending status.')
+        if full:
+            messages.warning(request, f'{full} bookings stayed cancelled because their tour dates are full.')
     
     return redirect('admin_booking_management')
 
@@ -457,21 +494,14 @@ def update_booking_status(request, booking_id):
             new_status = request.POST.get('status')
             
             if new_status in dict(StudyTourBooking.STATUS_CHOICES):
-                # Handle slot management based on status change
-                old_status = booking.status
-                
-                if old_status in ['confirmed', 'pending'] and new_status == 'cancelled':
-                    # Restore slot when cancelling
-                    booking.tour_date.available_slots += 1
-                    booking.tour_date.save()
-                elif old_status == 'cancelled' and new_status in ['confirmed', 'pending']:
-                    # Use slot when restoring from cancelled
-                    if booking.tour_date.available_slots > 0:
-                        booking.tour_date.available_slots -= 1
-                        booking.tour_date.save()
-                
-                booking.status = new_status
-                booking.save()
+                # Takes or frees the slot as needed; a freed slot goes to the waitlist
+                try:
+                    _, promoted = set_booking_status(booking.id, new_status)
+                except SlotUnavailable:
+                    messages.error(request, f'Booking #{booking_id} was not changed: its tour date has no slots left.')
+                    return redirect('admin_booking_management')
+                if promoted:
+                    messages.info(request, f'{promoted.user.username} was moved off the waitlist into booking #{promoted.id}.')
                 messages.success(request, f'Booking #{booking_id} status updated to {new_status}.')
             else:
                 messages.error(request, 'Invalid status.')
@@ -0,0 +1,191 @@
+import logging
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+# Delete a slot only while it still holds this request's token
+RELEASE_SLOT_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Views whose traffic is a booking write; everything not listed here or in
+# ADMIN_URL_NAMES (or served by Django admin) counts as a catalog read.
+BOOKING_URL_NAMES = {
+    'book_package',
+    'book_study_tour',
+    'submit_payment',
+    'cancel_booking',
+    'cancel_package_booking',
+    'leave_tour_waitlist',
+}
+ADMIN_URL_NAMES = {
+    'admin_booking_management', 'approve_booking', 'pending_booking', 'cancel_booking_admin',
+    'restore_booking', 'delete_booking', 'approve_all_pending', 'restore_all_cancelled',
+    'update_booking_status', 'admin_package_bookings', 'approve_package_booking',
+    'reject_package_booking', 'batch_package_bookings', 'verify_payment', 'reject_payment', 'admin_travel_requests',
+    'approve_travel_request', 'reject_travel_request', 'delete_travel_request',
+    'mark_message_read', 'mark_message_replied', 'delete_message', 'add_package',
+    'edit_package', 'delete_package', 'select_package_category', 'manage_spots',
+    'export_data', 'queue_export', 'export_jobs', 'download_export',
+    'payment_queue', 'claim_payment_batch', 'release_payment_claims', 'payment_queue_stats',
+    'broadcasts', 'broadcast_progress', 'retry_broadcast',
+    'reports', 'reports_data', 'api_changes',
+}
+
+
+def route_class(resolver_match):
+    if resolver_match.url_name in BOOKING_URL_NAMES:
+        return 'booking'
+    if resolver_match.url_name in ADMIN_URL_NAMES or resolver_match.app_name == 'admin':
+        return 'admin'
+    return 'catalog'
+
+
+class AdmissionControlMiddleware:
+    """Shed load before it reaches the view when the workers are saturated.
+
+    Each route class (booking, admin, catalog) may only occupy
+    ADMISSION_CONCURRENCY[class] workers at once; the slots live in the cache,
+    and expire after ADMISSION_SLOT_TIMEOUT in case a worker dies mid-request.
+    A streamed response holds its slot until its body has been sent. Each
+    slot stores a random token for the request holding it, and is released
+    only while it still holds that token: a request that outlived the timeout
+    must not free a slot a newer request has taken since.
+    Booking writes are also rate limited per user with a sliding window
+    counter (ADMISSION_RATE_LIMITS). Refused requests get an immediate 503 or
+    429 with Retry-After. Only a shared cache (REDIS_URL) makes the limits
+    apply across gunicorn workers; with the in-process cache each worker
+    counts on its own.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'ADMISSION_CONTROL_ENABLED', True)
+        self.concurrency = getattr(settings, 'ADMISSION_CONCURRENCY', {})
+        self.rate_limits = getattr(settings, 'ADMISSION_RATE_LIMITS', {})
+        self.slot_timeout = getattr(settings, 'ADMISSION_SLOT_TIMEOUT', 30)
+        self.retry_after = getattr(settings, 'ADMISSION_RETRY_AFTER', 5)
+        if self.enabled and not settings.DEBUG and not getattr(settings, 'SHARED_CACHE', False):
+            logger.warning('Admission control limits are per process: set REDIS_URL to share them between workers')
+
+    def __call__(self, request):
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            slot = getattr(request, '_admission_slot', None)
+            if slot:
+                key, token = slot
+                if response is not None and response.streaming:
+                    # The body is sent after we return; the server calls
+                    # close() once it is done (or the client went away)
+                    response._resource_closers.append(lambda: self._cache_call(self.release_slot, key, token))
+                else:
+                    self._cache_call(self.release_slot, key, token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self.enabled or request.resolver_match is None:
+            return None
+        match = request.resolver_match
+
+        if request.method == 'POST' and match.url_name in self.rate_limits:
+            wait = self.rate_limit_wait(request, match.url_name)
+            if wait:
+                return self.refuse(429, 'Too many requests. Please wait a moment and try again.', wait)
+
+        klass = route_class(match)
+        limit = self.concurrency.get(klass)
+        if limit:
+            slot = self.acquire_slot(klass, limit)
+            if slot is None:
+                logger.warning('Shedding %s request to %s: %d slots busy', klass, request.path, limit)
+                return self.refuse(503, 'The site is very busy right now. Please try again in a few seconds.',
+                                   self.retry_after)
+            request._admission_slot = slot
+        return None
+
+    def acquire_slot(self, klass, limit):
+        """Claim a free in-flight slot for the route class.
+
+        Returns (key, token), None when all are taken, or () when the cache
+        is unavailable.
+        """
+        keys = [f'admission:slot:{klass}:{i}' for i in range(limit)]
+        taken = self._cache_call(cache.get_many, keys)
+        if taken is None:
+            # Cache unavailable: admit rather than fail every request
+            return ()
+        free = [key for key in keys if key not in taken]
+        random.shuffle(free)
+        token = random.getrandbits(62)
+        for key in free:
+            if self._cache_call(cache.add, key, token, self.slot_timeout):
+                return key, token
+        return None
+
+    def release_slot(self, key, token):
+        client = getattr(getattr(cache, '_cache', None), 'get_client', None)
+        if client is not None:
+            # RedisCache: compare and delete in one step (ints are stored as plain numbers)
+            full_key = cache.make_and_validate_key(key)
+            client(full_key, write=True).eval(RELEASE_SLOT_SCRIPT, 1, full_key, token)
+        elif cache.get(key) == token:
+            # The in-process cache is only shared with this worker's threads,
+            # where the gap between the check and the delete is negligible
+            cache.delete(key)
+
+    def rate_limit_wait(self, request, url_name):
+        """Rate limit per user (or IP) and view; returns seconds to wait, or 0 if admitted.
+
+        Requests are counted per window of per_seconds with cache.add/incr, so
+        concurrent requests never overwrite each other's count. The previous
+        window's count is weighted by how much of it still overlaps the last
+        per_seconds, which smooths the burst a fixed window allows at its edge.
+        """
+        capacity, per_seconds = self.rate_limits[url_name]
+        if request.user.is_authenticated:
+            who = f'user:{request.user.pk}'
+        else:
+            who = f'ip:{request.META.get("REMOTE_ADDR", "")}'
+        now = time.time()
+        window, elapsed = divmod(now, per_seconds)
+        key = f'admission:rate:{url_name}:{who}:{int(window)}'
+
+        self._cache_call(cache.add, key, 0, per_seconds * 2)
+        count = self._cache_call(cache.incr, key)
+        if count is None:
+            # Cache unavailable (or the key was evicted): admit
+            return 0
+        previous = self._cache_call(cache.get, f'admission:rate:{url_name}:{who}:{int(window) - 1}') or 0
+        overlap = (per_seconds - elapsed) / per_seconds
+        if previous * overlap + count <= capacity:
+            return 0
+
+        # Refused requests do not count against the limit
+        self._cache_call(cache.decr, key)
+        if count > capacity or not previous:
+            return math.ceil(per_seconds - elapsed)
+        # Wait until enough of the previous window has slid out
+        return max(math.ceil(per_seconds - elapsed - (capacity - count) * per_seconds / previous), 1)
+
+    def refuse(self, status, message, retry_after):
+        response = HttpResponse(message, status=status, content_type='text/plain; charset=utf-8')
+        response['Retry-After'] = str(retry_after)
+        return response
+
+    def _cache_call(self, method, *args):
+        try:
+            return method(*args)
+        except Exception:
+            logger.exception('Admission control cache call failed')
+            return None
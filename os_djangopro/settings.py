@@ -34,6 +34,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'os_djangopro.middleware.AdmissionControlMiddleware',
 ]
 
 ROOT_URLCONF = 'os_djangopro.urls'
@@ -69,6 +70,10 @@ else:
             'NAME': BASE_DIR / 'db.sqlite3',
         }
     }
+# SQLite's default in-memory test database cannot take writes from several
+# threads at once; the threaded tests (tourist_spots.tests) need a file
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default'].setdefault('TEST', {}).setdefault('NAME', BASE_DIR / 'test_db.sqlite3')
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -95,10 +100,12 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-# WhiteNoise configuration for serving static files in production
+# WhiteNoise configuration for serving static files in production.
+# collectstatic writes content-hashed copies (served with immutable cache headers)
+# plus precompressed .gz and .br variants.
 STORAGES = {
     "staticfiles": {
-        "BACKEND": "whitenoise.storage.CompressedStaticFilesStorage",
+        "BACKEND": "os_djangopro.storage.StaticFilesStorage",
     },
     "default": {
         "BACKEND": "django.core.files.storage.FileSystemStorage",
@@ -108,12 +115,89 @@ STORAGES = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# The logged-in user is loaded from the cache; saving a User invalidates the entry.
+# ModelBackend stays listed so sessions created before the cached backend (which
+# name ModelBackend) remain logged in; new logins all go through the first entry.
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+AUTH_USER_CACHE_TIMEOUT = 60
+
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
 LOGIN_URL = 'login'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache: Redis when REDIS_URL is set (shared by all workers), in-process memory otherwise
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+# Only a shared cache sees every worker's writes; cached data that other
+# workers must see invalidated (versions, ETags) is kept only when this is set
+SHARED_CACHE = bool(REDIS_URL)
+
+# Sessions: stored in the database, read through the cache when it is shared
+# (default), or kept entirely in a signed cookie with SESSION_BACKEND=signed_cookies
+if os.environ.get('SESSION_BACKEND') == 'signed_cookies':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
+else:
+    SESSION_ENGINE = 'accounts.sessions'
+
+# Flash messages travel in a cookie so they never force a session write
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Admission control: in-flight requests allowed per route class, and rate
+# limits (requests, per seconds) for booking writes per user. The counters
+# live in the cache, so they cover all workers only with REDIS_URL set; with
+# the in-process cache each worker enforces them on its own. Keep the class
+# limits below the gunicorn worker count (WEB_CONCURRENCY) so a booking surge
+# cannot take every worker.
+ADMISSION_CONTROL_ENABLED = os.environ.get('ADMISSION_CONTROL', 'on') != 'off'
+ADMISSION_CONCURRENCY = {
+    'booking': int(os.environ.get('ADMISSION_BOOKING_CONCURRENCY', 4)),
+    'admin': int(os.environ.get('ADMISSION_ADMIN_CONCURRENCY', 2)),
+    'catalog': int(os.environ.get('ADMISSION_CATALOG_CONCURRENCY', 16)),
+}
+ADMISSION_RATE_LIMITS = {
+    'book_package': (5, 60),
+    'book_study_tour': (5, 60),
+    'submit_payment': (3, 60),
+}
+ADMISSION_SLOT_TIMEOUT = 30
+ADMISSION_RETRY_AFTER = 5
+
+# Email: status-change notifications are queued in the outbox and sent by
+# `manage.py send_outbox`. Console output by default; set EMAIL_BACKEND to
+# django.core.mail.backends.smtp.EmailBackend (plus EMAIL_HOST etc.) to deliver,
+# or to the filebased/locmem backend for testing.
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 587))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'on') != 'off'
+EMAIL_TIMEOUT = 30
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', BASE_DIR / 'sent_emails')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', "Wond'r NEUB <noreply@neub.edu.bd>")
+OUTBOX_BATCH_SIZE = 200
+OUTBOX_MAX_ATTEMPTS = 5
+
+# How long a booking/payment idempotency key replays its stored response
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+
 # Security settings for production
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
@@ -0,0 +1,115 @@
+import os
+import re
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+# Resized variants generated for raster images under images/
+IMAGE_VARIANT_WIDTHS = (640, 1280, 1920)
+IMAGE_VARIANT_FORMATS = ('avif', 'webp')
+IMAGE_VARIANT_QUALITY = {'avif': 55, 'webp': 78}
+RASTER_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+SVG_NUMERIC_ATTR_RE = re.compile(
+    r'(\s(?:d|points|transform|viewBox|x|y|x1|x2|y1|y2|cx|cy|r|rx|ry|width|height|stroke-width)=")([^"]*)"'
+)
+SVG_DECIMAL_RE = re.compile(r'-?\d*\.\d{3,}')
+
+
+def variant_name(name, width, fmt):
+    """images/img1.jpeg -> images/img1-1280w.webp"""
+    root, _ = os.path.splitext(name)
+    return f'{root}-{width}w.{fmt}'
+
+
+def is_variant_source(name):
+    return name.startswith('images/') and name.lower().endswith(RASTER_EXTENSIONS)
+
+
+def minify_svg(content):
+    """Strip comments/metadata/indentation and round coordinates to 2 decimals"""
+    content = re.sub(r'<!--.*?-->', '', content, flags=re.S)
+    content = re.sub(r'<metadata\b.*?</metadata>', '', content, flags=re.S)
+    content = re.sub(r'>\s+<', '><', content)
+
+    def round_decimal(match):
+        text = f'{float(match.group(0)):.2f}'.rstrip('0').rstrip('.')
+        return '0' if text in ('-0', '') else text
+
+    def shrink_attr(match):
+        return match.group(1) + SVG_DECIMAL_RE.sub(round_decimal, match.group(2)) + '"'
+
+    return SVG_NUMERIC_ATTR_RE.sub(shrink_attr, content).strip()
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """Content-hashed, precompressed static files (collectstatic writes .gz and .br copies).
+
+    Before hashing, post_process also minifies SVGs and writes resized
+    AVIF/WebP variants of every raster image under images/ (see
+    variant_name); accounts.templatetags.image_tags picks between them.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = dict(paths)
+            for name in list(paths):
+                if name.lower().endswith('.svg'):
+                    self._minify_svg(name)
+                    # Hash and compress the minified copy, not the source file
+                    paths[name] = (self, name)
+                elif is_variant_source(name):
+                    for variant in self._build_image_variants(name):
+                        paths[variant] = (self, variant)
+        yield from super().post_process(paths, dry_run, **options)
+
+    def _replace(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
+
+    def _minify_svg(self, name):
+        with self.open(name) as f:
+            content = f.read().decode('utf-8')
+        minified = minify_svg(content)
+        if minified != content:
+            self._replace(name, minified.encode('utf-8'))
+
+    def _build_image_variants(self, name):
+        from PIL import Image, features
+
+        with self.open(name) as f:
+            source_width = Image.open(f).width
+        # Never upscale: widths below the source, plus the source width itself
+        # when it is within range
+        widths = [w for w in IMAGE_VARIANT_WIDTHS if w < source_width]
+        if source_width <= IMAGE_VARIANT_WIDTHS[-1]:
+            widths.append(source_width)
+
+        source_mtime = self.get_modified_time(name)
+        image = None
+        variants = []
+        for fmt in IMAGE_VARIANT_FORMATS:
+            if not features.check(fmt):
+                continue
+            for width in widths:
+                target = variant_name(name, width, fmt)
+                variants.append(target)
+                # Encoding is slow (AVIF especially); keep variants newer than the source
+                if self.exists(target) and self.get_modified_time(target) >= source_mtime:
+                    continue
+                if image is None:
+                    with self.open(name) as f:
+                        image = Image.open(f)
+                        image.load()
+                    if image.mode not in ('RGB', 'RGBA'):
+                        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+                resized = image
+                if width < image.width:
+                    height = round(image.height * width / image.width)
+                    resized = image.resize((width, height), Image.LANCZOS)
+                buffer = BytesIO()
+                resized.save(buffer, format=fmt.upper(), quality=IMAGE_VARIANT_QUALITY[fmt])
+                self._replace(target, buffer.getvalue())
+        return variants
@@ -5,6 +5,8 @@ from accounts.views import study_tour_detail, book_study_tour, booking_confirmat
 from accounts.views import admin_booking_management, approve_booking, pending_booking, cancel_booking_admin
 from accounts.views import restore_booking, delete_booking, approve_all_pending, restore_all_cancelled
 from accounts.views import update_booking_status, get_available_slots, tourist_spots
+from accounts.views import leave_tour_waitlist, get_waitlist_position, availability_calendar
+from tourist_spots.views import api_changes
 
 urlpatterns = [
     # Basic pages
@@ -24,6 +26,7 @@ urlpatterns = [
     path('booking-confirmation/<int:booking_id>/', booking_confirmation, name='booking_confirmation'),
     path('my-bookings/', my_bookings, name='my_bookings'),
     path('cancel-booking/<int:booking_id>/', cancel_booking, name='cancel_booking'),
+    path('waitlist/<int:date_id>/leave/', leave_tour_waitlist, name='leave_tour_waitlist'),
     
     # Admin URLs
     path('admin/bookings/', admin_booking_management, name='admin_booking_management'),
@@ -38,6 +41,9 @@ urlpatterns = [
     
     # API URLs
     path('api/available-slots/<int:date_id>/', get_available_slots, name='get_available_slots'),
+    path('api/waitlist-position/<int:date_id>/', get_waitlist_position, name='get_waitlist_position'),
+    path('api/availability/', availability_calendar, name='availability_calendar'),
+    path('api/v1/changes/', api_changes, name='api_changes'),
     
     # Include Django admin
     path('admin/', admin.site.urls),
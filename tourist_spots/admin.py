@@ -1,8 +1,19 @@
 from django.contrib import admin
-from .models import TouristSpot
+from .models import TouristSpot, ApiToken
 
 @admin.register(TouristSpot)
 class TouristSpotAdmin(admin.ModelAdmin):
     list_display = ['name', 'created_by', 'created_at']
     list_filter = ['created_at']
-    search_fields = ['name', 'description']
\ No newline at end of file
+    search_fields = ['name', 'description']
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    """Tokens are created with `manage.py create_api_token`; here they can be deactivated"""
+    list_display = ['name', 'is_active', 'created_by', 'created_at', 'last_used_at']
+    list_filter = ['is_active']
+    fields = ['name', 'is_active', 'created_by', 'created_at', 'last_used_at']
+    readonly_fields = ['created_by', 'created_at', 'last_used_at']
+
+    def has_add_permission(self, request):
+        return False
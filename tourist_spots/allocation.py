@@ -0,0 +1,137 @@
+"""Seat allocation for oversubscribed packages.
+
+A policy orders a package's pending bookings behind the ones already
+waitlisted (which keep their place, oldest first); seats are then handed out
+in that order until the package is full, and every booking that did not get a
+seat is waitlisted. Bookings are read once as plain rows and written back
+with a few set-based UPDATEs, so packages with tens of thousands of pending
+bookings allocate in seconds.
+"""
+import random
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .bookings import UNDECIDED_STATUSES
+from .models import PackageBooking, TourPackage
+from .notifications import notify, package_booking_notice
+
+POLICIES = ('fifo', 'lottery', 'quota')
+UPDATE_BATCH_SIZE = 2000
+
+
+def department_key(candidate):
+    return candidate['department'].strip().upper()
+
+
+def order_fifo(candidates, **options):
+    return sorted(candidates, key=lambda c: (c['created_at'], c['id']))
+
+
+def order_lottery(candidates, weights=None, seed=None, **options):
+    """Weighted random order without replacement (Efraimidis-Spirakis keys).
+
+    A booking's weight comes from its department (default 1), so a department
+    weighted 2 is twice as likely to be drawn ahead of one weighted 1.
+    """
+    rng = random.Random(seed)
+    weights = weights or {}
+    for candidate in candidates:
+        weight = weights.get(department_key(candidate), 1)
+        candidate['lottery_key'] = rng.random() ** (1 / weight) if weight > 0 else 0
+    return sorted(candidates, key=lambda c: (-c['lottery_key'], c['id']))
+
+
+def order_quota(candidates, quotas=None, **options):
+    """FIFO within each department, with up to quotas[department] seats set aside for it.
+
+    Bookings inside their department's quota come first; the rest follow in
+    FIFO order and compete for whatever seats the quotas leave over.
+    """
+    quotas = quotas or {}
+    used = {}
+    within, beyond = [], []
+    for candidate in order_fifo(candidates):
+        department = department_key(candidate)
+        if used.get(department, 0) + candidate['num_persons'] <= quotas.get(department, 0):
+            used[department] = used.get(department, 0) + candidate['num_persons']
+            within.append(candidate)
+        else:
+            beyond.append(candidate)
+    return within + beyond
+
+
+ORDERINGS = {
+    'fifo': order_fifo,
+    'lottery': order_lottery,
+    'quota': order_quota,
+}
+
+
+def allocate_package(package_id, policy, dry_run=False, **options):
+    """Approve waitlisted, then pending, bookings up to the package's capacity and waitlist the rest.
+
+    Runs in one transaction with the package and its undecided bookings
+    locked. Returns the package, the seats that were free, and every
+    booking with its rank and decision, for the audit report.
+    """
+    with transaction.atomic():
+        package = TourPackage.objects.select_for_update().get(pk=package_id)
+        if package.capacity is None:
+            raise ValueError(f'{package.name} has no seat capacity set.')
+
+        candidates = list(
+            PackageBooking.objects.select_for_update()
+            .filter(package=package, status__in=UNDECIDED_STATUSES)
+            .values('id', 'status', 'created_at', 'student_id', 'student_name', 'department', 'num_persons')
+        )
+        # Bookings waitlisted by an earlier run are first in line, in their original order
+        waitlisted = order_fifo([c for c in candidates if c['status'] == 'waitlisted'])
+        pending = [c for c in candidates if c['status'] == 'pending']
+        candidates = waitlisted + ORDERINGS[policy](pending, **options)
+
+        remaining = seats_free = package.seats_remaining
+        for rank, candidate in enumerate(candidates, 1):
+            candidate['rank'] = rank
+            if candidate['num_persons'] <= remaining:
+                candidate['decision'] = 'approved'
+                candidate['reason'] = ''
+                remaining -= candidate['num_persons']
+            else:
+                candidate['decision'] = 'waitlisted'
+                candidate['reason'] = (
+                    'no seats left' if remaining == 0
+                    else f'group of {candidate["num_persons"]}, {remaining} seat(s) left'
+                )
+
+        allocation = {
+            'package': package,
+            'policy': policy,
+            'seats_free': seats_free,
+            'seats_allocated': seats_free - remaining,
+            'candidates': candidates,
+        }
+        if not dry_run:
+            apply_allocation(allocation)
+    return allocation
+
+
+def apply_allocation(allocation):
+    package = allocation['package']
+    seats = allocation['seats_allocated']
+    if seats:
+        TourPackage.objects.filter(pk=package.pk).update(seats_reserved=F('seats_reserved') + seats)
+
+    now = timezone.now()
+    for status in ('approved', 'waitlisted'):
+        # Bookings already waitlisted and staying so are left alone (and not emailed again)
+        ids = [c['id'] for c in allocation['candidates'] if c['decision'] == status and c['status'] != status]
+        for start in range(0, len(ids), UPDATE_BATCH_SIZE):
+            batch = ids[start:start + UPDATE_BATCH_SIZE]
+            PackageBooking.objects.filter(id__in=batch).update(status=status, status_changed_at=now, updated_at=now)
+            # Every student hears the outcome; queued in this transaction, sent by send_outbox
+            notify(*[
+                package_booking_notice(booking)
+                for booking in PackageBooking.objects.filter(id__in=batch).select_related('package')
+            ])
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class TouristSpotsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'tourist_spots'
\ No newline at end of file
+    name = 'tourist_spots'
+
+    def ready(self):
+        from . import signals  # noqa: F401
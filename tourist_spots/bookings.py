@@ -0,0 +1,221 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import NotificationWatermark, PackageBooking, TourPackage
+from .notifications import notify, package_booking_notice
+
+# Batch actions and the status each one moves a pending booking to
+BATCH_ACTIONS = {
+    'approve': 'approved',
+    'reject': 'rejected',
+}
+# Bookings still waiting for a decision; seat allocation moves pending ones to waitlisted
+UNDECIDED_STATUSES = ('pending', 'waitlisted')
+# Decisions shown to the student as new until they have seen them
+NOTIFY_STATUSES = ('approved', 'rejected', 'waitlisted')
+# Session copy of the student's watermark, so reads never need to touch the table
+SEEN_AT_SESSION_KEY = 'package_bookings_seen_at'
+
+
+class SeatsUnavailable(Exception):
+    """The package does not have enough unreserved seats for the booking"""
+
+    def __init__(self, package, seats):
+        self.package = package
+        self.seats = seats
+        super().__init__(f'Only {package.seats_remaining} seat(s) left on {package.name}; {seats} requested.')
+
+
+def reserve_seats(package_id, seats):
+    """Take seats from a package's inventory; False if they are not available.
+
+    The capacity check and the increment are one conditional UPDATE, so
+    concurrent approvals can never reserve more seats than the package has.
+    """
+    has_room = Q(capacity__isnull=True) | Q(capacity__gte=F('seats_reserved') + seats)
+    return bool(TourPackage.objects.filter(has_room, pk=package_id).update(seats_reserved=F('seats_reserved') + seats))
+
+
+def release_seats(package_id, seats):
+    """Return seats to a package's inventory and hand them to the waitlist"""
+    released = TourPackage.objects.filter(pk=package_id, seats_reserved__gte=seats).update(
+        seats_reserved=F('seats_reserved') - seats
+    )
+    if released:
+        promote_waitlist(package_id)
+
+
+@transaction.atomic
+def promote_waitlist(package_id):
+    """Approve waitlisted bookings, oldest first, while their groups still fit.
+
+    A group too large for the seats left is skipped so a smaller one behind
+    it can take them, as seat allocation does. Returns the approved bookings.
+    """
+    waitlisted = (
+        PackageBooking.objects.select_for_update()
+        .filter(package_id=package_id, status='waitlisted')
+        .select_related('package')
+        .order_by('created_at', 'id')
+    )
+    promoted = []
+    now = timezone.now()
+    for booking in waitlisted:
+        if not reserve_seats(package_id, booking.num_persons):
+            continue
+        booking.status = 'approved'
+        booking.status_changed_at = now
+        booking.save(update_fields=['status', 'status_changed_at', 'updated_at'])
+        promoted.append(booking)
+    notify(*[package_booking_notice(booking) for booking in promoted])
+    return promoted
+
+
+@transaction.atomic
+def set_booking_status(booking_id, status, admin_notes=None):
+    """Change one booking's status, reserving or releasing its seats.
+
+    A booking holds num_persons seats while it is approved. Raises
+    SeatsUnavailable (and leaves the booking unchanged) if approving it
+    would overbook the package.
+    """
+    booking = PackageBooking.objects.select_for_update().select_related('package').get(pk=booking_id)
+    was_approved = booking.status == 'approved'
+    if status == 'approved' and not was_approved:
+        if not reserve_seats(booking.package_id, booking.num_persons):
+            booking.package.refresh_from_db(fields=['capacity', 'seats_reserved'])
+            raise SeatsUnavailable(booking.package, booking.num_persons)
+    elif was_approved and status != 'approved':
+        release_seats(booking.package_id, booking.num_persons)
+
+    booking.status = status
+    booking.status_changed_at = timezone.now()
+    update_fields = ['status', 'status_changed_at', 'updated_at']
+    if admin_notes is not None:
+        booking.admin_notes = admin_notes
+        update_fields.append('admin_notes')
+    booking.save(update_fields=update_fields)
+    notify(package_booking_notice(booking))
+    return booking
+
+
+def batch_update_bookings(booking_ids, action, admin_notes=''):
+    """Move many pending or waitlisted bookings to approved/rejected with one UPDATE.
+
+    The requested rows are locked and read once to decide each id's outcome;
+    every pending one is then changed by a single statement. Approvals take
+    seats oldest booking first, with one seat UPDATE for all packages;
+    bookings that no longer fit are left pending. Returns {booking_id: outcome},
+    where outcome is the new status, 'no_seats', 'already_<status>' for
+    bookings that were already decided, or 'not_found'.
+    """
+    new_status = BATCH_ACTIONS[action]
+    booking_ids = list(dict.fromkeys(booking_ids))
+    outcomes = {}
+    with transaction.atomic():
+        bookings = list(
+            PackageBooking.objects.select_for_update()
+            .filter(id__in=booking_ids)
+            .order_by('created_at', 'id')
+            .values_list('id', 'status', 'package_id', 'num_persons')
+        )
+        current = {booking_id: status for booking_id, status, _, _ in bookings}
+        pending = [b for b in bookings if b[1] in UNDECIDED_STATUSES]
+
+        if new_status == 'approved' and pending:
+            pending = allocate_seats(pending, outcomes)
+
+        now = timezone.now()
+        fields = {'status': new_status, 'status_changed_at': now, 'updated_at': now}
+        if admin_notes:
+            fields['admin_notes'] = admin_notes
+        changed_ids = [b[0] for b in pending]
+        PackageBooking.objects.filter(id__in=changed_ids, status__in=UNDECIDED_STATUSES).update(**fields)
+        notify(*[
+            package_booking_notice(booking)
+            for booking in PackageBooking.objects.filter(id__in=changed_ids).select_related('package')
+        ])
+
+    for booking_id in booking_ids:
+        status = current.get(booking_id)
+        if booking_id in outcomes:
+            continue
+        if status is None:
+            outcomes[booking_id] = 'not_found'
+        elif status in UNDECIDED_STATUSES:
+            outcomes[booking_id] = new_status
+        else:
+            outcomes[booking_id] = f'already_{status}'
+    return {booking_id: outcomes[booking_id] for booking_id in booking_ids}
+
+
+def allocate_seats(pending, outcomes):
+    """Reserve seats for as many of the pending bookings as fit; returns those that got them"""
+    package_ids = {package_id for _, _, package_id, _ in pending}
+    remaining = {
+        package.pk: package.seats_remaining
+        for package in TourPackage.objects.select_for_update().filter(pk__in=package_ids).only(
+            'id', 'capacity', 'seats_reserved'
+        )
+    }
+    taken = dict.fromkeys(package_ids, 0)
+    approved = []
+    for booking in pending:
+        booking_id, _, package_id, seats = booking
+        left = remaining[package_id]
+        if left is not None and taken[package_id] + seats > left:
+            outcomes[booking_id] = 'no_seats'
+            continue
+        taken[package_id] += seats
+        approved.append(booking)
+
+    taken = {package_id: seats for package_id, seats in taken.items() if seats}
+    if taken:
+        increment = Case(
+            *[When(pk=package_id, then=Value(seats)) for package_id, seats in taken.items()],
+            output_field=IntegerField(),
+        )
+        TourPackage.objects.filter(pk__in=taken).update(seats_reserved=F('seats_reserved') + increment)
+    return approved
+
+
+def bookings_seen_at(request):
+    """The newest booking decision this student has seen, or None if they have seen none.
+
+    Read from the database once per session and kept in the session after that.
+    """
+    if SEEN_AT_SESSION_KEY not in request.session:
+        seen_at = (
+            NotificationWatermark.objects.filter(user=request.user)
+            .values_list('package_bookings_seen_at', flat=True)
+            .first()
+        )
+        request.session[SEEN_AT_SESSION_KEY] = seen_at.isoformat() if seen_at else ''
+    return parse_datetime(request.session[SEEN_AT_SESSION_KEY]) if request.session[SEEN_AT_SESSION_KEY] else None
+
+
+def unseen_bookings(bookings, seen_at):
+    """The bookings whose latest decision is newer than seen_at"""
+    return [
+        b for b in bookings
+        if b.status in NOTIFY_STATUSES and b.status_changed_at and (seen_at is None or b.status_changed_at > seen_at)
+    ]
+
+
+def acknowledge_bookings(request, seen_at):
+    """Move the student's watermark up to seen_at.
+
+    One conditional UPDATE, so a stale session or another tab can never move
+    it backwards; the row is only created the first time.
+    """
+    moved = NotificationWatermark.objects.filter(
+        user=request.user, package_bookings_seen_at__lt=seen_at
+    ).update(package_bookings_seen_at=seen_at)
+    if not moved:
+        watermark, _ = NotificationWatermark.objects.get_or_create(
+            user=request.user, defaults={'package_bookings_seen_at': seen_at}
+        )
+        seen_at = max(seen_at, watermark.package_bookings_seen_at)
+    request.session[SEEN_AT_SESSION_KEY] = seen_at.isoformat()
@@ -0,0 +1,126 @@
+"""Broadcast messages to everyone booked on a package or study tour date.
+
+Creating a broadcast only counts its recipients; the emails are written to
+the outbox in the background by `manage.py send_outbox`, so an admin request
+returns immediately however many students are booked. Recipients are read
+with one streamed query in email order and written in chunks, each chunk
+committed together with the broadcast's cursor, so a broadcast that fails
+part-way resumes where it stopped instead of emailing anyone twice. A run
+that stalls past Broadcast.FAN_OUT_LEASE can be requeued; each chunk and the
+final status are only written while the run still owns the broadcast (the
+same started_at), so a stalled worker that wakes up stops without sending.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Count
+from django.template.loader import get_template
+from django.utils import timezone
+
+from accounts.models import StudyTourBooking
+
+from .models import Broadcast, OutboxMessage, PackageBooking
+
+logger = logging.getLogger(__name__)
+
+
+class FanOutSuperseded(Exception):
+    """The broadcast was requeued and claimed by another run"""
+
+FAN_OUT_CHUNK_SIZE = 1000
+
+
+def recipient_emails(broadcast, after=''):
+    """Distinct emails of the target's approved/confirmed bookings, in order, after the given email"""
+    if broadcast.package_id:
+        emails = PackageBooking.objects.filter(package_id=broadcast.package_id, status='approved').values_list('email', flat=True)
+        field = 'email'
+    else:
+        emails = StudyTourBooking.objects.filter(tour_date_id=broadcast.tour_date_id, status='confirmed').values_list('user__email', flat=True)
+        field = 'user__email'
+    emails = emails.exclude(**{field: ''}).order_by(field).distinct()
+    if after:
+        emails = emails.filter(**{f'{field}__gt': after})
+    return emails
+
+
+def broadcast_body(broadcast):
+    return get_template('emails/broadcast.txt').render({'broadcast': broadcast, 'target': broadcast.target})
+
+
+def fan_out(broadcast, chunk_size=FAN_OUT_CHUNK_SIZE):
+    """Write one outbox message per recipient not yet reached, chunk by chunk"""
+    body = broadcast_body(broadcast)
+    chunk = []
+    for email in recipient_emails(broadcast, after=broadcast.cursor).iterator(chunk_size=chunk_size):
+        chunk.append(email)
+        if len(chunk) >= chunk_size:
+            queue_chunk(broadcast, body, chunk)
+            chunk = []
+    if chunk:
+        queue_chunk(broadcast, body, chunk)
+
+
+@transaction.atomic
+def queue_chunk(broadcast, body, emails):
+    # Lock the row and check this run still owns it, so a requeued broadcast's
+    # old worker cannot write recipients the new run will also reach
+    owned = Broadcast.objects.select_for_update().filter(
+        id=broadcast.id, status='running', started_at=broadcast.started_at,
+    )
+    if not owned.exists():
+        raise FanOutSuperseded(f'Broadcast {broadcast.id} was resumed by another run')
+    OutboxMessage.objects.bulk_create([
+        OutboxMessage(
+            event='broadcast', recipient=email, subject=broadcast.subject, body=body, broadcast=broadcast,
+        )
+        for email in emails
+    ])
+    broadcast.cursor = emails[-1]
+    broadcast.fanned_out += len(emails)
+    broadcast.save(update_fields=['cursor', 'fanned_out'])
+
+
+def run_queued_broadcasts():
+    """Fan out every queued broadcast; returns how many were processed"""
+    processed = 0
+    for broadcast_id in Broadcast.objects.filter(status='queued').order_by('created_at').values_list('id', flat=True):
+        # Claim the broadcast; another worker may have taken it already
+        claimed = Broadcast.objects.filter(id=broadcast_id, status='queued').update(
+            status='running', started_at=timezone.now()
+        )
+        if not claimed:
+            continue
+        broadcast = Broadcast.objects.select_related('package', 'tour_date__study_tour').get(id=broadcast_id)
+        try:
+            fan_out(broadcast)
+            broadcast.status = 'done'
+            broadcast.error = ''
+        except FanOutSuperseded:
+            logger.warning('Broadcast %s was resumed elsewhere; stopping this run', broadcast.id)
+            continue
+        except Exception as exc:
+            logger.exception('Broadcast %s failed', broadcast.id)
+            broadcast.status = 'failed'
+            broadcast.error = str(exc)
+        Broadcast.objects.filter(id=broadcast.id, started_at=broadcast.started_at).update(
+            status=broadcast.status, error=broadcast.error, finished_at=timezone.now(),
+        )
+        processed += 1
+    return processed
+
+
+def delivery_progress(broadcasts):
+    """{broadcast id: {'pending', 'sent', 'failed'}} outbox counts, in one query"""
+    progress = {b.id: {'pending': 0, 'sent': 0, 'failed': 0} for b in broadcasts}
+    rows = (
+        OutboxMessage.objects.filter(broadcast__in=list(progress))
+        .values('broadcast', 'status')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    for row in rows:
+        # 'sending' is still on its way
+        key = row['status'] if row['status'] in ('sent', 'failed') else 'pending'
+        progress[row['broadcast']][key] += row['count']
+    return progress
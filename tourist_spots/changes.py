@@ -0,0 +1,187 @@
+"""Change feed for external systems (finance/ERP).
+
+Every synced model is read in (updated_at, id) order off its composite
+index, and deletions come from ChangeTombstone rows written by post_delete
+receivers. The sources are merged into one stream ordered by
+(changed_at, source, row id); the cursor is the position of the last row
+returned, so a consumer that stores it and asks again gets exactly the rows
+that changed after it, with nothing skipped or repeated.
+
+Rows saved in the last few seconds are held back (CHANGES_SETTLE_SECONDS):
+a transaction that set updated_at before a consumer read the feed but
+committed after it would otherwise be skipped past.
+"""
+import base64
+import hashlib
+import heapq
+import json
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import StudyTourBooking
+
+from .models import ApiToken, ChangeTombstone, PackageBooking, Payment, TourPackage, TouristSpot, TravelRequest
+
+CHANGES_PAGE_SIZE = 500
+CHANGES_MAX_PAGE_SIZE = 5000
+CHANGES_SETTLE_SECONDS = getattr(settings, 'CHANGES_SETTLE_SECONDS', 5)
+TOMBSTONE_SOURCE = 'deleted'
+
+# Feed type -> (model, exported fields). Sources are ordered by type name at equal timestamps.
+SOURCES = {
+    'package_booking': (PackageBooking, [
+        'package_id', 'user_id', 'student_name', 'student_id', 'department', 'semester', 'phone', 'email',
+        'num_persons', 'status', 'admin_notes', 'paid_total', 'balance', 'status_changed_at', 'created_at',
+    ]),
+    'payment': (Payment, [
+        'booking_id', 'amount_paid', 'bkash_last_4', 'status', 'admin_notes', 'reviewed_at', 'created_at',
+    ]),
+    'study_tour_booking': (StudyTourBooking, [
+        'user_id', 'study_tour_id', 'tour_date_id', 'status', 'payment_status', 'total_price', 'booking_date',
+    ]),
+    'tour_package': (TourPackage, [
+        'name', 'category', 'price', 'duration', 'destination', 'capacity', 'is_active', 'created_at',
+    ]),
+    'tourist_spot': (TouristSpot, ['name', 'best_time', 'created_at']),
+    'travel_request': (TravelRequest, [
+        'user_id', 'place_name', 'location', 'preferred_date', 'number_of_travelers', 'budget_estimate',
+        'status', 'admin_response', 'created_at',
+    ]),
+}
+FEED_TYPES = {model: object_type for object_type, (model, _) in SOURCES.items()}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(position):
+    changed_at, source, row_id = position
+    raw = f'{changed_at.isoformat()}|{source}|{row_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(changed_at, source, row id) from a cursor, or None for the start of the feed"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        changed_at, source, row_id = raw.split('|')
+        changed_at = parse_datetime(changed_at)
+        if changed_at is None or (source not in SOURCES and source != TOMBSTONE_SOURCE):
+            raise ValueError
+        return changed_at, source, int(row_id)
+    except ValueError:
+        raise InvalidCursor('Invalid cursor.')
+
+
+def after_position(position, source, time_field):
+    """Q for rows of one source that come after the cursor position"""
+    if position is None:
+        return Q()
+    changed_at, cursor_source, row_id = position
+    later = Q(**{f'{time_field}__gt': changed_at})
+    if source > cursor_source:
+        return later | Q(**{time_field: changed_at})
+    if source == cursor_source:
+        return later | Q(**{time_field: changed_at, 'id__gt': row_id})
+    return later
+
+
+def source_rows(source, position, until, limit, types=None):
+    """(changed_at, source, id, record) tuples from one source after the position, in feed order"""
+    if source == TOMBSTONE_SOURCE:
+        rows = ChangeTombstone.objects.filter(after_position(position, source, 'deleted_at'), deleted_at__lte=until)
+        if types is not None:
+            rows = rows.filter(object_type__in=types)
+        rows = rows.order_by('deleted_at', 'id').values('id', 'deleted_at', 'object_type', 'object_id')[:limit]
+        for row in rows.iterator():
+            record = {'type': row['object_type'], 'id': row['object_id'], 'deleted': True, 'changed_at': row['deleted_at']}
+            yield row['deleted_at'], source, row['id'], record
+        return
+
+    model, fields = SOURCES[source]
+    rows = (
+        model.objects.filter(after_position(position, source, 'updated_at'), updated_at__lte=until)
+        .order_by('updated_at', 'id')
+        .values('id', 'updated_at', *fields)[:limit]
+    )
+    for row in rows.iterator():
+        record = {'type': source, 'id': row['id'], 'deleted': False, 'changed_at': row['updated_at']}
+        record['data'] = {field: row[field] for field in fields}
+        yield row['updated_at'], source, row['id'], record
+
+
+def changes_since(cursor, limit=CHANGES_PAGE_SIZE, types=None):
+    """Generator of up to limit change records after the cursor, optionally only of the given types.
+
+    The generator's return value (StopIteration.value) is (next_cursor,
+    has_more). Raises InvalidCursor for a malformed cursor.
+    """
+    position = decode_cursor(cursor)
+    until = timezone.now() - timedelta(seconds=CHANGES_SETTLE_SECONDS)
+    sources = [s for s in SOURCES if types is None or s in types] + [TOMBSTONE_SOURCE]
+    merged = heapq.merge(*[source_rows(s, position, until, limit, types) for s in sources], key=lambda row: row[:3])
+
+    count = 0
+    for changed_at, source, row_id, record in merged:
+        yield record
+        position = (changed_at, source, row_id)
+        count += 1
+        if count >= limit:
+            break
+    return (encode_cursor(position) if position else ''), count >= limit
+
+
+def stream_changes(cursor, limit=CHANGES_PAGE_SIZE, types=None):
+    """JSON document for one page of the feed, produced incrementally for StreamingHttpResponse"""
+    encoder = DjangoJSONEncoder()
+    changes = changes_since(cursor, limit, types)
+    count = 0
+    yield '{"changes": ['
+    while True:
+        try:
+            record = next(changes)
+        except StopIteration as stop:
+            next_cursor, has_more = stop.value
+            break
+        yield (',' if count else '') + '\n' + encoder.encode(record)
+        count += 1
+    yield '\n], ' + json.dumps({'count': count, 'next_cursor': next_cursor, 'has_more': has_more})[1:]
+
+
+def record_deletion(instance):
+    """Write a tombstone for a deleted instance of a synced model"""
+    ChangeTombstone.objects.create(object_type=FEED_TYPES[type(instance)], object_id=instance.pk)
+
+
+def hash_token(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def create_api_token(name, created_by=None):
+    """Create a token and return (token, key); the key is shown once and never stored"""
+    key = secrets.token_urlsafe(32)
+    return ApiToken.objects.create(name=name, key_hash=hash_token(key), created_by=created_by), key
+
+
+def authenticate_token(request):
+    """The active ApiToken from an 'Authorization: Token <key>' (or Bearer) header, or None"""
+    scheme, _, key = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() not in ('token', 'bearer') or not key.strip():
+        return None
+    token = ApiToken.objects.filter(key_hash=hash_token(key.strip()), is_active=True).first()
+    if token:
+        # Record use at most once an hour, not on every poll
+        now = timezone.now()
+        ApiToken.objects.filter(
+            Q(last_used_at__isnull=True) | Q(last_used_at__lt=now - timedelta(hours=1)), pk=token.pk
+        ).update(last_used_at=now)
+    return token
@@ -1,3 +1,4 @@
+from .bookings import NOTIFY_STATUSES, bookings_seen_at
 from .models import PackageBooking
 
 def pending_bookings_count(request):
@@ -9,11 +10,13 @@ def pending_bookings_count(request):
         if request.user.is_staff or request.user.is_superuser:
             context['pending_bookings_count'] = PackageBooking.objects.filter(status='pending').count()
         else:
-            # Student notification: bookings that have been approved/rejected but not yet seen
-            context['student_notifications_count'] = PackageBooking.objects.filter(
-                user=request.user,
-                status__in=['approved', 'rejected'],
-                student_notified=False
-            ).count()
+            # Student notification: decisions newer than the student's watermark
+            unseen = PackageBooking.objects.filter(
+                user=request.user, status__in=NOTIFY_STATUSES, status_changed_at__isnull=False
+            )
+            seen_at = bookings_seen_at(request)
+            if seen_at:
+                unseen = unseen.filter(status_changed_at__gt=seen_at)
+            context['student_notifications_count'] = unseen.count()
     
     return context
@@ -0,0 +1,246 @@
+"""Streaming CSV/XLSX exports of the admin booking lists.
+
+Rows come straight from ``values_list(...).iterator(chunk_size=...)`` and are
+written out in small batches, so memory stays flat however many rows match.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+
+from accounts.filters import filter_study_tour_bookings
+from .filters import filter_package_bookings, filter_travel_requests
+
+EXPORT_CHUNK_SIZE = 2000
+# Rows written between two yields of the response body
+ROWS_PER_YIELD = 500
+
+EXPORTS = {
+    'package_bookings': {
+        'filename': 'package_bookings',
+        'filter': filter_package_bookings,
+        # Bookings without a payment get one row with empty payment columns
+        'order_by': ('-id', 'payments__id'),
+        'columns': [
+            ('Booking ID', 'id'),
+            ('Package', 'package__name'),
+            ('Category', 'package__category'),
+            ('Package Price', 'package__price'),
+            ('Student Name', 'student_name'),
+            ('Student ID', 'student_id'),
+            ('Department', 'department'),
+            ('Semester', 'semester'),
+            ('Phone', 'phone'),
+            ('Email', 'email'),
+            ('Persons', 'num_persons'),
+            ('Status', 'status'),
+            ('Admin Notes', 'admin_notes'),
+            ('Booked At', 'created_at'),
+            ('Paid Total', 'paid_total'),
+            ('Balance', 'balance'),
+            ('Payment ID', 'payments__id'),
+            ('Amount Paid', 'payments__amount_paid'),
+            ('bKash Last 4', 'payments__bkash_last_4'),
+            ('Payment Status', 'payments__status'),
+            ('Payment Submitted At', 'payments__created_at'),
+        ],
+    },
+    'study_tour_bookings': {
+        'filename': 'study_tour_bookings',
+        'filter': filter_study_tour_bookings,
+        'order_by': ('-id',),
+        'columns': [
+            ('Booking ID', 'id'),
+            ('Username', 'user__username'),
+            ('Name', 'user__first_name'),
+            ('Email', 'user__email'),
+            ('Study Tour', 'study_tour__name'),
+            ('Start Date', 'tour_date__start_date'),
+            ('End Date', 'tour_date__end_date'),
+            ('Status', 'status'),
+            ('Payment Status', 'payment_status'),
+            ('Total Price', 'total_price'),
+            ('Booked At', 'booking_date'),
+            ('Special Requirements', 'special_requirements'),
+            ('Admin Notes', 'admin_notes'),
+        ],
+    },
+    'travel_requests': {
+        'filename': 'travel_requests',
+        'filter': filter_travel_requests,
+        'order_by': ('-id',),
+        'columns': [
+            ('Request ID', 'id'),
+            ('Username', 'user__username'),
+            ('Email', 'user__email'),
+            ('Place', 'place_name'),
+            ('Location', 'location'),
+            ('Preferred Date', 'preferred_date'),
+            ('Travelers', 'number_of_travelers'),
+            ('Budget Estimate', 'budget_estimate'),
+            ('Status', 'status'),
+            ('Admin Response', 'admin_response'),
+            ('Requested At', 'created_at'),
+        ],
+    },
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def export_header(kind):
+    return [header for header, _ in EXPORTS[kind]['columns']]
+
+
+def export_rows(kind, params):
+    """Stream the rows of an export as tuples, using the admin page's filters"""
+    spec = EXPORTS[kind]
+    fields = [field for _, field in spec['columns']]
+    return (
+        spec['filter'](params)
+        .order_by(*spec['order_by'])
+        .values_list(*fields)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def stream_export(kind, fmt, params):
+    return WRITERS[fmt](export_header(kind), export_rows(kind, params))
+
+
+def export_response(kind, fmt, params):
+    response = StreamingHttpResponse(stream_export(kind, fmt, params), content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{EXPORTS[kind]["filename"]}.{fmt}"'
+    return response
+
+
+# Text a spreadsheet would run as a formula; students type some of these fields
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def neutralize_formula(value):
+    """Prefix text that starts like a formula with ' so spreadsheets show it as text"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for i, row in enumerate(rows, 1):
+        writer.writerow([neutralize_formula(value) for value in row])
+        if i % ROWS_PER_YIELD == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+# Minimal SpreadsheetML package: one worksheet with inline strings, no styles
+XLSX_PARTS = [
+    ('[Content_Types].xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+     '<Default Extension="xml" ContentType="application/xml"/>'
+     '<Override PartName="/xl/workbook.xml" '
+     'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+     '<Override PartName="/xl/worksheets/sheet1.xml" '
+     'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+     '</Types>'),
+    ('_rels/.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" '
+     'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+     'Target="xl/workbook.xml"/>'
+     '</Relationships>'),
+    ('xl/workbook.xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+     'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+     '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets>'
+     '</workbook>'),
+    ('xl/_rels/workbook.xml.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" '
+     'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+     'Target="worksheets/sheet1.xml"/>'
+     '</Relationships>'),
+]
+SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+SHEET_TAIL = '</sheetData></worksheet>'
+XML_ILLEGAL_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class _StreamBuffer:
+    """Write-only file object; drain() hands out what was written since the last call"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        value = 'Yes' if value else 'No'
+    elif isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    elif isinstance(value, (datetime, date)):
+        value = value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()
+    text = escape(XML_ILLEGAL_RE.sub('', str(neutralize_formula(value))))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(row):
+    return ('<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>').encode('utf-8')
+
+
+def stream_xlsx(header, rows):
+    """Write an .xlsx on the fly; the zip is deflated as rows arrive, nothing is buffered whole"""
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS:
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(SHEET_HEAD.encode('utf-8'))
+            sheet.write(_xlsx_row(header))
+            for i, row in enumerate(rows, 1):
+                sheet.write(_xlsx_row(row))
+                if i % ROWS_PER_YIELD == 0:
+                    yield buffer.drain()
+            sheet.write(SHEET_TAIL.encode('utf-8'))
+    yield buffer.drain()
+
+
+WRITERS = {
+    'csv': stream_csv,
+    'xlsx': stream_xlsx,
+}
@@ -0,0 +1,38 @@
+from django.db.models import Q
+
+from .models import PackageBooking, TravelRequest
+
+
+def filter_package_bookings(params):
+    """PackageBooking queryset for the admin package bookings filters (?status=&balance=)"""
+    status_filter = params.get('status', 'all')
+    balance_filter = params.get('balance', '')
+
+    bookings = PackageBooking.objects.all()
+    if status_filter != 'all':
+        bookings = bookings.filter(status=status_filter)
+    # Indexed column lookups on the ledger-maintained balance; only approved
+    # bookings owe money, as in the reports' outstanding total
+    if balance_filter == 'outstanding':
+        bookings = bookings.filter(status='approved', balance__gt=0)
+    elif balance_filter == 'settled':
+        bookings = bookings.filter(balance__lte=0)
+    return bookings
+
+
+def filter_travel_requests(params):
+    """TravelRequest queryset for the admin travel requests filters (?search=&status=)"""
+    status_filter = params.get('status', '')
+    search_query = params.get('search', '')
+
+    requests = TravelRequest.objects.all()
+    if status_filter:
+        requests = requests.filter(status=status_filter)
+    if search_query:
+        requests = requests.filter(
+            Q(place_name__icontains=search_query) |
+            Q(location__icontains=search_query) |
+            Q(user__username__icontains=search_query) |
+            Q(user__first_name__icontains=search_query)
+        )
+    return requests
@@ -1,5 +1,7 @@
 from django import forms
-from .models import TouristSpot, TourPackage, PackageBooking, Payment, TravelRequest
+from django.utils import timezone
+from accounts.models import TourDate
+from .models import TouristSpot, TourPackage, PackageBooking, Payment, TravelRequest, Broadcast
 
 class TouristSpotForm(forms.ModelForm):
     class Meta:
@@ -7,43 +9,36 @@ class TouristSpotForm(forms.ModelForm):
         fields = ['name', 'description', 'image', 'highlights', 'travel_info', 'best_time', 'safety_info']
         widgets = {
             'name': forms.TextInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'Enter spot name',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'description': forms.Textarea(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'rows': 5, 
                 'placeholder': 'Enter description',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px; resize: vertical;'
             }),
             'highlights': forms.Textarea(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'rows': 4, 
                 'placeholder': 'Enter highlights (one per line)',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px; resize: vertical;'
             }),
             'travel_info': forms.Textarea(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'rows': 4, 
                 'placeholder': 'Enter travel information',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px; resize: vertical;'
             }),
             'best_time': forms.Textarea(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'rows': 3, 
                 'placeholder': 'Enter best time to visit',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px; resize: vertical;'
             }),
             'safety_info': forms.Textarea(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'rows': 3, 
                 'placeholder': 'Enter safety information',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px; resize: vertical;'
             }),
             'image': forms.FileInput(attrs={
-                'class': 'form-control',
-                'style': 'width: 100%; padding: 8px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
+                'class': 'form-control form-input',
             })
         }
 
@@ -51,53 +46,56 @@ class TouristSpotForm(forms.ModelForm):
 class TourPackageForm(forms.ModelForm):
     class Meta:
         model = TourPackage
-        fields = ['name', 'description', 'image', 'price', 'duration', 'destination', 'highlights', 'category', 'is_active']
+        fields = ['name', 'description', 'image', 'price', 'duration', 'destination', 'highlights', 'category', 'capacity', 'is_active']
         widgets = {
             'name': forms.TextInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'Enter package name',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'description': forms.Textarea(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'rows': 4, 
                 'placeholder': 'Enter package description',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px; resize: vertical;'
             }),
             'price': forms.NumberInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'Enter price (e.g., 5000)',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'duration': forms.TextInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'e.g., 3 Days 2 Nights',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'destination': forms.TextInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'Enter destination',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'highlights': forms.Textarea(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'rows': 3, 
                 'placeholder': 'Enter highlights (one per line)',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px; resize: vertical;'
             }),
             'image': forms.FileInput(attrs={
-                'class': 'form-control',
-                'style': 'width: 100%; padding: 8px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
+                'class': 'form-control form-input',
             }),
             'category': forms.Select(attrs={
-                'class': 'form-control',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
+                'class': 'form-control form-input',
+            }),
+            'capacity': forms.NumberInput(attrs={
+                'class': 'form-control form-input',
+                'placeholder': 'Total seats (leave empty for no limit)',
+                'min': 1,
             }),
             'is_active': forms.CheckboxInput(attrs={
-                'class': 'form-check-input',
-                'style': 'width: 20px; height: 20px;'
+                'class': 'form-check-input form-checkbox',
             })
         }
+    
+    def clean_capacity(self):
+        capacity = self.cleaned_data.get('capacity')
+        reserved = self.instance.seats_reserved if self.instance.pk else 0
+        if capacity is not None and capacity < reserved:
+            raise forms.ValidationError(f'{reserved} seats are already reserved by approved bookings.')
+        return capacity
 
 
 class PackageBookingForm(forms.ModelForm):
@@ -106,54 +104,56 @@ class PackageBookingForm(forms.ModelForm):
         fields = ['student_name', 'student_id', 'department', 'semester', 'phone', 'email', 'emergency_contact', 'num_persons', 'special_requests']
         widgets = {
             'student_name': forms.TextInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'Enter your full name',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'student_id': forms.TextInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'Enter your Student ID',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'department': forms.TextInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'e.g., Computer Science',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'semester': forms.TextInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'e.g., 5th Semester',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'phone': forms.TextInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'Enter your phone number',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'email': forms.EmailInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'Enter your email address',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'emergency_contact': forms.TextInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'Emergency contact number (optional)',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'num_persons': forms.NumberInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'min': 1,
                 'max': 10,
                 'value': 1,
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'special_requests': forms.Textarea(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'rows': 3, 
                 'placeholder': 'Any special requests or requirements (optional)',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px; resize: vertical;'
             }),
         }
+    
+    def __init__(self, *args, package=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.package = package
+    
+    def clean_num_persons(self):
+        num_persons = self.cleaned_data.get('num_persons')
+        remaining = self.package.seats_remaining if self.package else None
+        if num_persons and remaining is not None and num_persons > remaining:
+            raise forms.ValidationError(f'Only {remaining} seat(s) left on this package.')
+        return num_persons
 
 
 class PaymentForm(forms.ModelForm):
@@ -162,19 +162,17 @@ class PaymentForm(forms.ModelForm):
         fields = ['amount_paid', 'bkash_last_4']
         widgets = {
             'amount_paid': forms.NumberInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'Enter amount paid',
                 'type': 'number',
                 'step': '0.01',
                 'min': '0',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'bkash_last_4': forms.TextInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'Last 4 digits of bKash number',
                 'maxlength': '4',
                 'pattern': '[0-9]{4}',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
         }
     
@@ -199,44 +197,119 @@ class TravelRequestForm(forms.ModelForm):
         fields = ['place_name', 'location', 'description', 'preferred_date', 'number_of_travelers', 'budget_estimate', 'special_requirements']
         widgets = {
             'place_name': forms.TextInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'Enter the place you want to visit',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'location': forms.TextInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'e.g., Sylhet, Bangladesh',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'description': forms.Textarea(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'rows': 4, 
                 'placeholder': 'Describe why you want to visit this place and what activities you would like to do',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px; resize: vertical;'
             }),
             'preferred_date': forms.DateInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'type': 'date',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'number_of_travelers': forms.NumberInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'min': 1,
                 'max': 50,
                 'value': 1,
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'budget_estimate': forms.NumberInput(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'placeholder': 'Estimated budget per person (BDT)',
                 'step': '100',
                 'min': '0',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;'
             }),
             'special_requirements': forms.Textarea(attrs={
-                'class': 'form-control', 
+                'class': 'form-control form-input', 
                 'rows': 3, 
                 'placeholder': 'Any special requirements or requests (optional)',
-                'style': 'width: 100%; padding: 12px 15px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px; resize: vertical;'
             }),
-        }
\ No newline at end of file
+        }
+
+
+class BroadcastForm(forms.ModelForm):
+    """Form for admins to message everyone booked on a package or tour date"""
+    class Meta:
+        model = Broadcast
+        fields = ['package', 'tour_date', 'subject', 'message']
+        widgets = {
+            'package': forms.Select(attrs={
+                'class': 'form-control form-input',
+            }),
+            'tour_date': forms.Select(attrs={
+                'class': 'form-control form-input',
+            }),
+            'subject': forms.TextInput(attrs={
+                'class': 'form-control form-input',
+                'placeholder': 'e.g., Bus now leaves at 7:00 AM',
+            }),
+            'message': forms.Textarea(attrs={
+                'class': 'form-control form-input',
+                'rows': 6,
+                'placeholder': 'What has changed and what students need to do',
+            }),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['package'].queryset = TourPackage.objects.order_by('name')
+        self.fields['tour_date'].queryset = (
+            TourDate.objects.filter(end_date__gte=timezone.localdate())
+            .select_related('study_tour')
+            .order_by('start_date')
+        )
+
+
+class PackageSearchForm(forms.Form):
+    """Package search filters; invalid values are dropped rather than reported"""
+    SORT_CHOICES = [
+        ('newest', 'Newest'),
+        ('price', 'Price: low to high'),
+        ('-price', 'Price: high to low'),
+        ('duration', 'Shortest first'),
+    ]
+
+    category = forms.ChoiceField(
+        choices=[('', 'All categories')] + TourPackage.CATEGORY_CHOICES, required=False,
+        widget=forms.Select(attrs={'class': 'form-control form-input'}),
+    )
+    destination = forms.CharField(
+        max_length=200, required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control form-input', 'placeholder': 'e.g., Sylhet'}),
+    )
+    min_price = forms.DecimalField(
+        min_value=0, max_digits=10, decimal_places=2, required=False,
+        widget=forms.NumberInput(attrs={'class': 'form-control form-input', 'placeholder': 'Min'}),
+    )
+    max_price = forms.DecimalField(
+        min_value=0, max_digits=10, decimal_places=2, required=False,
+        widget=forms.NumberInput(attrs={'class': 'form-control form-input', 'placeholder': 'Max'}),
+    )
+    min_days = forms.IntegerField(
+        min_value=1, max_value=365, required=False,
+        widget=forms.NumberInput(attrs={'class': 'form-control form-input', 'placeholder': 'Min'}),
+    )
+    max_days = forms.IntegerField(
+        min_value=1, max_value=365, required=False,
+        widget=forms.NumberInput(attrs={'class': 'form-control form-input', 'placeholder': 'Max'}),
+    )
+    sort = forms.ChoiceField(
+        choices=SORT_CHOICES, required=False,
+        widget=forms.Select(attrs={'class': 'form-control form-input'}),
+    )
+    # Bounded so huge values fall back to the defaults instead of overflowing the query
+    page = forms.IntegerField(min_value=1, max_value=10000, required=False, widget=forms.HiddenInput)
+
+    def search_params(self):
+        """(filters, sort, page) from whichever fields are valid"""
+        self.is_valid()
+        data = {name: value for name, value in self.cleaned_data.items() if value not in (None, '')}
+        sort = data.pop('sort', 'newest')
+        page = data.pop('page', 1)
+        return data, sort, page
@@ -0,0 +1,91 @@
+"""Idempotency keys for POST endpoints that create or change records.
+
+The client sends a random key with the request, either in the
+``Idempotency-Key`` header or the ``idempotency_key`` form field. The first
+request with a key runs the view and stores its response; any later request
+with the same key (a double submit, or a client retry after a lost response)
+gets the stored response back without running the view again.
+
+The key row is inserted in the same transaction as the view's writes, so
+the unique (user, key) constraint makes a concurrent duplicate wait for the
+first request and then replay its response. If the view fails or returns an
+error, the key is dropped and a retry runs normally.
+"""
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_FIELD = 'idempotency_key'
+IDEMPOTENCY_KEY_TTL = timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24))
+# Fields that differ between otherwise identical submissions
+UNHASHED_FIELDS = {'csrfmiddlewaretoken', IDEMPOTENCY_FIELD}
+REPLAYED_HEADERS = ('Content-Type', 'Location')
+
+
+def request_fingerprint(request):
+    items = sorted((k, v) for k, values in request.POST.lists() if k not in UNHASHED_FIELDS for v in values)
+    payload = repr((request.path, items)).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+def replay(record):
+    response = HttpResponse(record.response_body, status=record.status_code)
+    for header, value in record.response_headers.items():
+        response[header] = value
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Run a POST view at most once per idempotency key; requests without a key run as usual"""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER) or request.POST.get(IDEMPOTENCY_FIELD)
+        if request.method != 'POST' or not key or not request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        if len(key) > 64:
+            return JsonResponse({'error': 'Idempotency key is too long.'}, status=400)
+
+        endpoint = request.resolver_match.view_name if request.resolver_match else view.__name__
+        fingerprint = request_fingerprint(request)
+
+        with transaction.atomic():
+            IdempotencyKey.objects.filter(
+                user=request.user, key=key, created_at__lt=timezone.now() - IDEMPOTENCY_KEY_TTL
+            ).delete()
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=request.user, key=key, endpoint=endpoint, request_hash=fingerprint
+                    )
+            except IntegrityError:
+                record = IdempotencyKey.objects.get(user=request.user, key=key)
+                if record.endpoint != endpoint or record.request_hash != fingerprint:
+                    return JsonResponse(
+                        {'error': 'This idempotency key was already used for a different request.'},
+                        status=422,
+                    )
+                return replay(record)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code >= 400 or response.streaming:
+                # Only successful outcomes are replayed; forget the key so a
+                # corrected or retried submission runs again
+                record.delete()
+                return response
+            record.status_code = response.status_code
+            record.response_body = response.content.decode(response.charset or 'utf-8')
+            record.response_headers = {h: response[h] for h in REPLAYED_HEADERS if response.has_header(h)}
+            record.save(update_fields=['status_code', 'response_body', 'response_headers'])
+            return response
+
+    return wrapper
@@ -0,0 +1,85 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tourist_spots.allocation import POLICIES, allocate_package
+from tourist_spots.models import TourPackage
+
+REPORT_FIELDS = [
+    'rank', 'booking_id', 'student_id', 'student_name', 'department', 'num_persons',
+    'created_at', 'lottery_key', 'decision', 'reason',
+]
+
+
+def parse_department_numbers(value, option):
+    """Parse 'CSE=20,EEE=10' into {'CSE': 20, 'EEE': 10}"""
+    numbers = {}
+    for part in filter(None, (p.strip() for p in (value or '').split(','))):
+        department, _, number = part.partition('=')
+        try:
+            numbers[department.strip().upper()] = float(number) if option == '--weights' else int(number)
+        except ValueError:
+            raise CommandError(f'{option} expects DEPT=NUMBER pairs, got "{part}"')
+    return numbers
+
+
+class Command(BaseCommand):
+    help = 'Approve pending and waitlisted bookings for a package up to its capacity under a policy and waitlist the rest'
+
+    def add_arguments(self, parser):
+        parser.add_argument('package_id', type=int)
+        parser.add_argument('--policy', choices=POLICIES, default='fifo')
+        parser.add_argument('--quotas', help='Seats set aside per department for --policy quota, e.g. CSE=20,EEE=10')
+        parser.add_argument('--weights', help='Lottery weight per department for --policy lottery, e.g. CSE=2,EEE=1')
+        parser.add_argument('--seed', help='Lottery seed; the same seed reproduces the same draw')
+        parser.add_argument('--report', help='Audit report path (default: allocation-<package>-<policy>.csv)')
+        parser.add_argument('--dry-run', action='store_true', help='Write the report without changing any booking')
+
+    def handle(self, *args, **options):
+        policy = options['policy']
+        if not TourPackage.objects.filter(pk=options['package_id']).exists():
+            raise CommandError(f'No package with id {options["package_id"]}')
+        if policy == 'quota' and not options['quotas']:
+            raise CommandError('--policy quota needs --quotas')
+        seed = options['seed'] or str(time.time_ns())
+
+        started = time.monotonic()
+        try:
+            allocation = allocate_package(
+                options['package_id'],
+                policy,
+                dry_run=options['dry_run'],
+                quotas=parse_department_numbers(options['quotas'], '--quotas'),
+                weights=parse_department_numbers(options['weights'], '--weights'),
+                seed=seed,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.monotonic() - started
+
+        package = allocation['package']
+        report = options['report'] or f'allocation-{package.pk}-{policy}.csv'
+        self.write_report(report, allocation)
+
+        candidates = allocation['candidates']
+        approved = sum(1 for c in candidates if c['decision'] == 'approved')
+        verb = 'would be' if options['dry_run'] else 'were'
+        self.stdout.write(self.style.SUCCESS(
+            f'{package.name}: {len(candidates)} pending or waitlisted bookings, {allocation["seats_free"]} seats free. '
+            f'{approved} {verb} approved ({allocation["seats_allocated"]} seats) and '
+            f'{len(candidates) - approved} waitlisted in {elapsed:.2f}s.'
+        ))
+        if policy == 'lottery':
+            self.stdout.write(f'Lottery seed: {seed}')
+        self.stdout.write(f'Audit report written to {report}')
+
+    def write_report(self, report, allocation):
+        with open(report, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(REPORT_FIELDS)
+            for c in allocation['candidates']:
+                writer.writerow([
+                    c['rank'], c['id'], c['student_id'], c['student_name'], c['department'], c['num_persons'],
+                    c['created_at'].isoformat(), c.get('lottery_key', ''), c['decision'], c['reason'],
+                ])
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from tourist_spots.changes import create_api_token
+
+
+class Command(BaseCommand):
+    help = 'Create an API token for an external system (e.g. the finance ERP reading /api/v1/changes/)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help='Who will use the token, e.g. "Finance ERP"')
+
+    def handle(self, *args, **options):
+        token, key = create_api_token(options['name'])
+        self.stdout.write(self.style.SUCCESS(f'Created API token #{token.pk} for {token.name}.'))
+        self.stdout.write('Send it as "Authorization: Token <key>". It is not stored and cannot be shown again:')
+        self.stdout.write(key)
@@ -0,0 +1,151 @@
+import csv
+import os
+import re
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tourist_spots.models import Payment
+from tourist_spots.payments import bulk_verify_payments
+
+# Accepted header names (lower-cased) for each statement column
+COLUMN_ALIASES = {
+    'sender': ('sender', 'from', 'account', 'msisdn', 'sender number', 'from account', 'wallet'),
+    'amount': ('amount', 'amount (bdt)', 'credit', 'received'),
+    'trx_id': ('trx_id', 'trxid', 'transaction id', 'transaction_id', 'txn id'),
+    'date': ('date', 'date time', 'datetime', 'transaction date'),
+}
+LOOKUP_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Match a bKash statement CSV against pending payments, verify exact matches and report the rest'
+
+    def add_arguments(self, parser):
+        parser.add_argument('statement', help='Statement CSV with sender number and amount columns')
+        parser.add_argument('--admin', help='Username recorded as verifier (default: first superuser)')
+        parser.add_argument('--report', help='Exceptions report path (default: <statement>.exceptions.csv)')
+        parser.add_argument('--dry-run', action='store_true', help='Match and report without verifying anything')
+
+    def handle(self, *args, **options):
+        path = options['statement']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+        admin = self.get_admin(options['admin'])
+
+        lines, exceptions = self.read_statement(path)
+        by_key = defaultdict(list)
+        for line in lines:
+            by_key[(line['last_4'], line['amount'])].append(line)
+        pending = self.pending_payments(by_key)
+
+        matched = {}
+        for key, key_lines in by_key.items():
+            candidates = pending.get(key, [])
+            if len(key_lines) == 1 and len(candidates) == 1:
+                matched[candidates[0].id] = (key, key_lines[0], candidates[0])
+            elif not candidates:
+                for line in key_lines:
+                    exceptions.append(self.exception(line, 'unmatched', 'No pending payment with this number and amount'))
+            else:
+                detail = f'{len(key_lines)} statement lines for {len(candidates)} pending payments'
+                for line in key_lines:
+                    exceptions.append(self.exception(line, 'ambiguous', detail, candidates))
+
+        verified = []
+        if matched and not options['dry_run']:
+            note = f'Reconciled from bKash statement {os.path.basename(path)}'
+            verified = bulk_verify_payments({pid: key for pid, (key, _, _) in matched.items()}, admin, note)
+            for pid in set(matched) - set(verified):
+                _, line, payment = matched[pid]
+                exceptions.append(self.exception(line, 'changed', 'Payment changed before it could be verified', [payment]))
+
+        report = options['report'] or f'{path}.exceptions.csv'
+        self.write_report(report, exceptions)
+
+        verb = 'would be verified' if options['dry_run'] else 'verified'
+        count = len(matched) if options['dry_run'] else len(verified)
+        self.stdout.write(self.style.SUCCESS(f'{len(lines)} statement lines read, {count} payments {verb}'))
+        if exceptions:
+            self.stdout.write(self.style.WARNING(f'{len(exceptions)} exceptions written to {report}'))
+
+    def get_admin(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username, is_staff=True)
+            except User.DoesNotExist:
+                raise CommandError(f'No staff user "{username}"')
+        return User.objects.filter(is_superuser=True).order_by('id').first()
+
+    def read_statement(self, path):
+        """Parse the statement into lines keyed by (last 4 digits, amount); bad lines become exceptions"""
+        lines, exceptions = [], []
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            columns = self.map_columns(reader.fieldnames or [])
+            for row in reader:
+                line = {
+                    'line_no': reader.line_num,
+                    'sender': (row.get(columns['sender']) or '').strip(),
+                    'raw_amount': (row.get(columns['amount']) or '').strip(),
+                    'trx_id': (row.get(columns.get('trx_id')) or '').strip() if columns.get('trx_id') else '',
+                    'date': (row.get(columns.get('date')) or '').strip() if columns.get('date') else '',
+                }
+                digits = re.sub(r'\D', '', line['sender'])
+                try:
+                    amount = Decimal(re.sub(r'[^\d.\-]', '', line['raw_amount'])).quantize(Decimal('0.01'))
+                except InvalidOperation:
+                    amount = None
+                if len(digits) < 4 or amount is None or amount <= 0:
+                    exceptions.append(self.exception(line, 'invalid', 'Missing sender number or positive amount'))
+                    continue
+                line['last_4'] = digits[-4:]
+                line['amount'] = amount
+                lines.append(line)
+        return lines, exceptions
+
+    def map_columns(self, fieldnames):
+        lowered = {name.strip().lower(): name for name in fieldnames}
+        columns = {}
+        for column, aliases in COLUMN_ALIASES.items():
+            columns[column] = next((lowered[a] for a in aliases if a in lowered), None)
+        missing = [c for c in ('sender', 'amount') if not columns[c]]
+        if missing:
+            raise CommandError(f'Statement is missing a {" and ".join(missing)} column (found: {", ".join(fieldnames)})')
+        return columns
+
+    def pending_payments(self, by_key):
+        """Pending payments for the statement's (last 4, amount) pairs, via payment_reconcile_idx"""
+        pending = defaultdict(list)
+        last_4s = sorted({last_4 for last_4, _ in by_key})
+        for start in range(0, len(last_4s), LOOKUP_BATCH_SIZE):
+            payments = Payment.objects.filter(
+                bkash_last_4__in=last_4s[start:start + LOOKUP_BATCH_SIZE], status='pending'
+            ).only('id', 'booking_id', 'bkash_last_4', 'amount_paid')
+            for payment in payments:
+                key = (payment.bkash_last_4, payment.amount_paid)
+                if key in by_key:
+                    pending[key].append(payment)
+        return pending
+
+    def exception(self, line, result, detail, payments=()):
+        return {
+            'line': line['line_no'],
+            'date': line['date'],
+            'trx_id': line['trx_id'],
+            'sender': line['sender'],
+            'amount': line['raw_amount'],
+            'result': result,
+            'payment_ids': ' '.join(str(p.id) for p in payments),
+            'booking_ids': ' '.join(str(p.booking_id) for p in payments),
+            'detail': detail,
+        }
+
+    def write_report(self, report, exceptions):
+        fields = ['line', 'date', 'trx_id', 'sender', 'amount', 'result', 'payment_ids', 'booking_ids', 'detail']
+        with open(report, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(sorted(exceptions, key=lambda e: e['line']))
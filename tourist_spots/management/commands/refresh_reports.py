@@ -0,0 +1,47 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tourist_spots.reporting import check_consistency, refresh_reports
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Refresh the daily booking and revenue report tables from bookings changed since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild the report tables from scratch')
+        parser.add_argument('--check', action='store_true', help='After refreshing, compare the report tables with live totals')
+        parser.add_argument('--loop', action='store_true', help='Keep refreshing instead of exiting')
+        parser.add_argument('--interval', type=int, default=300, help='Seconds between refreshes with --loop')
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            started = time.monotonic()
+            try:
+                result = refresh_reports(full=full)
+            except Exception:
+                logger.exception('Report refresh failed')
+                if not options['loop']:
+                    raise
+            else:
+                kind = 'Rebuilt' if result['full'] else 'Refreshed'
+                self.stdout.write(self.style.SUCCESS(
+                    f'{kind} {result["package_days"]} package days and {result["study_tour_days"]} '
+                    f'study tour days in {time.monotonic() - started:.2f}s'
+                ))
+            full = False
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        if options['check']:
+            mismatches = check_consistency()
+            for mismatch in mismatches:
+                self.stdout.write(self.style.ERROR(mismatch))
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} mismatches; run with --full to rebuild the report tables')
+            self.stdout.write(self.style.SUCCESS('Report tables match the live bookings.'))
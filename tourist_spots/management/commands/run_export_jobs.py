@@ -0,0 +1,83 @@
+import tempfile
+import time
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from tourist_spots.exports import EXPORTS, WRITERS, export_header, export_rows
+from tourist_spots.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = 'Build queued admin exports into downloadable files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new jobs instead of exiting')
+        parser.add_argument('--interval', type=int, default=10, help='Seconds between polls with --loop')
+        parser.add_argument(
+            '--lease', type=int, default=30,
+            help='Minutes a running job may take before it is presumed dead and run again',
+        )
+
+    def handle(self, *args, **options):
+        lease = timedelta(minutes=options['lease'])
+        while True:
+            processed = 0
+            # Queued jobs, and running ones whose worker died (or stalled) past the lease
+            claimable = Q(status='queued') | Q(status='running', started_at__lt=timezone.now() - lease)
+            for job_id in ExportJob.objects.filter(claimable).order_by('created_at').values_list('id', flat=True):
+                # Claim the job; another worker may have taken it already
+                started_at = timezone.now()
+                claimed = ExportJob.objects.filter(claimable, id=job_id).update(status='running', started_at=started_at)
+                if claimed:
+                    self.run_job(ExportJob.objects.get(id=job_id))
+                    processed += 1
+            if not options['loop']:
+                break
+            if not processed:
+                time.sleep(options['interval'])
+
+    def run_job(self, job):
+        try:
+            if job.kind not in EXPORTS:
+                raise ValueError(f'Unknown export kind "{job.kind}"')
+            rows = CountingIterator(export_rows(job.kind, job.filters))
+            with tempfile.TemporaryFile() as tmp:
+                for chunk in WRITERS[job.format](export_header(job.kind), rows):
+                    tmp.write(chunk)
+                tmp.seek(0)
+                stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+                job.file.save(f'{EXPORTS[job.kind]["filename"]}-{stamp}.{job.format}', File(tmp), save=False)
+            job.row_count = rows.count
+            job.status = 'done'
+        except Exception as exc:
+            job.status = 'failed'
+            job.error = str(exc)
+        job.finished_at = timezone.now()
+        # Only the holder of the current lease records the result; if the job
+        # was reclaimed meanwhile, this run's file is dropped
+        finished = ExportJob.objects.filter(id=job.id, status='running', started_at=job.started_at).update(
+            status=job.status, file=job.file.name, row_count=job.row_count, error=job.error,
+            finished_at=job.finished_at,
+        )
+        if not finished:
+            if job.file:
+                job.file.delete(save=False)
+            self.stdout.write(self.style.WARNING(f'Export #{job.id} was reclaimed by another worker; result discarded'))
+            return
+        style = self.style.SUCCESS if job.status == 'done' else self.style.ERROR
+        self.stdout.write(style(f'Export #{job.id} {job.kind}.{job.format}: {job.status} ({job.row_count} rows)'))
+
+
+class CountingIterator:
+    def __init__(self, rows):
+        self.rows = rows
+        self.count = 0
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            yield row
@@ -0,0 +1,47 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from tourist_spots.broadcasts import run_queued_broadcasts
+from tourist_spots.notifications import OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS, dispatch_batch
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Fan out queued broadcasts and send queued notification emails from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new messages instead of exiting')
+        parser.add_argument('--interval', type=int, default=5, help='Seconds between polls with --loop when idle')
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE, help='Messages sent per connection')
+        parser.add_argument('--max-attempts', type=int, default=OUTBOX_MAX_ATTEMPTS, help='Tries before a message is marked failed')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        started = time.monotonic()
+        while True:
+            try:
+                run_queued_broadcasts()
+                sent, failed = dispatch_batch(options['batch_size'], options['max_attempts'])
+            except Exception:
+                # e.g. the mail server is down; the claimed batch is retried when its lease lapses
+                logger.exception('Outbox dispatch failed')
+                sent = failed = 0
+                if not options['loop']:
+                    raise
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f'Sent {sent}, failed {failed}')
+            if not sent and not failed:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+        elapsed = time.monotonic() - started
+        rate = total_sent / elapsed * 60 if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Outbox drained: {total_sent} sent, {total_failed} failed in {elapsed:.1f}s ({rate:.0f}/min)'
+        ))
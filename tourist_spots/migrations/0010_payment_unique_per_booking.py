@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:28
+
+from django.db import migrations, models
+
+
+def remove_duplicate_payments(apps, schema_editor):
+    """Keep one payment per booking: the verified one if there is one, else the newest.
+
+    Verified payments are money received, so they are never deleted; a booking
+    with more than one stops the migration to be resolved by hand.
+    """
+    Payment = apps.get_model('tourist_spots', 'Payment')
+    duplicated = list(
+        Payment.objects.values('booking_id')
+        .annotate(count=models.Count('id'), verified=models.Count('id', filter=models.Q(status='verified')))
+        .filter(count__gt=1)
+        .values_list('booking_id', 'verified')
+    )
+    conflicts = sorted(booking_id for booking_id, verified in duplicated if verified > 1)
+    if conflicts:
+        raise RuntimeError(
+            'These package bookings have more than one verified payment; merge them into one '
+            f'before migrating: {", ".join(map(str, conflicts))}'
+        )
+    for booking_id, verified in duplicated:
+        payments = Payment.objects.filter(booking_id=booking_id)
+        if verified:
+            payments = payments.filter(status='verified')
+        keep = payments.order_by('-created_at', '-id').values_list('id', flat=True)[0]
+        Payment.objects.filter(booking_id=booking_id).exclude(id=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tourist_spots', '0009_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_payments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(fields=('booking',), name='unique_payment_per_booking'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_ledger(apps, schema_editor):
+    """Record verified payments in the ledger and compute every booking's totals"""
+    PackageBooking = apps.get_model('tourist_spots', 'PackageBooking')
+    Payment = apps.get_model('tourist_spots', 'Payment')
+    PaymentLedgerEntry = apps.get_model('tourist_spots', 'PaymentLedgerEntry')
+
+    for booking in PackageBooking.objects.select_related('package').iterator(chunk_size=1000):
+        paid_total = 0
+        entries = []
+        for payment in Payment.objects.filter(booking=booking, status='verified').order_by('created_at'):
+            paid_total += payment.amount_paid
+            entries.append(PaymentLedgerEntry(
+                booking=booking, payment=payment, entry_type='payment', amount=payment.amount_paid,
+                balance_after=booking.package.price - paid_total, bkash_last_4=payment.bkash_last_4,
+                note='Backfilled from verified payment',
+            ))
+        PaymentLedgerEntry.objects.bulk_create(entries)
+        PackageBooking.objects.filter(pk=booking.pk).update(
+            paid_total=paid_total, balance=booking.package.price - paid_total
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tourist_spots', '0010_payment_unique_per_booking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='packagebooking',
+            name='balance',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='packagebooking',
+            name='paid_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='PaymentLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('payment', 'Payment'), ('reversal', 'Reversal')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Positive for money in, negative for reversals', max_digits=10)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('bkash_last_4', models.CharField(blank=True, max_length=4)),
+                ('note', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='tourist_spots.packagebooking')),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='tourist_spots.payment')),
+                ('recorded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['booking', 'created_at'], name='ledger_booking_created_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
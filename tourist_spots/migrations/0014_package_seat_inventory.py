@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:37
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_seats_reserved(apps, schema_editor):
+    """Approved bookings already hold their seats"""
+    TourPackage = apps.get_model('tourist_spots', 'TourPackage')
+    PackageBooking = apps.get_model('tourist_spots', 'PackageBooking')
+
+    reserved = PackageBooking.objects.filter(status='approved').values('package').annotate(seats=Sum('num_persons'))
+    for row in reserved:
+        TourPackage.objects.filter(pk=row['package']).update(seats_reserved=row['seats'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tourist_spots', '0013_payment_review_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tourpackage',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, help_text='Leave empty for no seat limit', null=True),
+        ),
+        migrations.AddField(
+            model_name='tourpackage',
+            name='seats_reserved',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_seats_reserved, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tourpackage',
+            constraint=models.CheckConstraint(check=models.Q(('capacity__isnull', True), ('seats_reserved__lte', models.F('capacity')), _connector='OR'), name='package_seats_within_capacity'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tourist_spots', '0014_package_seat_inventory'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='packagebooking',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('waitlisted', 'Waitlisted'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('cancelled', 'Cancelled')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0006_tour_waitlist'),
+        ('tourist_spots', '0016_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Broadcast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=150)),
+                ('message', models.TextField()),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Fanning Out'), ('done', 'Queued for Delivery'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('recipient_count', models.PositiveIntegerField(default=0, help_text='Recipients when the broadcast was created')),
+                ('fanned_out', models.PositiveIntegerField(default=0, help_text='Emails written to the outbox so far')),
+                ('cursor', models.CharField(blank=True, max_length=254)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='broadcasts', to=settings.AUTH_USER_MODEL)),
+                ('package', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='broadcasts', to='tourist_spots.tourpackage')),
+                ('tour_date', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='broadcasts', to='accounts.tourdate')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='broadcast',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='messages', to='tourist_spots.broadcast'),
+        ),
+        migrations.AddConstraint(
+            model_name='broadcast',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('package__isnull', False), ('tour_date__isnull', True)), models.Q(('package__isnull', True), ('tour_date__isnull', False)), _connector='OR'), name='broadcast_has_one_target', violation_error_message='Choose either a package or a study tour date.'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import F, Max
+
+
+def backfill_watermarks(apps, schema_editor):
+    """Decisions count from their last update; a student has seen everything up to their newest notified one"""
+    PackageBooking = apps.get_model('tourist_spots', 'PackageBooking')
+    NotificationWatermark = apps.get_model('tourist_spots', 'NotificationWatermark')
+
+    PackageBooking.objects.exclude(status='pending').update(status_changed_at=F('updated_at'))
+    seen = (
+        PackageBooking.objects.filter(student_notified=True, status__in=['approved', 'rejected', 'waitlisted'])
+        .values('user')
+        .annotate(seen_at=Max('updated_at'))
+    )
+    NotificationWatermark.objects.bulk_create([
+        NotificationWatermark(user_id=row['user'], package_bookings_seen_at=row['seen_at']) for row in seen
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tourist_spots', '0017_broadcasts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='packagebooking',
+            name='status_changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='NotificationWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('package_bookings_seen_at', models.DateTimeField()),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='notification_watermark', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_watermarks, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='packagebooking',
+            name='student_notified',
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_booking_updated_at'),
+        ('tourist_spots', '0018_notification_watermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPackageStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('department', models.CharField(max_length=100)),
+                ('status', models.CharField(max_length=20)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('persons', models.PositiveIntegerField(default=0)),
+                ('paid_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('fully_paid', models.PositiveIntegerField(default=0, help_text='Bookings with nothing left to pay')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyStudyTourStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('paid', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReportingDirtyDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('package', 'Package Booking'), ('study_tour', 'Study Tour Booking')], max_length=20)),
+                ('day', models.DateField()),
+                ('object_id', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReportingWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('refreshed_through', models.DateTimeField(blank=True, null=True)),
+                ('last_full_rebuild', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='packagebooking',
+            index=models.Index(fields=['updated_at'], name='packagebooking_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailystudytourstats',
+            name='study_tour',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='accounts.studytour'),
+        ),
+        migrations.AddField(
+            model_name='dailypackagestats',
+            name='package',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='tourist_spots.tourpackage'),
+        ),
+        migrations.AddIndex(
+            model_name='dailystudytourstats',
+            index=models.Index(fields=['day'], name='daily_tour_stats_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailystudytourstats',
+            constraint=models.UniqueConstraint(fields=('day', 'study_tour', 'status'), name='daily_tour_stats_key'),
+        ),
+        migrations.AddIndex(
+            model_name='dailypackagestats',
+            index=models.Index(fields=['day'], name='daily_package_stats_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailypackagestats',
+            constraint=models.UniqueConstraint(fields=('day', 'package', 'department', 'status'), name='daily_package_stats_key'),
+        ),
+    ]
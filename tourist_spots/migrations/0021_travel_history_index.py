@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tourist_spots', '0020_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='packagebooking',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='packagebooking_user_idx'),
+        ),
+    ]
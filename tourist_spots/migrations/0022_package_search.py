@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:01
+
+import re
+
+from django.db import migrations, models
+
+# A frozen copy of tourist_spots.models.parse_duration_days as it was when
+# this migration was written, so later changes to the model cannot alter it
+DURATION_UNITS = [
+    (re.compile(r'(\d+)[\s-]*(?:days?|d)\b', re.I), lambda n: n),
+    (re.compile(r'(\d+)[\s-]*(?:weeks?|w)\b', re.I), lambda n: n * 7),
+    (re.compile(r'(\d+)[\s-]*(?:nights?|n)\b', re.I), lambda n: n + 1),
+    (re.compile(r'^\s*(\d+)\s*$'), lambda n: n),
+]
+
+
+def parse_duration_days(duration):
+    for pattern, to_days in DURATION_UNITS:
+        match = pattern.search(duration or '')
+        if match:
+            return to_days(int(match.group(1))) or None
+    if re.search(r'\bday\b', duration or '', re.I):
+        return 1
+    return None
+
+
+def backfill_duration_days(apps, schema_editor):
+    """One UPDATE per distinct duration text; updated_at is left alone so the change feed is not flooded"""
+    TourPackage = apps.get_model('tourist_spots', 'TourPackage')
+    for duration in TourPackage.objects.values_list('duration', flat=True).distinct().order_by():
+        TourPackage.objects.filter(duration=duration).update(duration_days=parse_duration_days(duration))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tourist_spots', '0021_travel_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tourpackage',
+            name='duration_days',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_duration_days, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='tourpackage',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', 'destination', 'duration_days', 'price', 'is_active'], name='tourpackage_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tourpackage',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['price', 'id'], name='tourpackage_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tourpackage',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['duration_days', 'id'], name='tourpackage_duration_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tourpackage',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at', 'id'], name='tourpackage_newest_idx'),
+        ),
+    ]
@@ -1,4 +1,8 @@
+import re
+from datetime import timedelta
+
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 class TouristSpot(models.Model):
@@ -18,6 +22,31 @@ class TouristSpot(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Change feed (tourist_spots.changes) pages through (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='touristspot_changes_idx'),
+        ]
+
+
+DURATION_UNITS = [
+    (re.compile(r'(\d+)[\s-]*(?:days?|d)\b', re.I), lambda n: n),
+    (re.compile(r'(\d+)[\s-]*(?:weeks?|w)\b', re.I), lambda n: n * 7),
+    (re.compile(r'(\d+)[\s-]*(?:nights?|n)\b', re.I), lambda n: n + 1),
+    # A bare number is a number of days
+    (re.compile(r'^\s*(\d+)\s*$'), lambda n: n),
+]
+
+
+def parse_duration_days(duration):
+    """Length in days of a free-text duration ("3 Days 2 Nights", "2D/1N", "1 week"), or None"""
+    for pattern, to_days in DURATION_UNITS:
+        match = pattern.search(duration or '')
+        if match:
+            return to_days(int(match.group(1))) or None
+    if re.search(r'\bday\b', duration or '', re.I):
+        # "Day trip", "Half day"
+        return 1
+    return None
 
 
 class TourPackage(models.Model):
@@ -32,10 +61,15 @@ class TourPackage(models.Model):
     image = models.ImageField(upload_to='tour_packages/')
     price = models.DecimalField(max_digits=10, decimal_places=2)
     duration = models.CharField(max_length=100)  # e.g., "3 Days 2 Nights"
+    # Parsed from duration on save, for search filters and sorting
+    duration_days = models.PositiveIntegerField(null=True, blank=True, editable=False)
     destination = models.CharField(max_length=200)
     highlights = models.TextField(blank=True)
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, default='study_tour')
     is_active = models.BooleanField(default=True)
+    # Seat inventory: approved bookings hold num_persons seats each (see tourist_spots.bookings)
+    capacity = models.PositiveIntegerField(null=True, blank=True, help_text='Leave empty for no seat limit')
+    seats_reserved = models.PositiveIntegerField(default=0)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -43,17 +77,64 @@ class TourPackage(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_category_display()})"
     
+    @property
+    def seats_remaining(self):
+        """Unreserved seats, or None when the package has no capacity limit"""
+        if self.capacity is None:
+            return None
+        return max(0, self.capacity - self.seats_reserved)
+    
+    def save(self, *args, **kwargs):
+        self.duration_days = parse_duration_days(self.duration)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # seats_reserved only moves through conditional UPDATEs; never
+            # write back a copy that was read before a reservation
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name != 'seats_reserved'
+            ]
+        super().save(*args, **kwargs)
+        # Keep the denormalized balance of bookings still open for payment in
+        # step with the price; rejected and cancelled ones keep their last balance
+        balance = self.price - models.F('paid_total')
+        self.bookings.filter(status__in=PackageBooking.PAYABLE_STATUSES).exclude(balance=balance).update(
+            balance=balance, updated_at=timezone.now(),
+        )
+    
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(capacity__isnull=True) | models.Q(seats_reserved__lte=models.F('capacity')),
+                name='package_seats_within_capacity',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='tourpackage_changes_idx'),
+            # Package search (tourist_spots.search) only looks at active packages. The facet
+            # GROUP BY reads only the first index (is_active is repeated so it covers the
+            # query's WHERE); the others serve each sort order
+            models.Index(
+                fields=['category', 'destination', 'duration_days', 'price', 'is_active'], name='tourpackage_search_idx',
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(fields=['price', 'id'], name='tourpackage_price_idx', condition=models.Q(is_active=True)),
+            models.Index(
+                fields=['duration_days', 'id'], name='tourpackage_duration_idx', condition=models.Q(is_active=True),
+            ),
+            models.Index(fields=['created_at', 'id'], name='tourpackage_newest_idx', condition=models.Q(is_active=True)),
+        ]
 
 
 class PackageBooking(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
+        ('waitlisted', 'Waitlisted'),
         ('approved', 'Approved'),
         ('rejected', 'Rejected'),
         ('cancelled', 'Cancelled'),
     ]
+    # Bookings that may still be paid for
+    PAYABLE_STATUSES = ['pending', 'waitlisted', 'approved']
     
     package = models.ForeignKey(TourPackage, on_delete=models.CASCADE, related_name='bookings')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='package_bookings')
@@ -74,7 +155,12 @@ class PackageBooking(models.Model):
     # Status
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     admin_notes = models.TextField(blank=True)
-    student_notified = models.BooleanField(default=False)  # Track if student has seen the status update
+    # When an admin last decided the booking; the student sees it as new until their watermark passes it
+    status_changed_at = models.DateTimeField(null=True, blank=True)
+    
+    # Running totals of the payment ledger, maintained by tourist_spots.payments
+    paid_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=10, decimal_places=2, default=0, db_index=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -82,8 +168,26 @@ class PackageBooking(models.Model):
     def __str__(self):
         return f"{self.student_name} - {self.package.name} ({self.status})"
     
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.balance = self.package.price - self.paid_total
+        super().save(*args, **kwargs)
+    
+    @property
+    def paid_percentage(self):
+        """Verified payments as a percentage of the package price"""
+        if self.package.price > 0:
+            return min(100, round(float(self.paid_total) / float(self.package.price) * 100, 1))
+        return 0
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Report refresh and the change feed scan for bookings changed since a watermark
+            models.Index(fields=['updated_at', 'id'], name='packagebooking_updated_idx'),
+            # A student's travel history (accounts.timeline) pages through their bookings newest first
+            models.Index(fields=['user', 'created_at', 'id'], name='packagebooking_user_idx'),
+        ]
 
 
 class Payment(models.Model):
@@ -99,9 +203,24 @@ class Payment(models.Model):
     status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='pending')
     admin_notes = models.TextField(blank=True)
     
+    # Review queue lease: the admin working on this payment, until claimed_until
+    claimed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    reviewed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    reviewed_at = models.DateTimeField(null=True, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    def is_claimed_by_other(self, user):
+        """True while another admin holds an unexpired review lease"""
+        return (
+            self.claimed_by_id is not None
+            and self.claimed_by_id != user.id
+            and self.claimed_until is not None
+            and self.claimed_until > timezone.now()
+        )
+    
     @property
     def payment_percentage(self):
         """Calculate payment percentage of total package price"""
@@ -114,8 +233,60 @@ class Payment(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            # One payment per booking; resubmissions update it (see tourist_spots.payments)
+            models.UniqueConstraint(fields=['booking'], name='unique_payment_per_booking'),
+        ]
+        indexes = [
+            # Statement reconciliation looks payments up by these three
+            models.Index(fields=['bkash_last_4', 'amount_paid', 'status'], name='payment_reconcile_idx'),
+            # Review queue: oldest pending first
+            models.Index(fields=['status', 'created_at'], name='payment_queue_idx'),
+            models.Index(fields=['reviewed_by', 'reviewed_at'], name='payment_reviewed_idx'),
+            models.Index(fields=['updated_at', 'id'], name='payment_changes_idx'),
+        ]
 
 
+class PaymentLedgerEntry(models.Model):
+    """Append-only record of money received for a booking.
+
+    Verifying a payment appends a credit; rejecting an already verified one
+    appends a reversal. Entries are never changed or deleted, and the
+    booking's paid_total/balance are updated in the same transaction (see
+    tourist_spots.payments.post_ledger_entry).
+    """
+    ENTRY_TYPE_CHOICES = [
+        ('payment', 'Payment'),
+        ('reversal', 'Reversal'),
+    ]
+    
+    booking = models.ForeignKey(PackageBooking, on_delete=models.CASCADE, related_name='ledger_entries')
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPE_CHOICES)
+    amount = models.DecimalField(max_digits=10, decimal_places=2, help_text="Positive for money in, negative for reversals")
+    balance_after = models.DecimalField(max_digits=10, decimal_places=2)
+    bkash_last_4 = models.CharField(max_length=4, blank=True)
+    note = models.TextField(blank=True)
+    recorded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Payment ledger entries are append-only.')
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError('Payment ledger entries are append-only.')
+    
+    def __str__(self):
+        return f"{self.get_entry_type_display()} {self.amount} for booking #{self.booking_id}"
+    
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['booking', 'created_at'], name='ledger_booking_created_idx'),
+        ]
+
 class TravelRequest(models.Model):
     """Model for students to request travel places for admin approval"""
     STATUS_CHOICES = [
@@ -142,6 +313,9 @@ class TravelRequest(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='travelrequest_changes_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.place_name} ({self.status})"
@@ -152,4 +326,256 @@ class TravelRequest(models.Model):
             'approved': 'success',
             'rejected': 'danger',
         }
-        return status_colors.get(self.status, 'secondary')
\ No newline at end of file
+        return status_colors.get(self.status, 'secondary')
+
+class ExportJob(models.Model):
+    """Large admin export built in the background by `manage.py run_export_jobs`"""
+    KIND_CHOICES = [
+        ('package_bookings', 'Package Bookings & Payments'),
+        ('study_tour_bookings', 'Study Tour Bookings'),
+        ('travel_requests', 'Travel Requests'),
+    ]
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel (XLSX)'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv')
+    filters = models.JSONField(default=dict, blank=True, help_text="Admin list filters (status, search)")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    file = models.FileField(upload_to='exports/', blank=True)
+    row_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} ({self.format}) - {self.status}"
+
+
+class IdempotencyKey(models.Model):
+    """Response stored for a client-supplied idempotency key (see tourist_spots.idempotency)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=64)
+    endpoint = models.CharField(max_length=100)
+    request_hash = models.CharField(max_length=64)
+
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.TextField(blank=True)
+    response_headers = models.JSONField(default=dict, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} {self.endpoint} {self.key}"
+
+
+class OutboxMessage(models.Model):
+    """Email queued in the same transaction as the change it reports (see tourist_spots.notifications)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    event = models.CharField(max_length=50)  # e.g. "package_booking.approved"
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # When a pending message is due, or when a sending claim lapses
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    broadcast = models.ForeignKey('Broadcast', on_delete=models.SET_NULL, null=True, blank=True, related_name='messages')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event} to {self.recipient} ({self.status})"
+
+
+class Broadcast(models.Model):
+    """Message to everyone booked on a package or study tour date, fanned out by `manage.py send_outbox`"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Fanning Out'),
+        ('done', 'Queued for Delivery'),
+        ('failed', 'Failed'),
+    ]
+    # A fan-out still running this long after it started is presumed dead and may be resumed
+    FAN_OUT_LEASE = timedelta(minutes=30)
+
+    package = models.ForeignKey(TourPackage, on_delete=models.CASCADE, null=True, blank=True, related_name='broadcasts')
+    tour_date = models.ForeignKey('accounts.TourDate', on_delete=models.CASCADE, null=True, blank=True, related_name='broadcasts')
+    subject = models.CharField(max_length=150)
+    message = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    recipient_count = models.PositiveIntegerField(default=0, help_text="Recipients when the broadcast was created")
+    fanned_out = models.PositiveIntegerField(default=0, help_text="Emails written to the outbox so far")
+    # Last recipient email fanned out; recipients are walked in email order so a retry resumes here
+    cursor = models.CharField(max_length=254, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='broadcasts')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(package__isnull=False, tour_date__isnull=True)
+                | models.Q(package__isnull=True, tour_date__isnull=False),
+                name='broadcast_has_one_target',
+                violation_error_message='Choose either a package or a study tour date.',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {self.target}"
+
+    @property
+    def target(self):
+        return self.package if self.package_id else self.tour_date
+
+    @classmethod
+    def resumable(cls):
+        """Q for broadcasts an admin may requeue: failed, or running past FAN_OUT_LEASE"""
+        stalled_since = timezone.now() - cls.FAN_OUT_LEASE
+        return models.Q(status='failed') | models.Q(status='running', started_at__lt=stalled_since)
+
+    @property
+    def is_resumable(self):
+        if self.status == 'running':
+            return self.started_at is not None and self.started_at < timezone.now() - self.FAN_OUT_LEASE
+        return self.status == 'failed'
+
+
+class NotificationWatermark(models.Model):
+    """Newest booking decision a student has seen (see tourist_spots.bookings.bookings_seen_at)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='notification_watermark')
+    package_bookings_seen_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.user.username} saw bookings up to {self.package_bookings_seen_at}"
+
+
+class DailyPackageStats(models.Model):
+    """Package bookings created on one day, per package, department and current status.
+
+    Maintained by tourist_spots.reporting; the reports read only this table.
+    """
+    day = models.DateField()
+    package = models.ForeignKey(TourPackage, on_delete=models.CASCADE, related_name='daily_stats')
+    department = models.CharField(max_length=100)
+    status = models.CharField(max_length=20)
+    bookings = models.PositiveIntegerField(default=0)
+    persons = models.PositiveIntegerField(default=0)
+    paid_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    fully_paid = models.PositiveIntegerField(default=0, help_text="Bookings with nothing left to pay")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'package', 'department', 'status'], name='daily_package_stats_key'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='daily_package_stats_day_idx'),
+        ]
+
+
+class DailyStudyTourStats(models.Model):
+    """Study tour bookings made on one day, per tour and current status (see tourist_spots.reporting)"""
+    day = models.DateField()
+    study_tour = models.ForeignKey('accounts.StudyTour', on_delete=models.CASCADE, related_name='daily_stats')
+    status = models.CharField(max_length=20)
+    bookings = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    paid = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'study_tour', 'status'], name='daily_tour_stats_key'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='daily_tour_stats_day_idx'),
+        ]
+
+
+class ReportingWatermark(models.Model):
+    """How far the reporting tables have been refreshed"""
+    name = models.CharField(max_length=50, unique=True)
+    refreshed_through = models.DateTimeField(null=True, blank=True)
+    last_full_rebuild = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} through {self.refreshed_through}"
+
+
+class ReportingDirtyDay(models.Model):
+    """A day whose stats lost a deleted booking; deletions leave nothing for the watermark to find"""
+    SOURCE_CHOICES = [
+        ('package', 'Package Booking'),
+        ('study_tour', 'Study Tour Booking'),
+    ]
+
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    day = models.DateField()
+    object_id = models.PositiveIntegerField()  # package or study tour id
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class ApiToken(models.Model):
+    """Credential for an external system reading the API; only a hash of the key is stored"""
+    name = models.CharField(max_length=100, help_text="Who uses this token, e.g. Finance ERP")
+    key_hash = models.CharField(max_length=64, unique=True)
+    is_active = models.BooleanField(default=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+class ChangeTombstone(models.Model):
+    """A deleted row, reported by the change feed so consumers can drop their copy"""
+    object_type = models.CharField(max_length=50)  # change feed type, e.g. "package_booking"
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_changes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.object_type} #{self.object_id} deleted {self.deleted_at}"
@@ -0,0 +1,172 @@
+"""Transactional email outbox.
+
+Status changes call notify() inside the transaction that makes the change,
+so a message is queued if and only if the change commits. Nothing is sent
+during the request: `manage.py send_outbox` drains the table in batches over
+one reused connection to the email backend, retrying failures with backoff.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = getattr(settings, 'OUTBOX_BATCH_SIZE', 200)
+OUTBOX_MAX_ATTEMPTS = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+# A claimed batch goes back to the queue if its dispatcher dies for this long
+SEND_LEASE = timedelta(minutes=5)
+RETRY_BASE_DELAY = timedelta(minutes=1)
+INSERT_BATCH_SIZE = 1000
+
+# Booking statuses students are emailed about; their own cancellations are not
+PACKAGE_BOOKING_EVENTS = {'approved', 'rejected', 'waitlisted'}
+PAYMENT_EVENTS = {'verified', 'rejected'}
+TRAVEL_REQUEST_EVENTS = {'approved', 'rejected'}
+
+
+def build_message(event, recipient, subject, template, context):
+    """Unsaved outbox row for one email; None when there is nobody to send it to"""
+    if not recipient:
+        return None
+    return OutboxMessage(
+        event=event,
+        recipient=recipient,
+        subject=subject,
+        body=get_template(template).render(context),
+    )
+
+
+def notify(*messages):
+    """Queue messages built by the *_notice() helpers (None entries are skipped).
+
+    Call inside the transaction that changes the status being reported.
+    """
+    messages = [m for m in messages if m is not None]
+    if messages:
+        OutboxMessage.objects.bulk_create(messages, batch_size=INSERT_BATCH_SIZE)
+    return len(messages)
+
+
+def package_booking_notice(booking):
+    if booking.status not in PACKAGE_BOOKING_EVENTS:
+        return None
+    return build_message(
+        f'package_booking.{booking.status}',
+        booking.email,
+        f'Your booking for {booking.package.name} is {booking.get_status_display().lower()}',
+        'emails/package_booking_status.txt',
+        {'booking': booking, 'package': booking.package},
+    )
+
+
+def payment_notice(payment):
+    if payment.status not in PAYMENT_EVENTS:
+        return None
+    booking = payment.booking
+    return build_message(
+        f'payment.{payment.status}',
+        booking.email,
+        f'Your payment for {booking.package.name} was {payment.get_status_display().lower()}',
+        'emails/payment_status.txt',
+        {'payment': payment, 'booking': booking, 'package': booking.package},
+    )
+
+
+def travel_request_notice(travel_request):
+    if travel_request.status not in TRAVEL_REQUEST_EVENTS:
+        return None
+    return build_message(
+        f'travel_request.{travel_request.status}',
+        travel_request.user.email,
+        f'Your travel request for {travel_request.place_name} was {travel_request.status}',
+        'emails/travel_request_status.txt',
+        {'travel_request': travel_request, 'user': travel_request.user},
+    )
+
+
+def study_tour_booking_notice(booking, promoted=False):
+    event = 'study_tour_booking.promoted' if promoted else f'study_tour_booking.{booking.status}'
+    if promoted:
+        subject = f'A slot opened up: you are booked on {booking.study_tour.name}'
+    else:
+        subject = f'Your {booking.study_tour.name} booking is now {booking.status}'
+    return build_message(
+        event,
+        booking.user.email,
+        subject,
+        'emails/study_tour_booking_status.txt',
+        {'booking': booking, 'user': booking.user, 'tour_date': booking.tour_date, 'promoted': promoted},
+    )
+
+
+def claim_batch(batch_size):
+    """Mark up to batch_size due messages as sending and return them"""
+    now = timezone.now()
+    lease_until = now + SEND_LEASE
+    due = Q(status='pending', next_attempt_at__lte=now) | Q(status='sending', next_attempt_at__lt=now)
+    with transaction.atomic():
+        candidates = OutboxMessage.objects.filter(due).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('id', flat=True)[:batch_size])
+        OutboxMessage.objects.filter(due, id__in=ids).update(status='sending', next_attempt_at=lease_until)
+    return list(OutboxMessage.objects.filter(id__in=ids, status='sending', next_attempt_at=lease_until))
+
+
+def dispatch_batch(batch_size=OUTBOX_BATCH_SIZE, max_attempts=OUTBOX_MAX_ATTEMPTS, email_connection=None):
+    """Send one batch of due messages over a single backend connection.
+
+    Returns (sent, failed) counts. Failed messages are retried with
+    exponential backoff until max_attempts, then marked failed.
+    """
+    messages = claim_batch(batch_size)
+    if not messages:
+        return 0, 0
+
+    email_connection = email_connection or get_connection()
+    sent_ids, failures = [], []
+    email_connection.open()
+    try:
+        for message in messages:
+            email = EmailMessage(
+                message.subject, message.body, settings.DEFAULT_FROM_EMAIL, [message.recipient],
+                connection=email_connection,
+            )
+            try:
+                email_connection.send_messages([email])
+            except Exception as exc:
+                logger.warning('Outbox message %s to %s failed: %s', message.id, message.recipient, exc)
+                failures.append((message, str(exc)))
+                # The connection may be broken; start the rest of the batch on a fresh one
+                try:
+                    email_connection.close()
+                    email_connection.open()
+                except Exception:
+                    logger.exception('Could not reopen the email connection')
+            else:
+                sent_ids.append(message.id)
+    finally:
+        email_connection.close()
+
+    now = timezone.now()
+    OutboxMessage.objects.filter(id__in=sent_ids).update(
+        status='sent', sent_at=now, attempts=F('attempts') + 1, last_error=''
+    )
+    for message, error in failures:
+        attempts = message.attempts + 1
+        if attempts >= max_attempts:
+            status, next_attempt_at = 'failed', now
+        else:
+            status, next_attempt_at = 'pending', now + RETRY_BASE_DELAY * 2 ** (attempts - 1)
+        OutboxMessage.objects.filter(pk=message.pk).update(
+            status=status, attempts=attempts, next_attempt_at=next_attempt_at, last_error=error[:2000]
+        )
+    return len(sent_ids), len(failures)
@@ -0,0 +1,285 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Value, When
+from django.utils import timezone
+
+from .models import PackageBooking, Payment, PaymentLedgerEntry
+from .notifications import notify, payment_notice
+
+# Review queue: payments handed to an admin per claim, and how long they keep them
+REVIEW_BATCH_SIZE = 10
+REVIEW_LEASE = timedelta(minutes=10)
+
+# Single-statement create-or-update backed by the unique_payment_per_booking
+# constraint. Works on PostgreSQL and SQLite 3.35+ (both support
+# ON CONFLICT ... DO UPDATE and RETURNING).
+UPSERT_PAYMENT_SQL = """
+INSERT INTO {table} ({booking}, {amount}, {bkash}, {status}, {notes}, {created}, {updated})
+VALUES (%s, %s, %s, %s, '', %s, %s)
+ON CONFLICT ({booking}) DO UPDATE SET
+    {amount} = EXCLUDED.{amount},
+    {bkash} = EXCLUDED.{bkash},
+    {status} = EXCLUDED.{status},
+    {updated} = EXCLUDED.{updated},
+    {claimed_by} = NULL,
+    {claimed_until} = NULL
+RETURNING {columns}
+"""
+
+
+class PaymentClaimed(Exception):
+    """Another admin holds an unexpired review lease on the payment"""
+
+    def __init__(self, payment):
+        self.payment = payment
+        super().__init__(f'{payment.claimed_by.username} is reviewing this payment.')
+
+
+def _column(name):
+    return connection.ops.quote_name(Payment._meta.get_field(name).column)
+
+
+def _prep(name, value):
+    return Payment._meta.get_field(name).get_db_prep_save(value, connection)
+
+
+def upsert_payment(booking, amount_paid, bkash_last_4):
+    """Create the booking's payment, or overwrite it and send it back to pending.
+
+    One round trip: the row is written and read back by the same statement,
+    so concurrent submissions for a booking always end up on a single row.
+    """
+    now = timezone.now()
+    sql = UPSERT_PAYMENT_SQL.format(
+        table=connection.ops.quote_name(Payment._meta.db_table),
+        booking=_column('booking'),
+        amount=_column('amount_paid'),
+        bkash=_column('bkash_last_4'),
+        status=_column('status'),
+        notes=_column('admin_notes'),
+        created=_column('created_at'),
+        updated=_column('updated_at'),
+        claimed_by=_column('claimed_by'),
+        claimed_until=_column('claimed_until'),
+        columns=', '.join(_column(f.name) for f in Payment._meta.concrete_fields),
+    )
+    params = [
+        booking.pk,
+        _prep('amount_paid', amount_paid),
+        bkash_last_4,
+        'pending',
+        _prep('created_at', now),
+        _prep('updated_at', now),
+    ]
+    # raw() maps the RETURNING columns onto a Payment, applying the backend's converters
+    return next(iter(Payment.objects.raw(sql, params)))
+
+
+@transaction.atomic
+def post_ledger_entry(booking, amount, entry_type, payment=None, recorded_by=None, note=''):
+    """Append a ledger entry and move the booking's paid_total/balance by the same amount.
+
+    The totals are changed with a relative UPDATE, so concurrent entries for
+    one booking cannot overwrite each other.
+    """
+    PackageBooking.objects.filter(pk=booking.pk).update(
+        paid_total=F('paid_total') + amount,
+        balance=F('balance') - amount,
+        updated_at=timezone.now(),
+    )
+    booking.refresh_from_db(fields=['paid_total', 'balance'])
+    return PaymentLedgerEntry.objects.create(
+        booking=booking,
+        payment=payment,
+        entry_type=entry_type,
+        amount=amount,
+        balance_after=booking.balance,
+        bkash_last_4=payment.bkash_last_4 if payment else '',
+        note=note,
+        recorded_by=recorded_by,
+    )
+
+
+@transaction.atomic
+def mark_payment_verified(payment_id, admin, admin_notes=''):
+    """Verify a submitted payment, crediting it to the booking's ledger once.
+
+    Raises PaymentClaimed if another admin is reviewing it.
+    """
+    payment = _lock_for_review(payment_id, admin)
+    if payment.status != 'verified':
+        post_ledger_entry(payment.booking, payment.amount_paid, 'payment', payment, admin, admin_notes)
+    payment.status = 'verified'
+    payment.admin_notes = admin_notes
+    _mark_reviewed(payment, admin)
+    payment.save()
+    notify(payment_notice(payment))
+    return payment
+
+
+@transaction.atomic
+def mark_payment_rejected(payment_id, admin, admin_notes=''):
+    """Reject a payment; if it had been verified, its credit is reversed in the ledger.
+
+    Raises PaymentClaimed if another admin is reviewing it.
+    """
+    payment = _lock_for_review(payment_id, admin)
+    if payment.status == 'verified':
+        post_ledger_entry(payment.booking, -payment.amount_paid, 'reversal', payment, admin, admin_notes)
+    payment.status = 'rejected'
+    payment.admin_notes = admin_notes
+    _mark_reviewed(payment, admin)
+    payment.save()
+    notify(payment_notice(payment))
+    return payment
+
+
+def _lock_for_review(payment_id, admin):
+    # The lease is checked on the locked row, so a claim taken since the page
+    # was loaded is seen and two admins cannot both decide the payment
+    payment = Payment.objects.select_for_update().select_related('booking__package', 'claimed_by').get(pk=payment_id)
+    if payment.is_claimed_by_other(admin):
+        raise PaymentClaimed(payment)
+    return payment
+
+
+def _mark_reviewed(payment, admin):
+    payment.reviewed_by = admin
+    payment.reviewed_at = timezone.now()
+    payment.claimed_by = None
+    payment.claimed_until = None
+
+
+def bulk_verify_payments(expected, admin, admin_notes='', batch_size=500):
+    """Verify many pending payments at once, crediting each booking's ledger.
+
+    ``expected`` maps payment id -> (bkash_last_4, amount_paid) as they were
+    matched. Inside one transaction the payments are locked and re-checked;
+    any that are no longer pending with those exact values are left alone.
+    Returns the ids that were verified.
+    """
+    with transaction.atomic():
+        payments = []
+        ids = list(expected)
+        for start in range(0, len(ids), batch_size):
+            payments.extend(
+                Payment.objects.select_for_update()
+                .filter(id__in=ids[start:start + batch_size], status='pending')
+                .only('id', 'booking_id', 'bkash_last_4', 'amount_paid')
+            )
+        payments = [p for p in payments if (p.bkash_last_4, p.amount_paid) == expected[p.id]]
+        now = timezone.now()
+
+        for start in range(0, len(payments), batch_size):
+            batch = payments[start:start + batch_size]
+            Payment.objects.filter(id__in=[p.id for p in batch]).update(
+                status='verified', admin_notes=admin_notes, updated_at=now,
+                reviewed_by=admin, reviewed_at=now, claimed_by=None, claimed_until=None,
+            )
+            # One UPDATE per batch: each booking moves by its own payment's amount
+            credit = Case(
+                *[When(pk=p.booking_id, then=Value(p.amount_paid)) for p in batch],
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            )
+            booking_ids = [p.booking_id for p in batch]
+            PackageBooking.objects.filter(pk__in=booking_ids).update(
+                paid_total=F('paid_total') + credit,
+                balance=F('balance') - credit,
+                updated_at=timezone.now(),
+            )
+            balances = dict(PackageBooking.objects.filter(pk__in=booking_ids).values_list('pk', 'balance'))
+            PaymentLedgerEntry.objects.bulk_create([
+                PaymentLedgerEntry(
+                    booking_id=p.booking_id,
+                    payment_id=p.id,
+                    entry_type='payment',
+                    amount=p.amount_paid,
+                    balance_after=balances[p.booking_id],
+                    bkash_last_4=p.bkash_last_4,
+                    note=admin_notes,
+                    recorded_by=admin,
+                )
+                for p in batch
+            ])
+            notify(*[
+                payment_notice(payment)
+                for payment in Payment.objects.filter(id__in=[p.id for p in batch]).select_related('booking__package')
+            ])
+    return [p.id for p in payments]
+
+
+def claim_payments(admin, batch_size=REVIEW_BATCH_SIZE, lease=REVIEW_LEASE):
+    """Lease up to batch_size pending payments to an admin for review.
+
+    The admin keeps (and renews) the payments already leased to them and is
+    topped up with the oldest unclaimed or expired ones. On databases with
+    SKIP LOCKED, rows another admin is claiming at the same moment are
+    skipped instead of waited on; the conditional UPDATE makes the claim
+    safe on the others too. Returns the admin's leased payments.
+    """
+    now = timezone.now()
+    claimable = Q(claimed_until__isnull=True) | Q(claimed_until__lt=now)
+    with transaction.atomic():
+        held = Payment.objects.filter(claimed_by=admin, claimed_until__gte=now, status='pending').update(
+            claimed_until=now + lease
+        )
+        candidates = Payment.objects.filter(claimable, status='pending').order_by('created_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('id', flat=True)[:max(batch_size - held, 0)])
+        Payment.objects.filter(claimable, id__in=ids, status='pending').update(
+            claimed_by=admin, claimed_until=now + lease
+        )
+    return list(
+        Payment.objects.filter(claimed_by=admin, claimed_until__gt=now, status='pending')
+        .select_related('booking__package')
+        .order_by('created_at', 'id')
+    )
+
+
+def release_claims(admin):
+    """Hand the admin's unreviewed payments back to the queue"""
+    return Payment.objects.filter(claimed_by=admin, status='pending').update(claimed_by=None, claimed_until=None)
+
+
+def review_queue_stats(since):
+    """Queue depth and per-admin review throughput since the given time"""
+    now = timezone.now()
+    pending = Payment.objects.filter(status='pending')
+    leased = Q(claimed_until__gt=now)
+    depth = pending.aggregate(
+        total=Count('id'),
+        claimed=Count('id', filter=leased),
+    )
+    depth['unclaimed'] = depth['total'] - depth['claimed']
+    claimed_by = dict(
+        pending.filter(leased).values_list('claimed_by__username').annotate(count=Count('id'))
+    )
+    reviewed = (
+        Payment.objects.filter(reviewed_at__gte=since, reviewed_by__isnull=False)
+        .values('reviewed_by__username')
+        .annotate(
+            reviewed=Count('id'),
+            verified=Count('id', filter=Q(status='verified')),
+            rejected=Count('id', filter=Q(status='rejected')),
+        )
+        .order_by('-reviewed')
+    )
+    hours = max((now - since).total_seconds() / 3600, 1 / 60)
+    admins = [
+        {
+            'admin': row['reviewed_by__username'],
+            'reviewed': row['reviewed'],
+            'verified': row['verified'],
+            'rejected': row['rejected'],
+            'per_hour': round(row['reviewed'] / hours, 1),
+            'claimed': claimed_by.pop(row['reviewed_by__username'], 0),
+        }
+        for row in reviewed
+    ]
+    admins += [
+        {'admin': username, 'reviewed': 0, 'verified': 0, 'rejected': 0, 'per_hour': 0, 'claimed': count}
+        for username, count in claimed_by.items()
+    ]
+    return {'depth': depth, 'admins': admins}
@@ -0,0 +1,293 @@
+"""Booking and revenue reports, served from pre-aggregated daily tables.
+
+DailyPackageStats and DailyStudyTourStats hold one row per day (the day the
+booking was made) x package/tour x status (x department for packages). A
+refresh finds the bookings changed since the last run through their
+updated_at column, plus the days that lost a deleted booking, and recomputes
+just those days. Recomputing a whole day rather than applying deltas keeps
+the tables correct however a booking moved between statuses. The dashboard
+and JSON endpoint never read the booking tables.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Trim, TruncDate, Upper
+from django.utils import timezone
+
+from accounts.models import StudyTourBooking
+
+from .models import (
+    DailyPackageStats, DailyStudyTourStats, PackageBooking, ReportingDirtyDay, ReportingWatermark, TourPackage,
+)
+
+WATERMARK_NAME = 'bookings'
+# Rows committed by a transaction that started before the last refresh can
+# carry an updated_at just behind the watermark; look back far enough to catch them.
+REFRESH_OVERLAP = timedelta(minutes=10)
+DAYS_PER_QUERY = 100
+
+
+def day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def keys_filter(keys, field, object_field):
+    """Q matching rows on any of the (day, object id) keys, one range per day"""
+    by_day = defaultdict(set)
+    for day, object_id in keys:
+        by_day[day].add(object_id)
+    q = Q(pk__in=[])
+    for day, object_ids in by_day.items():
+        start, end = day_bounds(day)
+        q |= Q(**{f'{field}__gte': start, f'{field}__lt': end, f'{object_field}__in': object_ids})
+    return q
+
+
+def package_stats_rows(bookings):
+    rows = (
+        bookings.annotate(stat_day=TruncDate('created_at'), dept=Upper(Trim('department')))
+        .values('stat_day', 'package_id', 'dept', 'status')
+        .annotate(
+            count=Count('id'),
+            persons_sum=Sum('num_persons'),
+            paid_sum=Sum('paid_total'),
+            balance_sum=Sum('balance'),
+            fully_paid_count=Count('id', filter=Q(balance__lte=0)),
+        )
+        .order_by()
+    )
+    return [
+        DailyPackageStats(
+            day=row['stat_day'], package_id=row['package_id'], department=row['dept'], status=row['status'],
+            bookings=row['count'], persons=row['persons_sum'], paid_total=row['paid_sum'],
+            balance=row['balance_sum'], fully_paid=row['fully_paid_count'],
+        )
+        for row in rows
+    ]
+
+
+def study_tour_stats_rows(bookings):
+    rows = (
+        bookings.annotate(stat_day=TruncDate('booking_date'))
+        .values('stat_day', 'study_tour_id', 'status')
+        .annotate(
+            count=Count('id'),
+            revenue_sum=Sum('total_price'),
+            paid_count=Count('id', filter=Q(payment_status='paid')),
+        )
+        .order_by()
+    )
+    return [
+        DailyStudyTourStats(
+            day=row['stat_day'], study_tour_id=row['study_tour_id'], status=row['status'],
+            bookings=row['count'], revenue=row['revenue_sum'], paid=row['paid_count'],
+        )
+        for row in rows
+    ]
+
+
+def recompute_package_days(keys):
+    keys = sorted(keys)
+    for start in range(0, len(keys), DAYS_PER_QUERY):
+        chunk = keys[start:start + DAYS_PER_QUERY]
+        DailyPackageStats.objects.filter(
+            Q(*[Q(day=day, package_id=package_id) for day, package_id in chunk], _connector=Q.OR)
+        ).delete()
+        DailyPackageStats.objects.bulk_create(
+            package_stats_rows(PackageBooking.objects.filter(keys_filter(chunk, 'created_at', 'package_id')))
+        )
+
+
+def recompute_study_tour_days(keys):
+    keys = sorted(keys)
+    for start in range(0, len(keys), DAYS_PER_QUERY):
+        chunk = keys[start:start + DAYS_PER_QUERY]
+        DailyStudyTourStats.objects.filter(
+            Q(*[Q(day=day, study_tour_id=tour_id) for day, tour_id in chunk], _connector=Q.OR)
+        ).delete()
+        DailyStudyTourStats.objects.bulk_create(
+            study_tour_stats_rows(StudyTourBooking.objects.filter(keys_filter(chunk, 'booking_date', 'study_tour_id')))
+        )
+
+
+def changed_keys(since):
+    """(day, object id) keys touched since the given time, by source"""
+    package_keys = set(
+        PackageBooking.objects.filter(updated_at__gt=since)
+        .annotate(stat_day=TruncDate('created_at'))
+        .values_list('stat_day', 'package_id')
+        .distinct()
+        .order_by()
+    )
+    tour_keys = set(
+        StudyTourBooking.objects.filter(updated_at__gt=since)
+        .annotate(stat_day=TruncDate('booking_date'))
+        .values_list('stat_day', 'study_tour_id')
+        .distinct()
+        .order_by()
+    )
+    return package_keys, tour_keys
+
+
+def refresh_reports(full=False):
+    """Bring the daily stats tables up to date; full=True rebuilds them from scratch.
+
+    Returns a dict with the number of (day, package) and (day, tour) keys
+    recomputed. Only one refresh runs at a time: the watermark row is locked.
+    """
+    started = timezone.now()
+    with transaction.atomic():
+        ReportingWatermark.objects.get_or_create(name=WATERMARK_NAME)
+        watermark = ReportingWatermark.objects.select_for_update().get(name=WATERMARK_NAME)
+        full = full or watermark.refreshed_through is None
+        dirty = list(ReportingDirtyDay.objects.filter(created_at__lte=started).values_list('id', 'source', 'day', 'object_id'))
+
+        if full:
+            DailyPackageStats.objects.all().delete()
+            DailyStudyTourStats.objects.all().delete()
+            DailyPackageStats.objects.bulk_create(package_stats_rows(PackageBooking.objects.all()), batch_size=1000)
+            DailyStudyTourStats.objects.bulk_create(study_tour_stats_rows(StudyTourBooking.objects.all()), batch_size=1000)
+            package_keys = set(DailyPackageStats.objects.values_list('day', 'package_id').distinct().order_by())
+            tour_keys = set(DailyStudyTourStats.objects.values_list('day', 'study_tour_id').distinct().order_by())
+            watermark.last_full_rebuild = started
+        else:
+            package_keys, tour_keys = changed_keys(watermark.refreshed_through - REFRESH_OVERLAP)
+            package_keys |= {(day, object_id) for _, source, day, object_id in dirty if source == 'package'}
+            tour_keys |= {(day, object_id) for _, source, day, object_id in dirty if source == 'study_tour'}
+            recompute_package_days(package_keys)
+            recompute_study_tour_days(tour_keys)
+
+        ReportingDirtyDay.objects.filter(id__in=[d[0] for d in dirty]).delete()
+        watermark.refreshed_through = started
+        watermark.save()
+    return {'full': full, 'package_days': len(package_keys), 'study_tour_days': len(tour_keys)}
+
+
+def mark_day_dirty(source, moment, object_id):
+    """Record that a deleted booking's day needs recomputing"""
+    ReportingDirtyDay.objects.create(source=source, day=timezone.localdate(moment), object_id=object_id)
+
+
+def check_consistency():
+    """Compare the stats tables with live totals per package/tour and status.
+
+    Returns a list of mismatch descriptions (empty when consistent). Only
+    meaningful straight after a refresh; later changes show up as drift.
+    """
+    mismatches = []
+    checks = [
+        (
+            'package',
+            PackageBooking.objects.values('package_id', 'status').annotate(
+                booking_count=Count('id'), person_count=Sum('num_persons'),
+                paid_sum=Sum('paid_total'), balance_sum=Sum('balance'),
+            ),
+            DailyPackageStats.objects.values('package_id', 'status').annotate(
+                booking_count=Sum('bookings'), person_count=Sum('persons'),
+                paid_sum=Sum('paid_total'), balance_sum=Sum('balance'),
+            ),
+            'package_id',
+        ),
+        (
+            'study tour',
+            StudyTourBooking.objects.values('study_tour_id', 'status').annotate(
+                booking_count=Count('id'), revenue_sum=Sum('total_price'),
+            ),
+            DailyStudyTourStats.objects.values('study_tour_id', 'status').annotate(
+                booking_count=Sum('bookings'), revenue_sum=Sum('revenue'),
+            ),
+            'study_tour_id',
+        ),
+    ]
+    for label, live, stored, key_field in checks:
+        live = {(row[key_field], row['status']): row for row in live.order_by()}
+        stored = {(row[key_field], row['status']): row for row in stored.order_by()}
+        for key in sorted(set(live) | set(stored), key=str):
+            expected, actual = live.get(key, {}), stored.get(key, {})
+            for metric in ('booking_count', 'person_count', 'paid_sum', 'balance_sum', 'revenue_sum'):
+                if metric not in expected and metric not in actual:
+                    continue
+                if (expected.get(metric) or 0) != (actual.get(metric) or 0):
+                    mismatches.append(
+                        f'{label} {key[0]} {key[1]}: {metric} is {actual.get(metric) or 0} in the report, '
+                        f'{expected.get(metric) or 0} live'
+                    )
+    return mismatches
+
+
+def report_summary(start, end):
+    """Bookings, approvals, revenue and payment completion for days start..end, from the stats tables"""
+    package_stats = DailyPackageStats.objects.filter(day__gte=start, day__lte=end)
+    tour_stats = DailyStudyTourStats.objects.filter(day__gte=start, day__lte=end)
+    metrics = dict(
+        booking_count=Sum('bookings'),
+        person_count=Sum('persons'),
+        approved=Sum('bookings', filter=Q(status='approved')),
+        revenue=Sum('paid_total'),
+        outstanding=Sum('balance', filter=Q(status='approved')),
+        fully_paid_count=Sum('fully_paid', filter=Q(status='approved')),
+    )
+
+    def with_completion(row, **names):
+        row = {names.get(k, k): v for k, v in row.items()}
+        for metric in metrics:
+            row[metric] = row[metric] or 0
+        row['payment_completion'] = round(row['fully_paid_count'] / row['approved'] * 100, 1) if row['approved'] else 0
+        return row
+
+    def rows(group_by, **names):
+        return [
+            with_completion(row, **names)
+            for row in package_stats.values(*group_by).annotate(**metrics).order_by(*group_by)
+        ]
+
+    totals = with_completion(package_stats.aggregate(**metrics))
+    refreshed_through = (
+        ReportingWatermark.objects.filter(name=WATERMARK_NAME).values_list('refreshed_through', flat=True).first()
+    )
+    package_names = dict(TourPackage.objects.values_list('id', 'name'))
+    by_package = rows(['package_id', 'package__category'], package__category='category')
+    for row in by_package:
+        row['package'] = package_names.get(row['package_id'], '')
+    categories = dict(TourPackage.CATEGORY_CHOICES)
+    by_category = rows(['package__category'], package__category='category')
+    for row in by_category:
+        row['category_display'] = categories.get(row['category'], row['category'])
+
+    return {
+        'start': start,
+        'end': end,
+        'totals': totals,
+        'by_day': rows(['day']),
+        'by_package': by_package,
+        'by_category': by_category,
+        'by_department': rows(['department']),
+        'study_tours': list(
+            tour_stats.values('study_tour_id', 'study_tour__name')
+            .annotate(
+                booking_count=Sum('bookings'),
+                confirmed=Sum('bookings', filter=Q(status__in=['confirmed', 'completed'])),
+                confirmed_value=Sum('revenue', filter=Q(status__in=['confirmed', 'completed'])),
+                paid_count=Sum('paid'),
+            )
+            .order_by('study_tour__name')
+        ),
+        'refreshed_through': refreshed_through,
+    }
+
+
+def jsonable(value):
+    """report_summary() or search_packages() output with dates and decimals converted for JsonResponse"""
+    if isinstance(value, dict):
+        return {k: jsonable(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [jsonable(v) for v in value]
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
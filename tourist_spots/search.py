@@ -0,0 +1,164 @@
+"""Faceted search over active tour packages.
+
+Packages are filtered on category, destination, price and duration_days (the
+length parsed out of the free-text duration on save), all covered by
+TourPackage's search indexes. The facet counts for every filter come from a
+single GROUP BY over the matching packages, summed up in Python; the same
+rows give the total, so a page costs two queries: facets and one page of
+results. With a shared cache (settings.SHARED_CACHE) answers are cached under
+a catalog version that is bumped whenever a package is saved or deleted; a
+per-process cache would only see the bump in the worker that made it, so
+without one every search goes to the database.
+"""
+import hashlib
+import json
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import TourPackage
+
+SEARCH_PAGE_SIZE = 24
+SEARCH_CACHE_TIMEOUT = getattr(settings, 'SEARCH_CACHE_TIMEOUT', 300)
+CATALOG_VERSION_KEY = 'packages:version'
+
+# (min_price, max_price, label), both inclusive, as the facet links filter on them
+PRICE_BANDS = [
+    (None, Decimal('1999.99'), 'Under ৳2,000'),
+    (Decimal('2000'), Decimal('4999.99'), '৳2,000 - ৳5,000'),
+    (Decimal('5000'), Decimal('9999.99'), '৳5,000 - ৳10,000'),
+    (Decimal('10000'), None, '৳10,000 and up'),
+]
+
+SORTS = {
+    'newest': ['-created_at', '-id'],
+    'price': ['price', 'id'],
+    '-price': ['-price', '-id'],
+    'duration': [F('duration_days').asc(nulls_last=True), 'id'],
+}
+
+RESULT_FIELDS = ['id', 'name', 'category', 'destination', 'duration', 'duration_days', 'price', 'image']
+
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.set(CATALOG_VERSION_KEY, version, None)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate cached search answers once the current transaction commits"""
+    transaction.on_commit(lambda: cache.set(CATALOG_VERSION_KEY, time.time_ns(), None))
+
+
+def filter_packages(filters):
+    packages = TourPackage.objects.filter(is_active=True)
+    if filters.get('category'):
+        packages = packages.filter(category=filters['category'])
+    if filters.get('destination'):
+        packages = packages.filter(destination=filters['destination'])
+    if filters.get('min_price') is not None:
+        packages = packages.filter(price__gte=filters['min_price'])
+    if filters.get('max_price') is not None:
+        packages = packages.filter(price__lte=filters['max_price'])
+    if filters.get('min_days') is not None:
+        packages = packages.filter(duration_days__gte=filters['min_days'])
+    if filters.get('max_days') is not None:
+        packages = packages.filter(duration_days__lte=filters['max_days'])
+    return packages
+
+
+def band_filter(low, high):
+    bounds = {}
+    if low is not None:
+        bounds['price__gte'] = low
+    if high is not None:
+        bounds['price__lte'] = high
+    return Q(**bounds)
+
+
+def facet_counts(packages):
+    """(total, facets) for the packages, from one grouped query.
+
+    Groups follow tourpackage_search_idx's column order, so the query reads
+    the index in order without sorting; price bands are counted per group.
+    """
+    bands = {f'band_{band}': Count('id', filter=band_filter(low, high)) for band, (low, high, _) in enumerate(PRICE_BANDS)}
+    rows = (
+        packages.values('category', 'destination', 'duration_days')
+        .annotate(count=Count('id'), **bands)
+        .order_by()
+    )
+    counts = {'category': {}, 'destination': {}, 'duration_days': {}, 'band': {}}
+    total = 0
+    for row in rows:
+        total += row['count']
+        for facet in ('category', 'destination', 'duration_days'):
+            counts[facet][row[facet]] = counts[facet].get(row[facet], 0) + row['count']
+        for band in range(len(PRICE_BANDS)):
+            counts['band'][band] = counts['band'].get(band, 0) + row[f'band_{band}']
+
+    categories = dict(TourPackage.CATEGORY_CHOICES)
+    return total, {
+        'category': [
+            {'value': value, 'label': categories.get(value, value), 'count': count}
+            for value, count in sorted(counts['category'].items())
+        ],
+        'destination': [
+            {'value': value, 'label': value, 'count': count}
+            for value, count in sorted(counts['destination'].items(), key=lambda item: (-item[1], item[0]))
+        ],
+        'duration_days': [
+            {'value': value, 'label': f'{value} day{"s" if value != 1 else ""}', 'count': count}
+            for value, count in sorted(item for item in counts['duration_days'].items() if item[0] is not None)
+        ],
+        'price': [
+            {'min': PRICE_BANDS[band][0], 'max': PRICE_BANDS[band][1], 'label': PRICE_BANDS[band][2], 'count': count}
+            for band, count in sorted(counts['band'].items())
+            if count
+        ],
+    }
+
+
+def search_packages(filters, sort='newest', page=1):
+    """One page of matching packages with facet counts and the total.
+
+    filters holds any of category, destination, min_price, max_price,
+    min_days and max_days (cleaned values). Results are plain dicts, the
+    same for the page and the JSON endpoint.
+    """
+    sort = sort if sort in SORTS else 'newest'
+    page = max(page or 1, 1)
+    if not settings.SHARED_CACHE:
+        return run_search(filters, sort, page)
+    params = json.dumps({'filters': filters, 'sort': sort, 'page': page}, sort_keys=True, default=str)
+    key = f'packages:search:{catalog_version()}:{hashlib.md5(params.encode()).hexdigest()}'
+    answer = cache.get(key)
+    if answer is None:
+        answer = run_search(filters, sort, page)
+        cache.set(key, answer, SEARCH_CACHE_TIMEOUT)
+    return answer
+
+
+def run_search(filters, sort, page):
+    packages = filter_packages(filters)
+    total, facets = facet_counts(packages)
+    offset = (page - 1) * SEARCH_PAGE_SIZE
+    results = list(packages.order_by(*SORTS[sort]).values(*RESULT_FIELDS)[offset:offset + SEARCH_PAGE_SIZE])
+    image_storage = TourPackage._meta.get_field('image').storage
+    for result in results:
+        result['image_url'] = image_storage.url(result['image']) if result['image'] else ''
+    return {
+        'total': total,
+        'page': page,
+        'pages': max((total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE, 1),
+        'sort': sort,
+        'facets': facets,
+        'results': results,
+    }
@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import StudyTourBooking
+
+from .changes import SOURCES, record_deletion
+from .models import PackageBooking, TourPackage
+from .reporting import mark_day_dirty
+from .search import bump_catalog_version
+
+
+@receiver(post_delete, sender=PackageBooking)
+def package_booking_deleted(sender, instance, **kwargs):
+    """Deleted bookings leave no updated_at behind, so flag their day for the next report refresh"""
+    mark_day_dirty('package', instance.created_at, instance.package_id)
+
+
+@receiver(post_delete, sender=StudyTourBooking)
+def study_tour_booking_deleted(sender, instance, **kwargs):
+    mark_day_dirty('study_tour', instance.booking_date, instance.study_tour_id)
+
+
+@receiver(post_save, sender=TourPackage)
+@receiver(post_delete, sender=TourPackage)
+def package_changed(sender, instance, **kwargs):
+    """Cached package search answers are stale once any package changes"""
+    bump_catalog_version()
+
+
+def synced_model_deleted(sender, instance, **kwargs):
+    """Leave a tombstone in the change feed for every deleted row it publishes"""
+    record_deletion(instance)
+
+
+for model, _ in SOURCES.values():
+    post_delete.connect(synced_model_deleted, sender=model, dispatch_uid=f'change_tombstone_{model._meta.label_lower}')
@@ -0,0 +1,94 @@
+import threading
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from tourist_spots.allocation import allocate_package
+from tourist_spots.bookings import set_booking_status
+from tourist_spots.models import PackageBooking, Payment, TourPackage
+from tourist_spots.payments import upsert_payment
+
+
+class UpsertPaymentConcurrencyTests(TransactionTestCase):
+    """upsert_payment from many threads at once leaves a single Payment row"""
+
+    THREADS = 8
+    SUBMISSIONS = 10
+
+    def setUp(self):
+        # Threads use their own connections, so the fixtures must be committed;
+        # TransactionTestCase flushes the test database afterwards
+        user = User.objects.create_user(username='payer')
+        package = TourPackage.objects.create(
+            name='Concurrency package', description='-', price=Decimal('10000'), duration='1 day',
+            destination='-', is_active=False, created_by=user,
+        )
+        self.booking = PackageBooking.objects.create(
+            package=package, user=user, student_name='Payer', student_id='0', department='-',
+            semester='-', phone='0', email='payer@example.com', status='approved',
+        )
+
+    def test_concurrent_submissions_leave_one_payment(self):
+        errors = []
+        barrier = threading.Barrier(self.THREADS)
+
+        def submit(worker):
+            try:
+                barrier.wait()
+                for i in range(self.SUBMISSIONS):
+                    payment = upsert_payment(self.booking, Decimal(f'{worker * 1000 + i}.00'), f'{worker:04d}')
+                    if payment.booking_id != self.booking.pk:
+                        errors.append(f'worker {worker}: returned payment for booking {payment.booking_id}')
+            except Exception as exc:
+                errors.append(f'worker {worker}: {exc!r}')
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=submit, args=(n,)) for n in range(self.THREADS)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Payment.objects.filter(booking=self.booking).count(), 1)
+
+
+class WaitlistTests(TestCase):
+    """Waitlisted package bookings get the seats that open up"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='student')
+        self.package = TourPackage.objects.create(
+            name='Small package', description='-', price=Decimal('5000'), duration='2 days',
+            destination='-', capacity=2, created_by=self.user,
+        )
+
+    def book(self, num_persons=1):
+        return PackageBooking.objects.create(
+            package=self.package, user=self.user, student_name='Student', student_id='1', department='CSE',
+            semester='1', phone='0', email='student@example.com', num_persons=num_persons,
+        )
+
+    def statuses(self, *bookings):
+        return [PackageBooking.objects.get(pk=booking.pk).status for booking in bookings]
+
+    def test_cancelling_an_approved_booking_promotes_the_oldest_that_fits(self):
+        first, second, group, third = self.book(), self.book(), self.book(num_persons=3), self.book()
+        allocate_package(self.package.pk, 'fifo')
+        self.assertEqual(self.statuses(first, second, group, third), ['approved', 'approved', 'waitlisted', 'waitlisted'])
+
+        set_booking_status(first.pk, 'cancelled')
+        self.assertEqual(self.statuses(group, third), ['waitlisted', 'approved'])
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.seats_reserved, 2)
+
+    def test_allocation_serves_the_waitlist_before_new_bookings(self):
+        first, second, waiting = self.book(), self.book(), self.book()
+        allocate_package(self.package.pk, 'fifo')
+        TourPackage.objects.filter(pk=self.package.pk).update(capacity=3)
+        late = self.book()
+        allocate_package(self.package.pk, 'lottery', seed='1')
+        self.assertEqual(self.statuses(waiting, late), ['approved', 'waitlisted'])
@@ -26,6 +26,8 @@ urlpatterns = [
     path('packages/study-tour/', views.study_tour_packages, name='study_tour_packages'),
     path('packages/cycling/', views.cycling_packages, name='cycling_packages'),
     path('packages/university-programs/', views.university_program_packages, name='university_program_packages'),
+    path('packages/search/', views.package_search, name='package_search'),
+    path('packages/search/data/', views.package_search_data, name='package_search_data'),
     
     # Package Booking URLs
     path('packages/book/<int:package_id>/', views.book_package, name='book_package'),
@@ -36,12 +38,17 @@ urlpatterns = [
     path('admin-bookings/', views.admin_package_bookings, name='admin_package_bookings'),
     path('admin-bookings/approve/<int:booking_id>/', views.approve_package_booking, name='approve_package_booking'),
     path('admin-bookings/reject/<int:booking_id>/', views.reject_package_booking, name='reject_package_booking'),
+    path('admin-bookings/batch/', views.batch_package_bookings, name='batch_package_bookings'),
     
     # Payment URLs
     path('payment/submit/<int:booking_id>/', views.submit_payment, name='submit_payment'),
     path('payment/verify/<int:payment_id>/', views.verify_payment, name='verify_payment'),
     path('payment/reject/<int:payment_id>/', views.reject_payment, name='reject_payment'),
     path('payment/status/<int:booking_id>/', views.get_booking_payment, name='get_booking_payment'),
+    path('payment/queue/', views.payment_queue, name='payment_queue'),
+    path('payment/queue/claim/', views.claim_payment_batch, name='claim_payment_batch'),
+    path('payment/queue/release/', views.release_payment_claims, name='release_payment_claims'),
+    path('payment/queue/stats/', views.payment_queue_stats, name='payment_queue_stats'),
     
     # Contact Message Management URLs
     path('message/read/<int:message_id>/', views.mark_message_read, name='mark_message_read'),
@@ -55,4 +62,19 @@ urlpatterns = [
     path('travel-request/approve/<int:request_id>/', views.approve_travel_request, name='approve_travel_request'),
     path('travel-request/reject/<int:request_id>/', views.reject_travel_request, name='reject_travel_request'),
     path('travel-request/delete/<int:request_id>/', views.delete_travel_request, name='delete_travel_request'),
-]
\ No newline at end of file
+
+    # Data Export URLs
+    path('exports/', views.export_jobs, name='export_jobs'),
+    path('exports/<slug:kind>/', views.export_data, name='export_data'),
+    path('exports/<slug:kind>/queue/', views.queue_export, name='queue_export'),
+    path('exports/download/<int:job_id>/', views.download_export, name='download_export'),
+
+    # Broadcast URLs
+    path('broadcasts/', views.broadcasts, name='broadcasts'),
+    path('broadcasts/progress/', views.broadcast_progress, name='broadcast_progress'),
+    path('broadcasts/<int:broadcast_id>/retry/', views.retry_broadcast, name='retry_broadcast'),
+
+    # Report URLs
+    path('reports/', views.reports, name='reports'),
+    path('reports/data/', views.reports_data, name='reports_data'),
+]
@@ -1,12 +1,36 @@
+import os
+from datetime import date, timedelta
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db import OperationalError
+from django.db import OperationalError, transaction
 from django.contrib.auth.forms import UserCreationForm
-from .models import TouristSpot, TourPackage, PackageBooking, Payment
-from .forms import TouristSpotForm, TourPackageForm, PackageBookingForm, PaymentForm
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from .models import TouristSpot, TourPackage, PackageBooking, Payment, ExportJob, Broadcast
+from .forms import TouristSpotForm, TourPackageForm, PackageBookingForm, PaymentForm, BroadcastForm, PackageSearchForm
+from .filters import filter_package_bookings, filter_travel_requests
+from .exports import EXPORTS, export_response
+from .idempotency import idempotent
+from .notifications import notify, travel_request_notice
+from .broadcasts import delivery_progress, recipient_emails
+from .reporting import jsonable, report_summary
+from .search import search_packages
+from .changes import (
+    CHANGES_MAX_PAGE_SIZE, CHANGES_PAGE_SIZE, SOURCES, InvalidCursor, authenticate_token, decode_cursor, stream_changes,
+)
+from .bookings import (
+    BATCH_ACTIONS, UNDECIDED_STATUSES, SeatsUnavailable, acknowledge_bookings, batch_update_bookings,
+    bookings_seen_at, set_booking_status, unseen_bookings,
+)
+from .payments import (
+    PaymentClaimed, upsert_payment, mark_payment_verified, mark_payment_rejected,
+    claim_payments, release_claims, review_queue_stats, REVIEW_BATCH_SIZE, REVIEW_LEASE,
+)
+from django.http import JsonResponse, FileResponse, Http404, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.urls import reverse
+from urllib.parse import urlencode
 
 def home(request):
     try:
@@ -40,7 +64,9 @@ def spot_detail(request, spot_id):
     return render(request, 'spot_detail.html', {'spot': spot})
 
 def travel_history(request):
-    return render(request, 'travel_history.html')
+    """Same page as accounts' travel history, which the nav's URL name resolves here"""
+    from accounts.views import travel_history as account_travel_history
+    return account_travel_history(request)
 
 def about(request):
     return render(request, 'about.html')
@@ -203,6 +229,7 @@ from .forms import TourPackageForm, PackageBookingForm
 
 def packages(request):
     """Display all tour packages organized by category with horizontal scrolling"""
+    from accounts.tours import recent_bookings_context
     study_tour_packages = TourPackage.objects.filter(is_active=True, category='study_tour')
     cycling_packages = TourPackage.objects.filter(is_active=True, category='cycling')
     university_packages = TourPackage.objects.filter(is_active=True, category='university_program')
@@ -211,6 +238,7 @@ def packages(request):
         'study_tour_packages': study_tour_packages,
         'cycling_packages': cycling_packages,
         'university_packages': university_packages,
+        **recent_bookings_context(request.user),
     })
 
 
@@ -262,6 +290,57 @@ def university_program_packages(request):
     })
 
 
+def search_query(params, **changes):
+    """Query string for the search page with some filters set (or cleared with None), back on page 1"""
+    params = params.copy()
+    params.pop('page', None)
+    for name, value in changes.items():
+        if value is None:
+            params.pop(name, None)
+        else:
+            params[name] = value
+    return params.urlencode()
+
+
+@login_required
+def package_search(request):
+    """Search packages by destination, price, length and category, with facet counts"""
+    form = PackageSearchForm(request.GET)
+    filters, sort, page = form.search_params()
+    search = search_packages(filters, sort, page)
+    
+    # Facet links narrow the current search; the active value's link clears it
+    params = request.GET
+    for option in search['facets']['category']:
+        option['active'] = filters.get('category') == option['value']
+        option['query'] = search_query(params, category=None if option['active'] else option['value'])
+    for option in search['facets']['destination']:
+        option['active'] = filters.get('destination') == option['value']
+        option['query'] = search_query(params, destination=None if option['active'] else option['value'])
+    for option in search['facets']['duration_days']:
+        option['active'] = filters.get('min_days') == filters.get('max_days') == option['value']
+        value = None if option['active'] else option['value']
+        option['query'] = search_query(params, min_days=value, max_days=value)
+    for option in search['facets']['price']:
+        option['query'] = search_query(params, min_price=option['min'], max_price=option['max'])
+    
+    return render(request, 'package_search.html', {
+        'form': form,
+        'search': search,
+        'filters': filters,
+        'clear_query': search_query(params, **{name: None for name in filters}),
+        'previous_query': search_query(params) + f'&page={page - 1}' if page > 1 else '',
+        'next_query': search_query(params) + f'&page={page + 1}' if page < search['pages'] else '',
+    })
+
+
+@login_required
+def package_search_data(request):
+    """The search page's results and facets as JSON"""
+    filters, sort, page = PackageSearchForm(request.GET).search_params()
+    return JsonResponse(jsonable(search_packages(filters, sort, page)))
+
+
 @login_required
 def select_package_category(request):
     """Select category before adding a package - Admin only"""
@@ -367,6 +446,7 @@ def delete_package(request, package_id):
 
 
 @login_required
+@idempotent
 def book_package(request, package_id):
     """Book a tour package - Student booking form (Admin cannot book)"""
     # Prevent admin from booking
@@ -377,7 +457,7 @@ def book_package(request, package_id):
     package = get_object_or_404(TourPackage, id=package_id, is_active=True)
     
     if request.method == 'POST':
-        form = PackageBookingForm(request.POST)
+        form = PackageBookingForm(request.POST, package=package)
         if form.is_valid():
             booking = form.save(commit=False)
             booking.package = package
@@ -392,22 +472,23 @@ def book_package(request, package_id):
         initial_data = {}
         if request.user.email:
             initial_data['email'] = request.user.email
-        form = PackageBookingForm(initial=initial_data)
+        form = PackageBookingForm(initial=initial_data, package=package)
     
     return render(request, 'book_package.html', {'form': form, 'package': package})
 
 
 @login_required
 def my_package_bookings(request):
-    """View user's package bookings and mark notifications as read"""
-    bookings = PackageBooking.objects.filter(user=request.user)
+    """View user's package bookings, highlighting decisions they have not seen yet"""
+    bookings = list(PackageBooking.objects.filter(user=request.user).select_related('package'))
     
-    # Mark unread notifications as read when student views the page
-    unread_bookings = bookings.filter(
-        status__in=['approved', 'rejected'],
-        student_notified=False
-    )
-    unread_bookings.update(student_notified=True)
+    # Highlight what changed since the last visit, then move the watermark past it.
+    # Nothing is written when there is nothing new.
+    unseen = unseen_bookings(bookings, bookings_seen_at(request))
+    for booking in unseen:
+        booking.is_unseen = True
+    if unseen:
+        acknowledge_bookings(request, max(b.status_changed_at for b in unseen))
     
     return render(request, 'my_package_bookings.html', {'bookings': bookings})
 
@@ -417,12 +498,11 @@ def cancel_package_booking(request, booking_id):
     """Cancel a package booking"""
     booking = get_object_or_404(PackageBooking, id=booking_id, user=request.user)
     
-    if booking.status == 'pending':
-        booking.status = 'cancelled'
-        booking.save()
+    if booking.status in UNDECIDED_STATUSES:
+        set_booking_status(booking.id, 'cancelled')
         messages.success(request, 'Your booking has been cancelled.')
     else:
-        messages.error(request, 'Only pending bookings can be cancelled.')
+        messages.error(request, 'Only pending or waitlisted bookings can be cancelled.')
     
     return redirect('my_package_bookings')
 
@@ -436,11 +516,8 @@ def admin_package_bookings(request):
         return redirect('packages')
     
     status_filter = request.GET.get('status', 'all')
-    
-    if status_filter == 'all':
-        bookings = PackageBooking.objects.all()
-    else:
-        bookings = PackageBooking.objects.filter(status=status_filter)
+    balance_filter = request.GET.get('balance', '')
+    bookings = filter_package_bookings(request.GET).select_related('package').prefetch_related('payments__claimed_by')
     
     pending_count = PackageBooking.objects.filter(status='pending').count()
     approved_count = PackageBooking.objects.filter(status='approved').count()
@@ -449,6 +526,8 @@ def admin_package_bookings(request):
     return render(request, 'admin_package_bookings.html', {
         'bookings': bookings,
         'status_filter': status_filter,
+        'balance_filter': balance_filter,
+        'now': timezone.now(),
         'pending_count': pending_count,
         'approved_count': approved_count,
         'rejected_count': rejected_count,
@@ -463,8 +542,11 @@ def approve_package_booking(request, booking_id):
         return redirect('packages')
     
     booking = get_object_or_404(PackageBooking, id=booking_id)
-    booking.status = 'approved'
-    booking.save()
+    try:
+        set_booking_status(booking.id, 'approved')
+    except SeatsUnavailable as exc:
+        messages.error(request, f'Cannot approve {booking.student_name}: {exc}')
+        return redirect('admin_package_bookings')
     messages.success(request, f'Booking for {booking.student_name} has been approved!')
     return redirect('admin_package_bookings')
 
@@ -477,17 +559,63 @@ def reject_package_booking(request, booking_id):
         return redirect('packages')
     
     booking = get_object_or_404(PackageBooking, id=booking_id)
-    booking.status = 'rejected'
-    if request.method == 'POST':
-        booking.admin_notes = request.POST.get('admin_notes', '')
-    booking.save()
+    admin_notes = request.POST.get('admin_notes', '') if request.method == 'POST' else None
+    set_booking_status(booking.id, 'rejected', admin_notes)
     messages.success(request, f'Booking for {booking.student_name} has been rejected.')
     return redirect('admin_package_bookings')
 
 
+@login_required
+@require_POST
+def batch_package_bookings(request):
+    """Approve or reject the selected (or all filtered) undecided bookings at once"""
+    wants_json = request.accepts('application/json') and not request.accepts('text/html')
+    if not request.user.is_staff and not request.user.is_superuser:
+        if wants_json:
+            return JsonResponse({'error': 'Permission denied.'}, status=403)
+        messages.error(request, 'Permission denied.')
+        return redirect('packages')
+    
+    action = request.POST.get('action')
+    if action not in BATCH_ACTIONS:
+        if wants_json:
+            return JsonResponse({'error': 'Unknown action.'}, status=400)
+        messages.error(request, 'Unknown action.')
+        return redirect('admin_package_bookings')
+    
+    # Either explicit ids, or every pending booking matching the page's filters
+    if request.POST.get('scope') == 'filter':
+        booking_ids = list(
+            filter_package_bookings(request.POST).filter(status__in=UNDECIDED_STATUSES).values_list('id', flat=True)
+        )
+    else:
+        booking_ids = [int(i) for i in request.POST.getlist('booking_ids') if i.isdigit()]
+    
+    outcomes = batch_update_bookings(booking_ids, action, request.POST.get('admin_notes', '').strip())
+    changed = sum(1 for outcome in outcomes.values() if outcome == BATCH_ACTIONS[action])
+    
+    if wants_json:
+        return JsonResponse({'updated': changed, 'results': outcomes})
+    if changed:
+        messages.success(request, f'{changed} booking(s) {BATCH_ACTIONS[action]}.')
+    full = sum(1 for outcome in outcomes.values() if outcome == 'no_seats')
+    if full:
+        messages.error(request, f'{full} booking(s) left pending because their package has no seats left.')
+    skipped = len(outcomes) - changed - full
+    if skipped:
+        messages.warning(request, f'{skipped} booking(s) skipped because they were already decided.')
+    if not outcomes:
+        messages.warning(request, 'No bookings were selected.')
+    
+    query = {key: request.POST[key] for key in ('status', 'balance') if request.POST.get(key)}
+    url = reverse('admin_package_bookings')
+    return redirect(f'{url}?{urlencode(query)}' if query else url)
+
+
 # Payment Views
 @login_required
 @require_POST
+@idempotent
 def submit_payment(request, booking_id):
     """Submit payment for a booking - Creates or updates Payment record"""
     booking = get_object_or_404(PackageBooking, id=booking_id, user=request.user)
@@ -498,20 +626,9 @@ def submit_payment(request, booking_id):
     
     form = PaymentForm(request.POST)
     if form.is_valid():
-        # Check if payment already exists for this booking
-        payment = Payment.objects.filter(booking=booking).first()
-        
-        if payment:
-            # Update existing payment
-            payment.amount_paid = form.cleaned_data['amount_paid']
-            payment.bkash_last_4 = form.cleaned_data['bkash_last_4']
-            payment.status = 'pending'  # Reset to pending for re-verification
-            payment.save()
-        else:
-            # Create new payment
-            payment = form.save(commit=False)
-            payment.booking = booking
-            payment.save()
+        # Create or update the booking's payment in one statement; an update
+        # resets it to pending for re-verification
+        upsert_payment(booking, form.cleaned_data['amount_paid'], form.cleaned_data['bkash_last_4'])
         
         return JsonResponse({'success': True, 'message': 'Payment submitted successfully. Admin will verify it shortly.'})
     else:
@@ -529,13 +646,14 @@ def verify_payment(request, payment_id):
     payment = get_object_or_404(Payment, id=payment_id)
     
     if request.method == 'POST':
-        admin_notes = request.POST.get('admin_notes', '')
-        payment.status = 'verified'
-        payment.admin_notes = admin_notes
-        payment.save()
-        messages.success(request, f'Payment verified for {payment.booking.student_name}')
+        try:
+            payment = mark_payment_verified(payment.id, request.user, request.POST.get('admin_notes', ''))
+        except PaymentClaimed as exc:
+            messages.error(request, str(exc))
+        else:
+            messages.success(request, f'Payment verified for {payment.booking.student_name}')
     
-    return redirect('admin_package_bookings')
+    return redirect(payment_review_redirect(request))
 
 
 @login_required
@@ -548,36 +666,111 @@ def reject_payment(request, payment_id):
     payment = get_object_or_404(Payment, id=payment_id)
     
     if request.method == 'POST':
-        admin_notes = request.POST.get('admin_notes', '')
-        payment.status = 'rejected'
-        payment.admin_notes = admin_notes
-        payment.save()
-        messages.success(request, f'Payment rejected for {payment.booking.student_name}')
+        try:
+            payment = mark_payment_rejected(payment.id, request.user, request.POST.get('admin_notes', ''))
+        except PaymentClaimed as exc:
+            messages.error(request, str(exc))
+        else:
+            messages.success(request, f'Payment rejected for {payment.booking.student_name}')
     
-    return redirect('admin_package_bookings')
+    return redirect(payment_review_redirect(request))
+
+
+def payment_review_redirect(request):
+    """Send the admin back to the review queue when they came from it"""
+    return 'payment_queue' if request.POST.get('next') == 'payment_queue' else 'admin_package_bookings'
+
+
+# Payment Review Queue
+@login_required
+def payment_queue(request):
+    """Admin's leased batch of pending payments, with queue depth and throughput"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        messages.error(request, 'Permission denied.')
+        return redirect('packages')
+    
+    now = timezone.now()
+    claimed = (
+        Payment.objects.filter(claimed_by=request.user, claimed_until__gt=now, status='pending')
+        .select_related('booking__package')
+        .order_by('created_at', 'id')
+    )
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return render(request, 'payment_queue.html', {
+        'claimed_payments': claimed,
+        'stats': review_queue_stats(today),
+        'batch_size': REVIEW_BATCH_SIZE,
+        'lease_minutes': int(REVIEW_LEASE.total_seconds() // 60),
+    })
+
+
+@login_required
+@require_POST
+def claim_payment_batch(request):
+    """Lease the next batch of pending payments to this admin"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        messages.error(request, 'Permission denied.')
+        return redirect('packages')
+    
+    claimed = claim_payments(request.user)
+    if claimed:
+        messages.success(request, f'{len(claimed)} payments are reserved for you for the next {int(REVIEW_LEASE.total_seconds() // 60)} minutes.')
+    else:
+        messages.info(request, 'No pending payments are waiting for review.')
+    return redirect('payment_queue')
+
+
+@login_required
+@require_POST
+def release_payment_claims(request):
+    """Give this admin's unreviewed payments back to the queue"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        messages.error(request, 'Permission denied.')
+        return redirect('packages')
+    
+    released = release_claims(request.user)
+    messages.success(request, f'Released {released} payments back to the queue.')
+    return redirect('payment_queue')
+
+
+@login_required
+def payment_queue_stats(request):
+    """Queue depth and per-admin throughput (today, or the last ?hours=N, 1 to 720) as JSON"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        return JsonResponse({'error': 'Permission denied.'}, status=403)
+    
+    now = timezone.now()
+    try:
+        # Clamped to 1 hour .. 30 days, so inf or huge values cannot overflow the date
+        hours = min(max(float(request.GET['hours']), 1), 720)
+        since = now - timedelta(hours=hours)
+    except (KeyError, ValueError, OverflowError):
+        since = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    stats = review_queue_stats(since)
+    stats['since'] = since.isoformat()
+    return JsonResponse(stats)
 
 
 @login_required
 def get_booking_payment(request, booking_id):
     """Get payment details for a booking - AJAX endpoint"""
-    booking = get_object_or_404(PackageBooking, id=booking_id, user=request.user)
+    booking = get_object_or_404(PackageBooking.objects.select_related('package'), id=booking_id, user=request.user)
     
+    # Totals come from the ledger-maintained columns; the payment is the latest submission
     payment = Payment.objects.filter(booking=booking).first()
     
+    data = {
+        'has_payment': payment is not None or booking.paid_total > 0,
+        'amount_paid': float(booking.paid_total),
+        'remaining_amount': float(booking.balance),
+        'total_price': float(booking.package.price),
+    }
     if payment:
-        data = {
-            'has_payment': True,
-            'amount_paid': float(payment.amount_paid),
+        data.update({
+            'submitted_amount': float(payment.amount_paid),
             'bkash_last_4': payment.bkash_last_4,
             'status': payment.status,
-            'total_price': float(booking.package.price),
-            'remaining_amount': float(booking.package.price - payment.amount_paid),
-        }
-    else:
-        data = {
-            'has_payment': False,
-            'total_price': float(booking.package.price),
-        }
+        })
     
     return JsonResponse(data)
 
@@ -683,18 +876,7 @@ def admin_travel_requests(request):
     status_filter = request.GET.get('status', '')
     search_query = request.GET.get('search', '')
     
-    requests = TravelRequest.objects.all().select_related('user').order_by('-created_at')
-    
-    if status_filter:
-        requests = requests.filter(status=status_filter)
-    
-    if search_query:
-        requests = requests.filter(
-            models.Q(place_name__icontains=search_query) |
-            models.Q(location__icontains=search_query) |
-            models.Q(user__username__icontains=search_query) |
-            models.Q(user__first_name__icontains=search_query)
-        )
+    requests = filter_travel_requests(request.GET).select_related('user').order_by('-created_at')
     
     # Count statistics
     total_count = TravelRequest.objects.count()
@@ -728,7 +910,9 @@ def approve_travel_request(request, request_id):
         admin_response = request.POST.get('admin_response', '')
         travel_request.status = 'approved'
         travel_request.admin_response = admin_response
-        travel_request.save()
+        with transaction.atomic():
+            travel_request.save()
+            notify(travel_request_notice(travel_request))
         messages.success(request, f'✅ Travel request for "{travel_request.place_name}" has been approved!')
     
     return redirect('admin_travel_requests')
@@ -749,7 +933,9 @@ def reject_travel_request(request, request_id):
         admin_response = request.POST.get('admin_response', '')
         travel_request.status = 'rejected'
         travel_request.admin_response = admin_response
-        travel_request.save()
+        with transaction.atomic():
+            travel_request.save()
+            notify(travel_request_notice(travel_request))
         messages.success(request, f'❌ Travel request for "{travel_request.place_name}" has been rejected.')
     
     return redirect('admin_travel_requests')
@@ -775,4 +961,201 @@ def delete_travel_request(request, request_id):
     # Redirect based on user type
     if request.user.is_staff or request.user.is_superuser:
         return redirect('admin_travel_requests')
-    return redirect('my_travel_requests')
\ No newline at end of file
+    return redirect('my_travel_requests')
+
+# Data Exports
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+
+@login_required
+def export_data(request, kind):
+    """Stream an admin list as CSV or XLSX, honouring the list's filters"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        messages.error(request, 'Permission denied.')
+        return redirect('packages')
+
+    fmt = request.GET.get('format', 'csv')
+    if kind not in EXPORTS or fmt not in EXPORT_FORMATS:
+        raise Http404('Unknown export')
+    return export_response(kind, fmt, request.GET)
+
+
+@login_required
+@require_POST
+def queue_export(request, kind):
+    """Queue a large export for the background worker"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        messages.error(request, 'Permission denied.')
+        return redirect('packages')
+
+    fmt = request.POST.get('format', 'csv')
+    if kind not in EXPORTS or fmt not in EXPORT_FORMATS:
+        raise Http404('Unknown export')
+    filters = {key: request.POST[key] for key in ('status', 'search', 'balance') if request.POST.get(key)}
+    ExportJob.objects.create(kind=kind, format=fmt, filters=filters, requested_by=request.user)
+    messages.success(request, 'Export queued. It will be ready to download here shortly.')
+    return redirect('export_jobs')
+
+
+@login_required
+def export_jobs(request):
+    """List background exports with download links"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        messages.error(request, 'Permission denied.')
+        return redirect('packages')
+
+    jobs = ExportJob.objects.select_related('requested_by')[:50]
+    return render(request, 'export_jobs.html', {'jobs': jobs})
+
+
+@login_required
+def download_export(request, job_id):
+    """Download the file produced by a finished background export"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        messages.error(request, 'Permission denied.')
+        return redirect('packages')
+
+    job = get_object_or_404(ExportJob, id=job_id, status='done')
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=os.path.basename(job.file.name))
+
+
+# Broadcast Views
+@login_required
+def broadcasts(request):
+    """Send a message to everyone booked on a package or tour date, and list past broadcasts"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        messages.error(request, 'Permission denied.')
+        return redirect('packages')
+
+    if request.method == 'POST':
+        form = BroadcastForm(request.POST)
+        if form.is_valid():
+            broadcast = form.save(commit=False)
+            broadcast.created_by = request.user
+            broadcast.recipient_count = recipient_emails(broadcast).count()
+            if broadcast.recipient_count:
+                broadcast.save()
+                messages.success(request, f'Broadcast queued for {broadcast.recipient_count} recipients.')
+                return redirect('broadcasts')
+            form.add_error(None, f'Nobody is booked on {broadcast.target} yet.')
+    else:
+        form = BroadcastForm(initial={key: request.GET[key] for key in ('package', 'tour_date') if request.GET.get(key)})
+
+    recent = list(Broadcast.objects.select_related('package', 'tour_date__study_tour', 'created_by')[:50])
+    progress = delivery_progress(recent)
+    for broadcast in recent:
+        broadcast.progress = progress[broadcast.id]
+    return render(request, 'broadcasts.html', {'form': form, 'broadcasts': recent})
+
+
+@login_required
+def broadcast_progress(request):
+    """Fan-out and delivery counts for the given ?ids= broadcasts as JSON"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        return JsonResponse({'error': 'Permission denied.'}, status=403)
+
+    ids = [int(i) for i in request.GET.get('ids', '').split(',') if i.strip().isdigit()][:50]
+    selected = list(Broadcast.objects.filter(id__in=ids))
+    progress = delivery_progress(selected)
+    return JsonResponse({
+        'broadcasts': [
+            {
+                'id': b.id,
+                'status': b.status,
+                'status_display': b.get_status_display(),
+                'recipient_count': b.recipient_count,
+                'fanned_out': b.fanned_out,
+                **progress[b.id],
+            }
+            for b in selected
+        ]
+    })
+
+
+@login_required
+@require_POST
+def retry_broadcast(request, broadcast_id):
+    """Requeue a failed or stalled broadcast; it resumes after the last recipient reached"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        messages.error(request, 'Permission denied.')
+        return redirect('packages')
+
+    if Broadcast.objects.filter(Broadcast.resumable(), id=broadcast_id).update(status='queued', error=''):
+        messages.success(request, f'Broadcast #{broadcast_id} requeued.')
+    else:
+        messages.error(request, f'Broadcast #{broadcast_id} has not failed or stalled.')
+    return redirect('broadcasts')
+
+
+# Report Views
+def report_range(params):
+    """(start, end) dates from ?start=&end= (YYYY-MM-DD), defaulting to the last 30 days.
+
+    Both are clamped to 2000-01-01 .. today, so extreme dates cannot overflow
+    the date arithmetic.
+    """
+    today = timezone.localdate()
+
+    def date_param(name):
+        try:
+            day = parse_date(params.get(name) or '')
+        except ValueError:
+            return None
+        return min(max(day, date(2000, 1, 1)), today) if day else None
+
+    end = date_param('end') or today
+    start = date_param('start') or end - timedelta(days=29)
+    return min(start, end), end
+
+
+@login_required
+def reports(request):
+    """Booking and revenue dashboard, served from the daily report tables"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        messages.error(request, 'Permission denied.')
+        return redirect('packages')
+
+    start, end = report_range(request.GET)
+    summary = report_summary(start, end)
+    peak = max((row['booking_count'] for row in summary['by_day']), default=0)
+    for row in summary['by_day']:
+        row['bar_width'] = round(row['booking_count'] / peak * 100) if peak else 0
+    return render(request, 'reports.html', {'summary': summary})
+
+
+@login_required
+def reports_data(request):
+    """The dashboard's figures for ?start=&end= as JSON"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        return JsonResponse({'error': 'Permission denied.'}, status=403)
+
+    start, end = report_range(request.GET)
+    return JsonResponse(jsonable(report_summary(start, end)))
+
+
+# Change Feed API
+@require_GET
+def api_changes(request):
+    """Rows changed or deleted after ?since=<cursor>, in a stable order, for external systems.
+
+    Authenticated with an API token (Authorization: Token <key>). Optional
+    ?limit= (default 500, max 5000) and ?types=package_booking,payment.
+    """
+    if authenticate_token(request) is None:
+        response = JsonResponse({'error': 'Missing or invalid API token.'}, status=401)
+        response['WWW-Authenticate'] = 'Token'
+        return response
+
+    since = request.GET.get('since', '')
+    try:
+        decode_cursor(since)
+        limit = min(max(int(request.GET.get('limit', CHANGES_PAGE_SIZE)), 1), CHANGES_MAX_PAGE_SIZE)
+    except (InvalidCursor, ValueError):
+        return JsonResponse({'error': 'Invalid cursor or limit.'}, status=400)
+    types = None
+    if request.GET.get('types'):
+        types = set(request.GET['types'].split(','))
+        if not types <= set(SOURCES):
+            return JsonResponse({'error': f'Unknown type; choose from {", ".join(SOURCES)}.'}, status=400)
+
+    return StreamingHttpResponse(stream_changes(since, limit, types), content_type='application/json')